@@ -0,0 +1,94 @@
+"""
+Background AI worker for the game interface
+Runs engine searches on a worker thread so the frame loop keeps rendering and
+handling events while the AI thinks
+"""
+
+import queue
+import threading
+from collections import namedtuple
+
+import tictactoe as ttt
+
+# A finished job: value is the search function's return value, error the
+# exception it raised (if any). Pass with_stats=True to the search to get its
+# SearchContext back as part of value.
+AIResult = namedtuple("AIResult", ["job_id", "value", "error"])
+
+
+class AIWorker:
+    """
+    Runs engine searches one at a time on a daemon thread.
+
+    submit() queues a search and returns a job id; poll() returns the jobs that
+    have finished since the last call. cancel() drops every queued job and
+    aborts the running one, and its results are never returned by poll().
+    Searches keep their statistics in their own SearchContext, but they share
+    each board geometry's transposition table, so run them through one worker.
+    """
+
+    def __init__(self):
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending = {}  # job id -> cancel event
+        self._thread = threading.Thread(target=self._run, name="ai-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, search, *args, **kwargs):
+        """
+        Queue search(*args, cancel=event, **kwargs) and return its job id.
+        search is ttt.minimax, ttt.get_best_moves or anything taking a cancel event.
+        """
+        with self._lock:
+            self._next_id += 1
+            job_id = self._next_id
+            cancel = threading.Event()
+            self._pending[job_id] = cancel
+        self._requests.put((job_id, cancel, search, args, kwargs))
+        return job_id
+
+    def cancel(self, job_id=None):
+        """Cancel one job, or every queued and running job if job_id is None"""
+        with self._lock:
+            if job_id is None:
+                cancelled = list(self._pending.values())
+                self._pending.clear()
+            else:
+                event = self._pending.pop(job_id, None)
+                cancelled = [event] if event is not None else []
+        for event in cancelled:
+            event.set()
+
+    def busy(self):
+        """Returns True while any submitted job has not been polled"""
+        with self._lock:
+            return bool(self._pending)
+
+    def poll(self):
+        """Returns the AIResults finished since the last call (never blocks)"""
+        finished = []
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return finished
+            with self._lock:
+                if self._pending.pop(result.job_id, None) is None:
+                    continue  # cancelled after it finished
+            finished.append(result)
+
+    def _run(self):
+        while True:
+            job_id, cancel, search, args, kwargs = self._requests.get()
+            if cancel.is_set():
+                continue
+            try:
+                value = search(*args, cancel=cancel, **kwargs)
+            except ttt.SearchCancelled:
+                continue
+            except Exception as error:
+                self._results.put(AIResult(job_id, None, error))
+                continue
+            self._results.put(AIResult(job_id, value, None))
@@ -0,0 +1,348 @@
+"""
+Game analysis
+Replays recorded games (move histories as kept by runner.py: lists of
+(player, (row, col)) tuples) and rates every move against the best one.
+
+analyze_games() is a generator over a stream of histories: games are read,
+replayed and analyzed one at a time, and each ply comes out as a PlyAnalysis
+as soon as its game is done. Position values come from the solved table,
+the position store or a search, and are kept in a bounded LRU cache shared by
+all games, since most games pass through the same openings. With workers > 1
+chunks of games go to a process pool (each worker keeps its own cache) with
+a bounded number of chunks in flight, so memory stays flat however many games
+the stream holds. Results come out in input order either way. A malformed
+game comes out as a GameError and the stream goes on.
+
+Usage:
+    python analysis.py games.jsonl                One JSON history per line
+    python analysis.py games.jsonl --workers 4    Analyze in 4 processes
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import tictactoe as ttt
+
+# Move ratings
+BLUNDER = "blunder"
+INACCURACY = "inaccuracy"
+
+# A move that keeps the outcome but loses more than this is an inaccuracy.
+# Exact values count plies, so a win one move slower (or a loss one move
+# sooner) is an inaccuracy; heuristic values are in (-1, 1). A move is only
+# called a blunder when both values are exact: with a search horizon in
+# between, a large loss is reported as an inaccuracy
+INACCURACY_LOSS = 0.5
+
+# Positions kept in each process's value cache
+ANALYSIS_CACHE_SIZE = 1 << 18
+
+# Games sent to a worker at a time, and chunks in flight per worker
+ANALYSIS_CHUNK = 256
+CHUNKS_PER_WORKER = 2
+
+PlyAnalysis = namedtuple("PlyAnalysis", [
+    "game",          # index of the game in the input stream
+    "ply",           # pieces on the board before the move
+    "player",        # side that moved
+    "move",          # (row, col) played
+    "value",         # value of the position before the move (X positive)
+    "best_move",     # (row, col) of a best move
+    "played_value",  # value after the move played, seen from the position before it
+    "loss",          # how much worse the move is for the mover than the best one (>= 0)
+    "flag",          # BLUNDER, INACCURACY or None
+    "exact",         # True if value and played_value are both exact, not search estimates
+])
+
+# A game of the stream that could not be analyzed, in place of its plies
+GameError = namedtuple("GameError", ["game", "error"])
+
+
+class PositionCache:
+    """
+    LRU map of (x, o) bitboard masks to (value, best move index, exact).
+    One cache belongs to one geometry and search depth.
+    """
+
+    def __init__(self, max_size=ANALYSIS_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+# Caches of this process by (geometry, max_depth); workers fill their own
+_caches = {}
+
+
+def position_cache(shape, max_depth, max_size=ANALYSIS_CACHE_SIZE):
+    """The cache of this process for a geometry and search depth"""
+    cache = _caches.get((shape, max_depth))
+    if cache is None:
+        cache = _caches[shape, max_depth] = PositionCache(max_size)
+    return cache
+
+
+def position_value(state, max_depth, cache=None):
+    """
+    Value of a BitBoard, scored like minimax, with a best move.
+
+    Looks in the solved table, then the position store, then searches to
+    max_depth plies. Returns (value, best move index or None, exact); exact is
+    False when the search stopped short of the end of the game without
+    finding a forced result.
+    """
+    key = (state.x, state.o)
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    shape = state.geometry
+    if state.terminal():
+        entry = (state.utility() * (1 + shape.win_bonus), None, True)
+    else:
+        solved = ttt.solved_position(state)
+        stored = ttt.stored_position(state) if solved is None else None
+        if solved is not None:
+            value, moves = solved
+            best = next((index for index in shape.move_order if moves >> index & 1), None)
+            entry = (value, best, True)
+        elif stored is not None and stored[1] is not None:
+            entry = (stored[0], stored[1], True)
+        else:
+            shape.transposition_table.new_search()
+            value, action = ttt.iterative_deepening(state, max_depth, ttt.SearchContext(detailed=False))
+            exact = abs(value) >= 1 or state.ply + max_depth >= len(shape.cells)
+            entry = (value, shape.index(action), exact)
+
+    if cache is not None:
+        cache.put(key, entry)
+    return entry
+
+
+def outcome(value):
+    """1, 0 or -1: the forced result a value stands for (0 for heuristic values)"""
+    if value >= 1:
+        return 1
+    if value <= -1:
+        return -1
+    return 0
+
+
+def rate_move(player, value, played_value, exact=True):
+    """
+    (loss, flag) of a move: values are X-positive, before the move and after
+    the move played; exact says whether both are exact.
+    """
+    sign = 1 if player == ttt.X else -1
+    loss = max(0, sign * (value - played_value))
+    if exact and outcome(sign * played_value) < outcome(sign * value):
+        return loss, BLUNDER
+    if loss > INACCURACY_LOSS:
+        return loss, INACCURACY
+    return loss, None
+
+
+def analyze_game(history, game=0, size=ttt.BOARD_SIZE, win_length=None, max_depth=None, cache=None):
+    """
+    Analyze one game. history is a sequence of (player, (row, col)) moves
+    from the empty board.
+
+    Returns a list of PlyAnalysis, one per move. Raises ValueError if the
+    history is malformed or a move is out of turn, illegal, or played after
+    the game is over.
+    """
+    shape = ttt.geometry(size, win_length)
+    if max_depth is None:
+        max_depth = shape.search_depth(ttt.HARD)
+    if cache is None:
+        cache = position_cache(shape, max_depth)
+
+    if isinstance(history, str) or not hasattr(history, "__iter__"):
+        raise ValueError(f"Game {game}: not a move list: {str(history)[:40]!r}")
+    state = ttt.BitBoard(geometry=shape)
+    results = []
+    value, best, exact = position_value(state, max_depth, cache)
+    for item in history:
+        try:
+            player, move = item
+            move = tuple(move)
+        except (TypeError, ValueError):
+            raise ValueError(f"Game {game}: {item!r} is not a (player, (row, col)) move") from None
+        if len(move) != 2 or not all(isinstance(coordinate, int) for coordinate in move):
+            raise ValueError(f"Game {game}: move {move} is not a (row, col) pair")
+        if state.terminal():
+            raise ValueError(f"Game {game}: move {move} at ply {state.ply} after the game is over")
+        if player != state.player():
+            raise ValueError(f"Game {game}: {player} moved at ply {state.ply}, {state.player()} to move")
+        if not (0 <= move[0] < size and 0 <= move[1] < size):
+            raise ValueError(f"Game {game}: move {move} is off the board")
+        try:
+            child = state.play(shape.index(move))
+        except ValueError as error:
+            raise ValueError(f"Game {game}: {error}") from None
+
+        child_value, child_best, child_exact = position_value(child, max_depth, cache)
+        # The child is one ply further on: wins there are one step closer
+        played_value = ttt.score_from_tt(child_value, 1)
+        loss, flag = rate_move(player, value, played_value, exact and child_exact)
+        results.append(PlyAnalysis(game, state.ply, player, move, value,
+                                   shape.cells[best] if best is not None else None,
+                                   played_value, loss, flag, exact and child_exact))
+        state, value, best, exact = child, child_value, child_best, child_exact
+    return results
+
+
+def _analyze_chunk(job):
+    """Worker task: analyze a chunk of games starting at game index first"""
+    first, histories, size, win_length, max_depth, cache_size = job
+    shape = ttt.geometry(size, win_length)
+    cache = position_cache(shape, max_depth, cache_size)
+    results = []
+    for offset, history in enumerate(histories):
+        results.extend(_analyze_or_report(history, first + offset, size, win_length, max_depth, cache))
+    return results
+
+
+def _analyze_or_report(history, game, size, win_length, max_depth, cache):
+    """The plies of a game, or a one-item list with its GameError"""
+    try:
+        return analyze_game(history, game, size, win_length, max_depth, cache)
+    except ValueError as error:
+        return [GameError(game, str(error))]
+
+
+def analyze_games(histories, size=ttt.BOARD_SIZE, win_length=None, max_depth=None, workers=1,
+                  chunk_size=ANALYSIS_CHUNK, cache_size=ANALYSIS_CACHE_SIZE):
+    """
+    Analyze a stream of games, yielding a PlyAnalysis per move in input order,
+    or a single GameError for a game that is not a legal move history.
+
+    histories may be any iterable, including a generator reading a file; it is
+    consumed as the results are. max_depth is the search depth for positions
+    without a table or store entry (default: the HARD depth of the board).
+    With workers > 1, games are analyzed in chunk_size chunks by a process
+    pool with at most CHUNKS_PER_WORKER chunks per worker in flight.
+    """
+    shape = ttt.geometry(size, win_length)
+    if max_depth is None:
+        max_depth = shape.search_depth(ttt.HARD)
+
+    if workers <= 1:
+        cache = position_cache(shape, max_depth, cache_size)
+        for game, history in enumerate(histories):
+            yield from _analyze_or_report(history, game, size, shape.win_length, max_depth, cache)
+        return
+
+    games = iter(histories)
+    first = 0
+    pending = []
+    with ProcessPoolExecutor(workers) as pool:
+        while True:
+            while len(pending) < workers * CHUNKS_PER_WORKER:
+                chunk = list(islice(games, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_analyze_chunk,
+                                           (first, chunk, size, shape.win_length, max_depth, cache_size)))
+                first += len(chunk)
+            if not pending:
+                break
+            yield from pending.pop(0).result()
+
+
+def summarize(analyses):
+    """
+    Count moves, blunders and inaccuracies per player over a stream of
+    PlyAnalysis and GameError. Returns {"games": n, "errors": n, X: {...}, O: {...}}.
+    """
+    summary = {"games": 0, "errors": 0}
+    for player in (ttt.X, ttt.O):
+        summary[player] = {"moves": 0, BLUNDER: 0, INACCURACY: 0}
+    last_game = None
+    for ply in analyses:
+        if isinstance(ply, GameError):
+            summary["errors"] += 1
+            continue
+        if ply.game != last_game:
+            summary["games"] += 1
+            last_game = ply.game
+        counts = summary[ply.player]
+        counts["moves"] += 1
+        if ply.flag is not None:
+            counts[ply.flag] += 1
+    return summary
+
+
+def read_histories(path):
+    """
+    Yield the move histories of a file with one JSON list of [player, [row, col]]
+    per line. A line that is not JSON is yielded as it is, for analyze_games
+    to report.
+    """
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate every move of recorded games")
+    parser.add_argument("games", help="file with one JSON move history per line")
+    parser.add_argument("--size", type=int, default=ttt.BOARD_SIZE, help="board size")
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=None, help="search depth for unsolved positions")
+    parser.add_argument("--workers", type=int, default=1, help="analysis processes")
+    parser.add_argument("--verbose", action="store_true", help="print every blunder and inaccuracy")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    analyses = analyze_games(read_histories(args.games), args.size, args.win_length, args.depth, args.workers)
+    if args.verbose:
+        def flagged(stream):
+            for ply in stream:
+                if isinstance(ply, GameError):
+                    print(f"  skipped: {ply.error}")
+                elif ply.flag is not None:
+                    print(f"  game {ply.game} ply {ply.ply}: {ply.player} {ply.move} is a {ply.flag} "
+                          f"(best {ply.best_move}, {ply.value} -> {ply.played_value})")
+                yield ply
+        analyses = flagged(analyses)
+    summary = summarize(analyses)
+    elapsed = time.perf_counter() - start
+
+    print(f"Analyzed {summary['games']:,} games in {elapsed:.1f}s"
+          + (f"; skipped {summary['errors']:,} malformed games" if summary["errors"] else ""))
+    for player in (ttt.X, ttt.O):
+        counts = summary[player]
+        print(f"  {player}: {counts['moves']:,} moves, {counts[BLUNDER]:,} blunders, "
+              f"{counts[INACCURACY]:,} inaccuracies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Batched board evaluation with NumPy
+Scores many boards at once for dataset and analysis jobs. Boards are rows of
+an (N, cells) int8 array holding 1 for X, -1 for O and 0 for an empty cell;
+every function matches its scalar counterpart in tictactoe.py exactly.
+
+NumPy is optional: the game and the search never import this module.
+"""
+
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # only the batch functions need numpy
+    np = None
+
+import tictactoe as ttt
+
+# Cell codes in a batch array
+X_CODE = 1
+O_CODE = -1
+EMPTY_CODE = 0
+
+CODES = {ttt.X: X_CODE, ttt.O: O_CODE, ttt.EMPTY: EMPTY_CODE}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch evaluation requires numpy (pip install numpy)")
+
+
+def encode_boards(boards):
+    """Stack list-of-lists boards of one size into an (N, cells) int8 array"""
+    _require_numpy()
+    return np.array([[CODES[cell] for row in board for cell in row] for board in boards],
+                    dtype=np.int8).reshape(len(boards), -1)
+
+
+@lru_cache(maxsize=None)
+def line_index(size=ttt.BOARD_SIZE, win_length=None):
+    """
+    (lines, win_length) matrix of the cell indexes on each winning line, in
+    the order tictactoe.winner checks them.
+    """
+    _require_numpy()
+    shape = ttt.geometry(size, win_length)
+    return np.array([[shape.index(cell) for cell in line] for line in shape.lines], dtype=np.intp)
+
+
+@lru_cache(maxsize=None)
+def _line_weights(length):
+    """weights[n] is evaluate_line's value of an open line holding n pieces"""
+    return np.array([0] + [10 ** (n - 1) for n in range(1, length + 1)], dtype=np.int64)
+
+
+def _board_size(boards):
+    size = int(round(boards.shape[1] ** 0.5))
+    if size * size != boards.shape[1]:
+        raise ValueError(f"Boards have {boards.shape[1]} cells, not a square number")
+    return size
+
+
+def line_counts(boards, win_length=None):
+    """
+    Count the X and O pieces on every winning line.
+    Returns (x_counts, o_counts), each an (N, lines) int8 array.
+    """
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    lines = boards[:, line_index(_board_size(boards), win_length)]
+    return ((lines == X_CODE).sum(axis=2, dtype=np.int8),
+            (lines == O_CODE).sum(axis=2, dtype=np.int8))
+
+
+def _winners(x_counts, o_counts, length):
+    """Winner codes from line counts; the first complete line decides, as in winner()"""
+    x_lines = x_counts == length
+    complete = x_lines | (o_counts == length)
+    first = complete.argmax(axis=1)
+    rows = np.arange(len(first))
+    return np.where(complete[rows, first], np.where(x_lines[rows, first], X_CODE, O_CODE),
+                    EMPTY_CODE).astype(np.int8)
+
+
+def evaluate_batch(boards, win_length=None):
+    """
+    Evaluate every board in one pass over the line counts.
+
+    Returns:
+        Dict of (N,) arrays: "winner" (X_CODE, O_CODE or 0), "terminal"
+        (bool), "utility" (1, -1 or 0) and "evaluation", the
+        evaluate_position heuristic
+    """
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    length = line_index(_board_size(boards), win_length).shape[1]
+    x_counts, o_counts = line_counts(boards, win_length)
+
+    winners = _winners(x_counts, o_counts, length)
+    terminal = (winners != EMPTY_CODE) | (boards != EMPTY_CODE).all(axis=1)
+    utility = winners.astype(np.int64)
+
+    # evaluate_line: an open line is worth 10 ** (pieces - 1) to its owner
+    weights = _line_weights(length)
+    line_scores = (np.where(o_counts == 0, weights[x_counts], 0)
+                   - np.where(x_counts == 0, weights[o_counts], 0))
+    evaluation = np.where(terminal, utility, line_scores.sum(axis=1))
+    return {"winner": winners, "terminal": terminal, "utility": utility, "evaluation": evaluation}
+
+
+def batch_winner(boards, win_length=None):
+    """Winner of every board: X_CODE, O_CODE or 0 for no winner"""
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    length = line_index(_board_size(boards), win_length).shape[1]
+    return _winners(*line_counts(boards, win_length), length)
+
+
+def batch_terminal(boards, win_length=None):
+    """Boolean array, True where the game is over"""
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    return (batch_winner(boards, win_length) != EMPTY_CODE) | (boards != EMPTY_CODE).all(axis=1)
+
+
+def batch_utility(boards, win_length=None):
+    """1 where X has won, -1 where O has won, 0 otherwise"""
+    return batch_winner(boards, win_length).astype(np.int64)
+
+
+def batch_evaluate(boards, win_length=None):
+    """The evaluate_position heuristic of every board"""
+    return evaluate_batch(boards, win_length)["evaluation"]
@@ -0,0 +1,440 @@
+"""
+Micro-benchmarks for the Tic Tac Toe engine
+Times the game primitives used inside the search over a fixed corpus of
+positions, so a change to the state representation shows its cost per call.
+
+Usage:
+    python benchmark.py primitives                      Time every primitive
+    python benchmark.py primitives --save base.json     Store a baseline
+    python benchmark.py primitives --baseline base.json Compare with a baseline
+    python benchmark.py batch                           Batched vs scalar scoring
+    python benchmark.py search                          PVS vs alpha-beta nodes
+    python benchmark.py startup --baseline start.json   Import time of each entry module
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import tictactoe as ttt
+from solver import reachable_layers
+
+# Board sizes and counts of the random mid-game positions added to the corpus
+MID_GAME_SIZES = (4, 5, 7)
+MID_GAME_POSITIONS = 300
+
+DEFAULT_MIN_TIME = 0.05    # seconds per sample after calibration
+DEFAULT_SAMPLES = 7
+DEFAULT_TOLERANCE = 0.10   # slowdown reported as a regression
+
+# (board size, search depth, positions) of the search comparison
+SEARCH_POSITIONS = ((3, 9, 60), (4, 6, 30), (5, 4, 30), (7, 3, 20))
+
+# Modules whose import time the startup benchmark guards, and the optional
+# dependencies none of them may import up front
+STARTUP_MODULES = ("tictactoe", "mcts", "runner", "server")
+HEAVY_IMPORTS = ("pygame", "numpy")
+STARTUP_RUNS = 7
+STARTUP_TOLERANCE = 0.25   # import slowdown reported as a regression...
+STARTUP_SLACK_MS = 5.0     # ...when it is also more than this many milliseconds
+
+# Run in a fresh interpreter: prints the import time and the heavy modules loaded
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def mid_game_positions(size, count, rng):
+    """Random non-terminal positions with a quarter to half of the board filled"""
+    positions = []
+    cells = size * size
+    while len(positions) < count:
+        board = ttt.initial_state(size)
+        for _ in range(rng.randrange(cells // 4, cells // 2 + 1)):
+            board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            if ttt.terminal(board):
+                break
+        else:
+            positions.append(board)
+    return positions
+
+
+def build_corpus(mid_game=MID_GAME_POSITIONS, seed=0):
+    """
+    Fixed benchmark corpus: every reachable 3x3 position plus mid_game seeded
+    random mid-game positions for each size in MID_GAME_SIZES.
+    """
+    corpus = [board for layer in reachable_layers() for board in layer.values()]
+    rng = random.Random(seed)
+    for size in MID_GAME_SIZES:
+        corpus.extend(mid_game_positions(size, mid_game, rng))
+    return corpus
+
+
+def primitive_calls(corpus):
+    """Returns {name: (function, [args, ...])} for each benchmarked primitive"""
+    boards = [(board,) for board in corpus]
+    moves = []
+    for board in corpus:
+        if not ttt.terminal(board):
+            moves.append((board, min(ttt.actions(board))))
+    return {
+        "player": (ttt.player, boards),
+        "actions": (ttt.actions, boards),
+        "result": (ttt.result, moves),
+        "winner": (ttt.winner, boards),
+        "terminal": (ttt.terminal, boards),
+        "utility": (ttt.utility, boards),
+        "evaluate_position": (ttt.evaluate_position, boards),
+        "move_priority": (ttt.move_priority, [(action, len(board)) for board, action in moves]),
+    }
+
+
+def time_calls(function, calls, passes):
+    """Seconds taken by passes sweeps of function(*args) over calls"""
+    start = time.perf_counter()
+    for _ in range(passes):
+        for args in calls:
+            function(*args)
+    return time.perf_counter() - start
+
+
+def _noop(*args):
+    return None
+
+
+def calibrate(function, calls, min_time):
+    """Number of passes over calls that takes at least min_time seconds"""
+    passes = 1
+    while time_calls(function, calls, passes) < min_time:
+        passes *= 2
+    return passes
+
+
+def bench(function, calls, min_time=DEFAULT_MIN_TIME, samples=DEFAULT_SAMPLES):
+    """
+    Time function over calls. The loop's own cost, measured with a no-op
+    function, is subtracted from every sample.
+    Returns a dict of ns/call statistics.
+    """
+    passes = calibrate(function, calls, min_time)
+    total_calls = passes * len(calls)
+    overhead = min(time_calls(_noop, calls, passes) for _ in range(3))
+    per_call = [max(0.0, time_calls(function, calls, passes) - overhead) / total_calls * 1e9
+                for _ in range(samples)]
+    mean = statistics.mean(per_call)
+    stdev = statistics.stdev(per_call) if samples > 1 else 0.0
+    return {
+        "ns_per_call": mean,
+        "stdev_ns": stdev,
+        "rel_stdev": stdev / mean if mean else 0.0,
+        "min_ns": min(per_call),
+        "calls": len(calls),
+        "passes": passes,
+        "samples": samples,
+    }
+
+
+def run_primitives(corpus=None, names=None, min_time=DEFAULT_MIN_TIME, samples=DEFAULT_SAMPLES):
+    """Benchmark the primitives (all, or those in names) and return a report dict"""
+    if corpus is None:
+        corpus = build_corpus()
+    results = {}
+    for name, (function, calls) in primitive_calls(corpus).items():
+        if names and name not in names:
+            continue
+        results[name] = bench(function, calls, min_time, samples)
+    return {
+        "corpus": {"positions": len(corpus), "mid_game_sizes": list(MID_GAME_SIZES)},
+        "python": sys.version.split()[0],
+        "primitives": results,
+    }
+
+
+def compare_primitives(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare a primitives report with a baseline.
+    The fastest sample of each primitive is compared, as it is the least
+    disturbed by other load on the machine.
+    Returns (changes, regressions): changes maps name -> relative change of
+    ns/call, regressions lists the primitives slower than tolerance allows.
+    """
+    changes = {}
+    regressions = []
+    for name, result in report["primitives"].items():
+        base = baseline["primitives"].get(name)
+        if not base or not base["min_ns"]:
+            continue
+        change = result["min_ns"] / base["min_ns"] - 1
+        changes[name] = change
+        if change > tolerance:
+            regressions.append(f"{name}: {base['min_ns']:.0f}ns -> {result['min_ns']:.0f}ns "
+                               f"({change:+.1%})")
+    return changes, regressions
+
+
+def format_primitives(report, changes=None):
+    """Table of ns/call per primitive, with the change against a baseline if given"""
+    lines = [f"{report['corpus']['positions']} positions, Python {report['python']}",
+             f"  {'primitive':<18} {'ns/call':>10} {'± stdev':>10} {'min':>10}"]
+    for name, result in report["primitives"].items():
+        line = (f"  {name:<18} {result['ns_per_call']:>10.0f} {result['stdev_ns']:>10.0f} "
+                f"{result['min_ns']:>10.0f}")
+        if changes and name in changes:
+            line += f"  {changes[name]:+.1%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_batch(corpus=None, repeat=100, min_time=DEFAULT_MIN_TIME):
+    """
+    Boards per second of batch.evaluate_batch against the scalar functions,
+    per board size. The batch holds each size's corpus boards repeat times.
+    """
+    import batch  # needs numpy
+    if corpus is None:
+        corpus = build_corpus()
+
+    def scalar(boards):
+        for board in boards:
+            ttt.winner(board), ttt.terminal(board), ttt.utility(board), ttt.evaluate_position(board)
+
+    results = {}
+    for size in sorted({len(board) for board in corpus}):
+        boards = [board for board in corpus if len(board) == size]
+        array = batch.np.tile(batch.encode_boards(boards), (repeat, 1))
+        scalar_time = min(time_calls(scalar, [(boards,)], 1) for _ in range(3))
+        passes = calibrate(batch.evaluate_batch, [(array,)], min_time)
+        batch_time = min(time_calls(batch.evaluate_batch, [(array,)], passes) for _ in range(3)) / passes
+        results[size] = {
+            "scalar_boards_per_second": len(boards) / scalar_time,
+            "batch_boards_per_second": len(array) / batch_time,
+        }
+    return results
+
+
+def search_positions(seed=0):
+    """Seeded random positions for the search comparison, as (board, depth)"""
+    rng = random.Random(seed)
+    positions = []
+    for size, depth, count in SEARCH_POSITIONS:
+        for _ in range(count):
+            board = ttt.initial_state(size)
+            for _ in range(rng.randrange(size * size // 3)):
+                board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+                if ttt.terminal(board):
+                    break
+            if not ttt.terminal(board):
+                positions.append((board, depth))
+    return positions
+
+
+def run_search_comparison(positions=None, algorithms=(ttt.ALPHA_BETA, ttt.PVS)):
+    """
+    Search every position with each algorithm from a cleared transposition
+    table. Returns {algorithm: {size: totals}} with nodes, time and PVS
+    re-search counts, and a list of positions whose values differ.
+    """
+    if positions is None:
+        positions = search_positions()
+    totals = {}
+    values = {}
+    for algorithm in algorithms:
+        totals[algorithm] = {}
+        values[algorithm] = []
+        for board, depth in positions:
+            state = ttt.BitBoard.from_board(board)
+            state.geometry.transposition_table.clear()
+            context = ttt.SearchContext(detailed=False)
+            start = time.perf_counter()
+            value, _ = ttt.iterative_deepening(state, depth, context, algorithm)
+            elapsed = time.perf_counter() - start
+            values[algorithm].append(value)
+            size_totals = totals[algorithm].setdefault(len(board), {
+                "positions": 0, "nodes": 0, "time": 0.0, "researches": 0, "aspiration_researches": 0})
+            size_totals["positions"] += 1
+            size_totals["nodes"] += context.nodes_explored
+            size_totals["time"] += elapsed
+            size_totals["researches"] += context.researches
+            size_totals["aspiration_researches"] += context.aspiration_researches
+    reference = values[algorithms[0]]
+    mismatches = [board for algorithm in algorithms[1:]
+                  for (board, _), value, expected in zip(positions, values[algorithm], reference)
+                  if value != expected]
+    return totals, mismatches
+
+
+def measure_startup(module, runs=STARTUP_RUNS):
+    """
+    Import module in runs fresh interpreters.
+    Returns a dict of import and whole-process milliseconds and the heavy
+    modules the import pulled in.
+    """
+    probe = _IMPORT_PROBE.format(module=module, heavy=HEAVY_IMPORTS)
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports, processes = [], []
+    heavy = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", probe], cwd=here, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        processes.append((time.perf_counter() - start) * 1000)
+        elapsed, heavy = json.loads(output.strip().splitlines()[-1])
+        imports.append(elapsed * 1000)
+    return {
+        "import_ms": min(imports),
+        "import_ms_median": statistics.median(imports),
+        "process_ms": min(processes),
+        "heavy_imports": heavy,
+        "runs": runs,
+    }
+
+
+def run_startup(modules=STARTUP_MODULES, runs=STARTUP_RUNS):
+    """Measure the import cost of each module and return a report dict"""
+    return {
+        "python": sys.version.split()[0],
+        "modules": {module: measure_startup(module, runs) for module in modules},
+    }
+
+
+def compare_startup(report, baseline=None, tolerance=STARTUP_TOLERANCE):
+    """
+    Check a startup report, against a baseline if given.
+    Importing pygame or numpy is always a regression; with a baseline, so is a
+    fastest import more than tolerance and STARTUP_SLACK_MS slower.
+    Returns (changes, regressions) like compare_primitives.
+    """
+    changes = {}
+    regressions = []
+    for module, result in report["modules"].items():
+        if result["heavy_imports"]:
+            regressions.append(f"{module}: imports {', '.join(result['heavy_imports'])}")
+        base = baseline["modules"].get(module) if baseline else None
+        if not base or not base["import_ms"]:
+            continue
+        change = result["import_ms"] / base["import_ms"] - 1
+        changes[module] = change
+        if change > tolerance and result["import_ms"] - base["import_ms"] > STARTUP_SLACK_MS:
+            regressions.append(f"{module}: {base['import_ms']:.1f}ms -> {result['import_ms']:.1f}ms "
+                               f"({change:+.1%})")
+    return changes, regressions
+
+
+def format_startup(report, changes=None):
+    """Table of import and process start times per module"""
+    lines = [f"Python {report['python']}",
+             f"  {'module':<12} {'import ms':>10} {'median':>10} {'process ms':>11}"]
+    for module, result in report["modules"].items():
+        line = (f"  {module:<12} {result['import_ms']:>10.1f} {result['import_ms_median']:>10.1f} "
+                f"{result['process_ms']:>11.1f}")
+        if changes and module in changes:
+            line += f"  {changes[module]:+.1%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    primitives = commands.add_parser("primitives", help="time the game primitives per call")
+    primitives.add_argument("names", nargs="*", help="primitives to run (default: all)")
+    primitives.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                            help="seconds per sample")
+    primitives.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    primitives.add_argument("--mid-game", type=int, default=MID_GAME_POSITIONS,
+                            help="random mid-game positions per large board size")
+    primitives.add_argument("--save", help="write the JSON report to this file")
+    primitives.add_argument("--baseline", help="compare against a saved report")
+    primitives.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    commands.add_parser("batch", help="compare batched (numpy) and scalar board scoring")
+    commands.add_parser("search", help="compare PVS and alpha-beta node counts on the same positions")
+
+    startup = commands.add_parser("startup", help="time importing the entry modules in fresh interpreters")
+    startup.add_argument("modules", nargs="*", help="modules to import (default: all entry modules)")
+    startup.add_argument("--runs", type=int, default=STARTUP_RUNS)
+    startup.add_argument("--save", help="write the JSON report to this file")
+    startup.add_argument("--baseline", help="compare against a saved report")
+    startup.add_argument("--tolerance", type=float, default=STARTUP_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "startup":
+        report = run_startup(args.modules or STARTUP_MODULES, args.runs)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        changes, regressions = compare_startup(report, baseline, args.tolerance)
+        print(format_startup(report, changes))
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+            print(f"✓ Wrote {args.save}")
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions:
+            print(f"❌ {len(regressions)} startup regressions")
+            return 1
+        print("✓ No startup regressions")
+        return 0
+
+    if args.command == "search":
+        totals, mismatches = run_search_comparison()
+        base = totals[ttt.ALPHA_BETA]
+        for algorithm, sizes in totals.items():
+            print(f"{algorithm}:")
+            for size, result in sorted(sizes.items()):
+                saved = 1 - result["nodes"] / base[size]["nodes"]
+                print(f"  {size}x{size}: {result['nodes']:>9,} nodes {result['time']:>7.2f}s  "
+                      f"{saved:+.1%} saved  re-searches {result['researches']} "
+                      f"(aspiration {result['aspiration_researches']})")
+            nodes = sum(result["nodes"] for result in sizes.values())
+            base_nodes = sum(result["nodes"] for result in base.values())
+            print(f"  total: {nodes:>9,} nodes  {1 - nodes / base_nodes:+.1%} saved")
+        if mismatches:
+            print(f"❌ {len(mismatches)} positions got different values")
+            return 1
+        print("✓ Every algorithm found the same values")
+        return 0
+
+    if args.command == "batch":
+        for size, result in run_batch().items():
+            speedup = result["batch_boards_per_second"] / result["scalar_boards_per_second"]
+            print(f"  {size}x{size}: scalar {result['scalar_boards_per_second']:>12,.0f} boards/s   "
+                  f"batch {result['batch_boards_per_second']:>12,.0f} boards/s   ({speedup:.0f}x)")
+        return 0
+
+    report = run_primitives(build_corpus(args.mid_game), args.names, args.min_time, args.samples)
+    changes, regressions = None, []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            changes, regressions = compare_primitives(report, json.load(fh), args.tolerance)
+    print(format_primitives(report, changes))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"✓ Wrote {args.save}")
+    for regression in regressions:
+        print(f"  {regression}")
+    if regressions:
+        print(f"❌ {len(regressions)} primitives slower than {args.baseline}")
+        return 1
+    if args.baseline:
+        print(f"✓ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
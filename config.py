@@ -7,10 +7,13 @@ Customize game appearance and behavior here
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 WINDOW_TITLE = "Tic-Tac-Toe AI - Minimax Algorithm"
+FRAME_RATE = 60     # frames per second cap for the game loop
 
 # Game board settings
 TILE_SIZE = 100
 BOARD_MARGIN = 10
+BOARD_SIZE = 3      # 3, 4, 5 or 7 for the larger m,n,k variants
+WIN_LENGTH = None   # None uses the default for the board size (3x3/3, 4x4/4, 5x5/4, 7x7/5)
 
 # Color scheme (RGB values)
 COLORS = {
@@ -41,18 +44,24 @@ FONT_SIZES = {
 }
 
 # AI settings
+# Search depths per difficulty live in tictactoe.SEARCH_DEPTH; the search deepens
+# iteratively and returns its best move so far once time_limit seconds are used.
 AI_SETTINGS = {
     'easy_random_chance': 0.3,
     'medium_random_chance': 0.15,
     'hard_random_chance': 0.05,
-    'max_depth': {
-        'easy': 2,
-        'medium': 4,
-        'hard': 6,
-        'impossible': 9,
-    }
+    'time_limit': 2.0,
+    'node_limit': None,
+    'workers': 1,       # processes per search; >1 splits root moves over a pool (None = all CPUs)
+    'algorithm': 'alphabeta',   # 'alphabeta' or 'pvs' (principal variation search)
+    'engine': 'minimax',    # 'minimax' or 'mcts' (Monte Carlo Tree Search)
+    'ponder_moves': 6,      # user moves whose replies are searched ahead while pondering
 }
 
+# Game log: finished games are appended to this file, under the user's home
+# directory (None keeps no log; runner.py --log and --no-log override it)
+GAME_LOG_FILE = "~/.tictactoe/games.ttgl"
+
 # Animation settings
 ANIMATION_SETTINGS = {
     'thinking_speed': 0.2,
@@ -66,4 +75,6 @@ FEATURES = {
     'show_ai_info_default': False,
     'hint_mode_default': False,
     'animations_enabled': True,
+    'prefetch_hints': True,   # search hints as soon as it is the user's turn
+    'pondering': True,        # search replies to the user's likely moves during their turn
 }
@@ -0,0 +1,309 @@
+"""
+Compact game log
+An append-only binary file of finished games: a RECORD header (board shape,
+both players, result, move count and timings) followed by one byte per move,
+the index of the cell played. X moves first, so the moves alone replay the
+game.
+
+GameLogWriter collects records in a buffer and appends them to the file in
+batches with a single write each. GameLog maps the file read-only and
+iterates over it record by record, and tally() counts results from the
+headers alone, so files of tens of millions of games are read without
+loading them into memory.
+
+Usage:
+    python game_log.py games.ttgl             Results by pairing of players
+    python game_log.py games.ttgl --replay 5  Print the first 5 games
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import Counter, namedtuple
+
+import tictactoe as ttt
+
+MAGIC = b"TTGL"
+VERSION = 1
+# magic, version, padded to 8 bytes
+FILE_HEADER = struct.Struct("<4sB3x")
+# size, win_length, X player, O player, result, move count,
+# start time (Unix seconds), duration, X and O thinking time (milliseconds)
+RECORD = struct.Struct("<BBBBBBIIII")
+
+# Buffered bytes before the writer appends them to the file
+WRITE_BUFFER_SIZE = 1 << 20
+
+# A game result is the winner's symbol, TIE, or None for an unfinished game
+TIE = "tie"
+RESULT_CODES = {None: 0, ttt.X: 1, ttt.O: 2, TIE: 3}
+RESULTS = {code: result for result, code in RESULT_CODES.items()}
+
+# Who played a side: a person, or an engine at a difficulty level
+Player = namedtuple("Player", ["engine", "difficulty"])
+HUMAN = Player("human", None)
+ENGINES = ("minimax", "mcts")
+DIFFICULTIES = (ttt.EASY, ttt.MEDIUM, ttt.HARD, ttt.IMPOSSIBLE)
+
+# One byte per player; new engines go at the end of ENGINES so old logs keep their meaning
+PLAYERS = [HUMAN] + [Player(engine, difficulty) for engine in ENGINES for difficulty in DIFFICULTIES]
+PLAYER_CODES = {player: code for code, player in enumerate(PLAYERS)}
+
+GameRecord = namedtuple("GameRecord", [
+    "size", "win_length",
+    "x_player", "o_player",  # Player of each side
+    "result",                # ttt.X, ttt.O, TIE or None
+    "moves",                 # tuple of cell indexes, X first
+    "started",               # Unix time the game started
+    "duration",              # seconds the game took
+    "x_time", "o_time",      # seconds each side spent thinking
+])
+
+
+def game_result(state):
+    """Result of a BitBoard: the winner, TIE for a full board, or None if play goes on"""
+    win = state.winner()
+    if win is not None:
+        return win
+    return TIE if state.full() else None
+
+
+def game_record(history, size=ttt.BOARD_SIZE, win_length=None, x_player=HUMAN, o_player=HUMAN,
+                started=None, duration=0.0, x_time=0.0, o_time=0.0):
+    """
+    Build a GameRecord from a move history of (player, (row, col)) tuples as
+    kept by runner.py. Raises ValueError for an illegal history.
+    """
+    shape = ttt.geometry(size, win_length)
+    state = ttt.BitBoard(geometry=shape)
+    moves = []
+    for player, move in history:
+        if state.terminal() or player != state.player():
+            raise ValueError(f"Move {move} by {player} is out of turn at ply {state.ply}")
+        index = shape.index(tuple(move))
+        state = state.play(index)
+        moves.append(index)
+    return GameRecord(size, shape.win_length, x_player, o_player, game_result(state), tuple(moves),
+                      time.time() if started is None else started, duration, x_time, o_time)
+
+
+def _milliseconds(seconds):
+    return min(max(int(round(seconds * 1000)), 0), 0xFFFFFFFF)
+
+
+def encode_record(record):
+    """The bytes of a GameRecord in the log"""
+    return RECORD.pack(record.size, record.win_length,
+                       PLAYER_CODES[record.x_player], PLAYER_CODES[record.o_player],
+                       RESULT_CODES[record.result], len(record.moves),
+                       int(record.started), _milliseconds(record.duration),
+                       _milliseconds(record.x_time), _milliseconds(record.o_time)) + bytes(record.moves)
+
+
+def decode_record(data, offset):
+    """(GameRecord, offset of the next record) for the record at offset"""
+    size, win_length, x_code, o_code, result, count, started, duration, x_time, o_time = \
+        RECORD.unpack_from(data, offset)
+    start = offset + RECORD.size
+    return GameRecord(size, win_length, PLAYERS[x_code], PLAYERS[o_code], RESULTS[result],
+                      tuple(data[start:start + count]), started, duration / 1000,
+                      x_time / 1000, o_time / 1000), start + count
+
+
+def log_end(data, offset=FILE_HEADER.size):
+    """Offset just past the last complete record, skipping from header to header"""
+    end = len(data)
+    while offset + RECORD.size <= end:
+        next_offset = offset + RECORD.size + data[offset + 5]
+        if next_offset > end:
+            break
+        offset = next_offset
+    return offset
+
+
+class GameLogWriter:
+    """
+    Appends GameRecords to a log file, creating it if needed.
+
+    Records are encoded into a buffer that is appended to the file with one
+    write once it holds buffer_size bytes, and on flush() and close(). A
+    record cut short at the end of an existing file (a crash in the middle
+    of a write) is truncated away when the file is opened.
+    """
+
+    def __init__(self, path, buffer_size=WRITE_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.games = 0
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            length = os.fstat(self.fd).st_size
+            if length == 0:
+                os.write(self.fd, FILE_HEADER.pack(MAGIC, VERSION))
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                _check_header(os.read(self.fd, FILE_HEADER.size), path)
+                with mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ) as data:
+                    end = log_end(data)
+                if end < length:
+                    os.ftruncate(self.fd, end)
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def write(self, record):
+        """Add a GameRecord, appending the buffer to the file if it is full"""
+        self.buffer += encode_record(record)
+        self.games += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered records to the file"""
+        written = 0
+        with memoryview(self.buffer) as data:
+            while written < len(data):
+                written += os.write(self.fd, data[written:])
+        self.buffer.clear()
+
+    def close(self):
+        if self.fd is not None:
+            self.flush()
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _check_header(header, path):
+    if len(header) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a game log")
+    magic, version = FILE_HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} game log")
+
+
+class GameLog:
+    """
+    A log file mapped read-only. Iterating yields its GameRecords in order;
+    records appended after the log was opened are not seen, and an
+    incomplete record at the end is ignored.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            _check_header(fh.read(FILE_HEADER.size), path)
+            self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+
+    def __iter__(self):
+        data = self.data
+        end = len(data)
+        offset = FILE_HEADER.size
+        while offset + RECORD.size <= end and offset + RECORD.size + data[offset + 5] <= end:
+            record, offset = decode_record(data, offset)
+            yield record
+
+    def tally(self):
+        """
+        Count games by (x_player, o_player, result) from the record headers,
+        without decoding the moves. Returns a Counter.
+        """
+        data = self.data
+        size = len(data)
+        last = size - RECORD.size
+        offset = FILE_HEADER.size
+        codes = {}
+        get = codes.get
+        while offset <= last:
+            next_offset = offset + RECORD.size + data[offset + 5]
+            if next_offset > size:
+                break
+            key = data[offset + 2:offset + 5]
+            codes[key] = get(key, 0) + 1
+            offset = next_offset
+        return Counter({(PLAYERS[key[0]], PLAYERS[key[1]], RESULTS[key[2]]): count
+                        for key, count in codes.items()})
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def replay(record):
+    """The BitBoard positions of a GameRecord, from the empty board to the last move"""
+    state = ttt.BitBoard(geometry=ttt.geometry(record.size, record.win_length))
+    yield state
+    for index in record.moves:
+        state = state.play(index)
+        yield state
+
+
+def player_stats(counts):
+    """
+    runner.py's game_stats from tally() counts: results of the games between
+    a person and an engine, from the person's side.
+    """
+    stats = {"user_wins": 0, "ai_wins": 0, "ties": 0}
+    for (x_player, o_player, result), count in counts.items():
+        if (x_player == HUMAN) == (o_player == HUMAN) or result is None:
+            continue
+        if result == TIE:
+            stats["ties"] += count
+        elif (result == ttt.X) == (x_player == HUMAN):
+            stats["user_wins"] += count
+        else:
+            stats["ai_wins"] += count
+    return stats
+
+
+def player_name(player):
+    return player.engine if player == HUMAN else f"{player.engine} {player.difficulty}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or replay a game log")
+    parser.add_argument("log", help="game log file")
+    parser.add_argument("--replay", type=int, metavar="N", help="print the first N games move by move")
+    args = parser.parse_args(argv)
+
+    with GameLog(args.log) as log:
+        if args.replay is not None:
+            for number, record in zip(range(args.replay), log):
+                print(f"Game {number + 1}: {player_name(record.x_player)} (X) vs "
+                      f"{player_name(record.o_player)} (O), {record.result or 'unfinished'}, "
+                      f"{record.duration:.1f}s")
+                cells = ttt.geometry(record.size, record.win_length).cells
+                print("  " + " ".join(f"{cells[index][0]},{cells[index][1]}" for index in record.moves))
+            return 0
+
+        start = time.perf_counter()
+        counts = log.tally()
+        elapsed = time.perf_counter() - start
+
+    pairings = {}
+    for (x_player, o_player, result), count in counts.items():
+        pairings.setdefault((x_player, o_player), Counter())[result] += count
+    print(f"{sum(counts.values()):,} games in {args.log} ({elapsed:.2f}s)")
+    for (x_player, o_player), results in sorted(pairings.items(), key=lambda item: -sum(item[1].values())):
+        print(f"  {player_name(x_player):>20} vs {player_name(o_player):<20} "
+              f"X {results[ttt.X]:>10,}  O {results[ttt.O]:>10,}  tie {results[TIE]:>10,}"
+              + (f"  unfinished {results[None]:,}" if results[None] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
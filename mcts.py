@@ -0,0 +1,276 @@
+"""
+Monte Carlo Tree Search engine
+UCT search over BitBoard positions with batched random playouts, for boards
+where full-width minimax is too slow. Playouts are vectorized with NumPy when
+it is installed and run one by one otherwise. The tree under the position
+actually reached is kept for the next move.
+"""
+
+import math
+import random
+import time
+
+import tictactoe as ttt
+
+# NumPy, imported by the first playout so that importing this module stays
+# cheap; None if it is not installed (playouts fall back to pure Python)
+np = None
+_numpy_checked = False
+
+# Playout budget per difficulty level
+MCTS_PLAYOUTS = {
+    ttt.EASY: 256,
+    ttt.MEDIUM: 1024,
+    ttt.HARD: 4096,
+    ttt.IMPOSSIBLE: 16384,
+}
+
+# Playouts run from each new leaf at once
+PLAYOUT_BATCH = 16
+
+# UCT exploration constant (sqrt(2) for rewards in [0, 1])
+UCT_EXPLORATION = math.sqrt(2)
+
+# Plies below the old root searched for the new position when reusing a tree
+REUSE_DEPTH = 2
+
+
+class MCTSNode:
+    """
+    A position in the search tree. reward is the total playout reward of the
+    player who made the move leading here: 1 for a win, 0.5 for a draw.
+    """
+
+    __slots__ = ("state", "parent", "move", "children", "untried", "visits", "reward")
+
+    def __init__(self, state, parent=None, move=None, rng=random):
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.visits = 0
+        self.reward = 0.0
+        if state.terminal():
+            self.untried = []
+        else:
+            candidates = state.geometry.candidate_moves(state.x, state.o)
+            self.untried = [index for index in range(len(state.geometry.cells)) if candidates >> index & 1]
+            rng.shuffle(self.untried)
+
+    def select_child(self):
+        """The child with the highest UCT score"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.reward / child.visits
+                   + UCT_EXPLORATION * math.sqrt(log_visits / child.visits))
+
+    def expand(self, rng=random):
+        """Add a child for one untried move and return it"""
+        index = self.untried.pop()
+        child = MCTSNode(self.state.play(index), self, index, rng)
+        self.children.append(child)
+        return child
+
+
+def _load_numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+def playout_results(state, count, rng=random):
+    """
+    Play count random games to the end from state.
+    Returns (x_wins, o_wins, draws).
+    """
+    if _load_numpy() is not None:
+        return _numpy_playouts(state, count, rng)
+    x_wins = o_wins = 0
+    for _ in range(count):
+        current = state
+        empty = current.actions()
+        rng.shuffle(empty)
+        for index in empty:
+            if current.winner() is not None:
+                break
+            current = current.play(index)
+        win = current.winner()
+        if win == ttt.X:
+            x_wins += 1
+        elif win == ttt.O:
+            o_wins += 1
+    return x_wins, o_wins, count - x_wins - o_wins
+
+
+def _numpy_playouts(state, count, rng):
+    """
+    Vectorized playouts: each game is a random order of the empty cells, the
+    side to move taking the even steps. A line is won at the step its last
+    cell is filled if one side owns all of it, and the earliest won line
+    decides the game.
+    """
+    import batch  # line-index matrix, needs numpy
+    shape = state.geometry
+    cells = len(shape.cells)
+    empty = [index for index in range(cells) if not (state.x | state.o) >> index & 1]
+    generator = np.random.default_rng(rng.getrandbits(64))
+
+    steps = np.full((count, cells), -1, dtype=np.int16)
+    steps[:, empty] = generator.random((count, len(empty))).argsort(axis=1)
+    x_owned = np.zeros((count, cells), dtype=bool)
+    x_owned[:, [index for index in range(cells) if state.x >> index & 1]] = True
+    x_to_move = state.player() == ttt.X
+    x_owned[:, empty] = (steps[:, empty] % 2 == 0) == x_to_move
+
+    lines = batch.line_index(shape.size, shape.win_length)
+    line_owned = x_owned[:, lines]
+    line_done = steps[:, lines].max(axis=2)
+    never = cells + 1
+    x_time = np.where(line_owned.all(axis=2), line_done, never).min(axis=1)
+    o_time = np.where((~line_owned).all(axis=2), line_done, never).min(axis=1)
+    x_wins = int((x_time < o_time).sum())
+    o_wins = int((o_time < x_time).sum())
+    return x_wins, o_wins, count - x_wins - o_wins
+
+
+class MCTS:
+    """
+    UCT search that keeps its tree between moves.
+
+    search() first looks for the new position among the nodes up to
+    REUSE_DEPTH plies below the previous root (the engine's move and the
+    opponent's reply), and continues from that subtree if it is found.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.root = None
+
+    def _find_root(self, state):
+        """Returns the tree node for state from the previous search, detached, or None"""
+        frontier = [self.root] if self.root is not None else []
+        for _ in range(REUSE_DEPTH + 1):
+            for node in frontier:
+                if node.state == state:
+                    node.parent = None
+                    node.move = None
+                    return node
+            frontier = [child for node in frontier for child in node.children]
+        return None
+
+    def search(self, state, playouts=MCTS_PLAYOUTS[ttt.IMPOSSIBLE], time_limit=None, context=None):
+        """
+        Run UCT from state until playouts playouts are spent or time_limit
+        seconds pass. Setting the context's cancel event raises SearchCancelled.
+
+        Returns:
+            Tuple of (value, action): value is X's expected score of the chosen
+            move scaled to [-1, 1], action the most visited move
+        """
+        if context is None:
+            context = ttt.SearchContext()
+        root = self._find_root(state)
+        if root is None:
+            root = MCTSNode(state, rng=self.rng)
+        else:
+            context.reused_playouts = root.visits
+        self.root = root
+        if root.state.terminal():
+            return root.state.utility(), None
+
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        spent = 0
+        while spent < playouts:
+            if context.cancel is not None and context.cancel.is_set():
+                raise ttt.SearchCancelled()
+            if deadline is not None and spent and time.perf_counter() >= deadline:
+                break
+            # Selection and expansion
+            node = root
+            depth = 0
+            while not node.untried and node.children:
+                node = node.select_child()
+                depth += 1
+            if node.untried:
+                node = node.expand(self.rng)
+                depth += 1
+                context.nodes_explored += 1
+            context.depth_reached = max(context.depth_reached, depth)
+
+            # Simulation
+            batch_size = min(PLAYOUT_BATCH, playouts - spent)
+            win = node.state.winner()
+            if win is not None or node.state.full():
+                x_wins = batch_size if win == ttt.X else 0
+                o_wins = batch_size if win == ttt.O else 0
+            else:
+                x_wins, o_wins, _ = playout_results(node.state, batch_size, self.rng)
+            spent += batch_size
+            context.playouts += batch_size
+
+            # Backpropagation, crediting the player who moved into each node
+            x_reward = x_wins + (batch_size - x_wins - o_wins) * 0.5
+            while node is not None:
+                node.visits += batch_size
+                if node.parent is not None:
+                    mover_is_x = node.parent.state.player() == ttt.X
+                    node.reward += x_reward if mover_is_x else batch_size - x_reward
+                node = node.parent
+
+        if not root.children:
+            # No playouts were run: the first candidate move in the static order
+            shape = state.geometry
+            candidates = shape.candidate_moves(state.x, state.o)
+            return 0, shape.cells[next(index for index in shape.move_order if candidates >> index & 1)]
+        best = max(root.children, key=lambda child: child.visits)
+        mover_score = best.reward / best.visits
+        x_score = mover_score if state.player() == ttt.X else 1 - mover_score
+        return 2 * x_score - 1, state.geometry.cells[best.move]
+
+
+# One engine per board geometry, so trees are reused across moves; new
+# engines are seeded from _engine_seed (see reset_engines)
+_engines = {}
+_engine_seed = None
+
+
+def reset_engines(seed=None):
+    """
+    Drop the engines and their trees. Engines created afterwards draw their
+    playouts from random.Random(seed), so with a seed and no time limit a
+    game plays out the same every time.
+    """
+    global _engine_seed
+    _engines.clear()
+    _engine_seed = seed
+
+
+def mcts(board, difficulty=ttt.IMPOSSIBLE, win_length=None, time_limit=None, node_limit=None, cancel=None,
+         with_stats=False, engine=None):
+    """
+    MCTS counterpart of tictactoe.minimax with the same difficulty levels.
+    The difficulty sets the playout budget (node_limit overrides it), and
+    time_limit (seconds) stops the search early. engine is the MCTS to
+    search with; by default the geometry's shared engine, whose tree is kept
+    for the next move.
+
+    Returns (value, action), or (value, action, SearchContext) with with_stats;
+    the context counts playouts and tree nodes added.
+    """
+    start_time = time.time()
+    state = ttt.BitBoard.from_board(board, win_length)
+    context = ttt.SearchContext(time_limit, node_limit, cancel)
+    if engine is None:
+        engine = _engines.get(state.geometry)
+        if engine is None:
+            engine = _engines[state.geometry] = MCTS(_engine_seed)
+    playouts = node_limit if node_limit is not None else MCTS_PLAYOUTS.get(difficulty, MCTS_PLAYOUTS[ttt.IMPOSSIBLE])
+    value, action = engine.search(state, playouts, time_limit, context)
+    context.time_taken = time.time() - start_time
+    if with_stats:
+        return value, action, context
+    return value, action
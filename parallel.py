@@ -0,0 +1,209 @@
+"""
+Parallel root-split search
+Splits the root moves of a position over a process pool. Workers share the
+best score found so far through shared memory, so each root move is searched
+against the tightest bound known when it starts, and the results are merged
+into the same (value, action) as the single-process search. Workers search
+with alpha-beta or principal variation search, like iterative_deepening.
+"""
+
+import atexit
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import tictactoe as ttt
+
+# Seconds between checks of the cancel event while waiting for workers
+POLL_INTERVAL = 0.05
+
+# Shared state of the worker processes, set by _init_worker
+_shared_bound = None
+_shared_stop = None
+
+# Pool and shared values of this process, created on first use
+_pool = None
+_pool_workers = 0
+_bound = None
+_stop = None
+
+
+class _SharedFlag:
+    """Stop flag in shared memory, usable as a SearchContext cancel event"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def is_set(self):
+        return bool(self.value.value)
+
+
+def _init_worker(bound, stop):
+    global _shared_bound, _shared_stop
+    _shared_bound = bound
+    _shared_stop = stop
+
+
+def get_pool(workers=None):
+    """
+    Returns the process pool for parallel searches, creating it (or replacing
+    one of a different size) as needed. workers defaults to os.cpu_count().
+    """
+    global _pool, _pool_workers, _bound, _stop
+    workers = workers or os.cpu_count() or 1
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _bound = multiprocessing.Value("d", 0.0)
+        _stop = multiprocessing.Value("b", 0)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_bound, _stop))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+atexit.register(shutdown_pool)
+
+
+def search_root_move(job):
+    """
+    Worker: search one root move to max_depth with alpha-beta or PVS.
+
+    The child is searched with the shared bound as its window, so a result
+    that does not beat the bound is only an upper (X) or lower (O) limit.
+    Returns (index, score or None if stopped, bound used, nodes searched,
+    PVS re-searches).
+    """
+    x, o, size, win_length, index, max_depth, wall_deadline, algorithm = job
+    state = ttt.BitBoard(x, o, geometry=ttt.geometry(size, win_length))
+    maximizing = state.player() == ttt.X
+    with _shared_bound.get_lock():
+        bound = _shared_bound.value
+    alpha = bound if maximizing else float('-inf')
+    beta = float('inf') if maximizing else bound
+
+    context = ttt.SearchContext(cancel=_SharedFlag(_shared_stop), detailed=False)
+    if wall_deadline is not None:
+        context.deadline = time.perf_counter() + (wall_deadline - time.time())
+    state.geometry.transposition_table.new_search()
+    board = ttt.SearchBoard(state)
+    board.make(index)
+    try:
+        if algorithm == ttt.PVS:
+            # Negamax from the child's side to move: X's window, negated for O
+            color = 1 if maximizing else -1
+            window = (alpha, beta) if color == -1 else (-beta, -alpha)
+            score, _ = ttt._pvs(board, 1, window[0], window[1], max_depth, None, context)
+            score = -color * score
+        else:
+            score, _ = ttt._search(board, 1, not maximizing, alpha, beta, max_depth, None, context)
+    except (ttt.SearchTimeout, ttt.SearchCancelled):
+        return index, None, bound, context.nodes_explored, context.researches
+
+    with _shared_bound.get_lock():
+        if (score > _shared_bound.value) if maximizing else (score < _shared_bound.value):
+            _shared_bound.value = score
+    return index, score, bound, context.nodes_explored, context.researches
+
+
+def _search_depth(state, root_moves, depth, wall_deadline, context, pool, algorithm=ttt.ALPHA_BETA):
+    """
+    Search every root move to depth in the pool.
+    Returns {index: (score, bound)} or None if the deadline or cancel event
+    stopped the iteration.
+    """
+    maximizing = state.player() == ttt.X
+    with _bound.get_lock():
+        _bound.value = float('-inf') if maximizing else float('inf')
+    shape = state.geometry
+    jobs = [pool.submit(search_root_move, (state.x, state.o, shape.size, shape.win_length, index, depth,
+                                           wall_deadline, algorithm))
+            for index in root_moves]
+
+    results = {}
+    stopped = False
+    pending = set(jobs)
+    while pending:
+        done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        for job in done:
+            index, score, bound, nodes, researches = job.result()
+            context.nodes_explored += nodes
+            context.researches += researches
+            if score is None:
+                stopped = True
+            results[index] = (score, bound)
+        if context.cancel is not None and context.cancel.is_set() and not stopped:
+            _stop.value = 1
+            stopped = True
+    _stop.value = 0
+    if context.cancel is not None and context.cancel.is_set():
+        raise ttt.SearchCancelled()
+    return None if stopped else results
+
+
+def parallel_search(state, max_depth, context=None, workers=None, algorithm=ttt.ALPHA_BETA):
+    """
+    Iterative deepening with each iteration's root moves split over a
+    process pool of workers processes.
+
+    Root moves are submitted best first (the previous iteration's move, then
+    the static order), and each is searched against the best score the
+    workers have found so far. The deepest iteration that finished within
+    the context's time_limit gives the result. node_limit is checked between
+    iterations. The value matches the single-process search; when several
+    moves share the best value, any of them may be returned. algorithm is
+    ttt.ALPHA_BETA or ttt.PVS, the search each worker runs on its root move.
+
+    Returns:
+        Tuple of (best_score, best_action)
+    """
+    if context is None:
+        context = ttt.SearchContext()
+    if state.terminal():
+        return ttt.iterative_deepening(state, max_depth, context, algorithm)
+    pool = get_pool(workers)
+    shape = state.geometry
+    maximizing = state.player() == ttt.X
+    candidates = shape.candidate_moves(state.x, state.o)
+    root_moves = [index for index in shape.move_order if candidates >> index & 1]
+    wall_deadline = time.time() + context.time_limit if context.time_limit is not None else None
+
+    max_depth = min(max_depth, len(shape.cells) - state.ply)
+    value, action = None, None
+    for depth in range(1, max_depth + 1):
+        iteration_start = time.perf_counter()
+        nodes_before = context.nodes_explored
+        results = _search_depth(state, root_moves, depth, wall_deadline if depth > 1 else None, context, pool,
+                                algorithm)
+        if results is None:
+            break
+
+        # Only scores that beat the bound they were searched with are exact
+        best_index = None
+        for index in root_moves:
+            score, bound = results[index]
+            if (score <= bound) if maximizing else (score >= bound):
+                continue
+            if best_index is None or ((score > value) if maximizing else (score < value)):
+                value, best_index = score, index
+        action = shape.cells[best_index]
+        root_moves.remove(best_index)
+        root_moves.insert(0, best_index)
+
+        context.depth_completed = depth
+        context.iterations.append({
+            "depth": depth,
+            "time": time.perf_counter() - iteration_start,
+            "nodes": context.nodes_explored - nodes_before,
+        })
+        if context.node_limit is not None and context.nodes_explored >= context.node_limit:
+            break
+    return value, action
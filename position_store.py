@@ -0,0 +1,282 @@
+"""
+On-disk position store for the larger boards
+Exact values and best moves of solved positions, in a file indexed by the
+base-3 rank of the board (empty=0, X=1, O=2 per cell) like the 3x3 solved
+table. Each position takes ENTRY_SIZE bytes at a fixed offset, so a lookup is
+one read from a read-only mmap: nothing is loaded up front, and processes
+that open the same file share its pages.
+
+The store is built backwards from the full board, one layer of positions at
+a time, writing straight into the mapped file; ranks that are never written
+stay holes in a sparse file. A store built down to min_ply covers every
+position with at least min_ply pieces (an endgame table); min_ply 0 solves
+the whole game.
+
+Usage:
+    python position_store.py --size 4                  Solve 4x4 into positions_4x4_4.bin
+    python position_store.py --size 4 --min-ply 10     Only positions with 10+ pieces
+    python position_store.py --size 4 --check 200      Compare 200 entries with search
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from itertools import combinations
+
+import tictactoe as ttt
+
+MAGIC = b"TTPS"
+VERSION = 1
+# magic, version, size, win_length, min_ply, padded to 16 bytes
+HEADER = struct.Struct("<4sBBBB8x")
+
+# Entry: value + VALUE_OFFSET, then best move index + 1; two zero bytes mean
+# the position is not stored
+ENTRY_SIZE = 2
+VALUE_OFFSET = 64
+
+# Largest file the base-3 index may need (a 4x4 store is 86 MB of address space)
+MAX_STORE_BYTES = 1 << 32
+
+
+def store_size(shape):
+    """Bytes of a store file for a geometry"""
+    return HEADER.size + ENTRY_SIZE * 3 ** len(shape.cells)
+
+
+def rank_tables(cell_count):
+    """Base-3 weights of each byte of a cell mask: tables[k][b] for bits 8k..8k+7"""
+    return [[sum(3 ** (8 * k + bit) for bit in range(8) if b >> bit & 1 and 8 * k + bit < cell_count)
+             for b in range(256)]
+            for k in range(-(-cell_count // 8))]
+
+
+class PositionStore:
+    """
+    A read-only store file. lookup() returns (value, move index) for stored
+    positions, with value scored like minimax: 1 + win_bonus - d for an X win
+    d plies away, the negative for O, 0 for a draw.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            magic, version, size, win_length, min_ply = HEADER.unpack(fh.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} position store")
+            self.geometry = ttt.geometry(size, win_length)
+            if os.fstat(fh.fileno()).st_size != store_size(self.geometry):
+                raise ValueError(f"{path} is truncated")
+            self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.min_ply = min_ply
+        self.tables = rank_tables(len(self.geometry.cells))
+
+    def rank(self, x, o):
+        """Base-3 rank of a position given as bitboard masks"""
+        rank = 0
+        for k, table in enumerate(self.tables):
+            rank += table[x >> 8 * k & 255] + 2 * table[o >> 8 * k & 255]
+        return rank
+
+    def lookup(self, state):
+        """(value, move index or None) of a BitBoard, or None if it is not stored"""
+        if state.ply < self.min_ply or state.geometry is not self.geometry:
+            return None
+        offset = HEADER.size + ENTRY_SIZE * self.rank(state.x, state.o)
+        value, move = self.data[offset], self.data[offset + 1]
+        if not value and not move:
+            return None
+        return value - VALUE_OFFSET, (move - 1 if move else None)
+
+    def close(self):
+        self.data.close()
+
+
+def open_store(path):
+    """Open a store file, or return None if it is missing or malformed"""
+    try:
+        return PositionStore(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def layer_positions(shape, ply):
+    """
+    Yield (x, o) for every position with ply pieces where X moves first and
+    at most the player who moved last has a line.
+    """
+    bits = [1 << index for index in range(len(shape.cells))]
+    x_count = (ply + 1) // 2
+    x_last = ply % 2 == 1
+    for occupied in combinations(bits, ply):
+        occupied_mask = sum(occupied)
+        for x_bits in combinations(occupied, x_count):
+            x = sum(x_bits)
+            o = occupied_mask ^ x
+            if shape.has_line(o if x_last else x):
+                continue
+            yield x, o
+
+
+def build_store(path, size, win_length=None, min_ply=0, progress=None):
+    """
+    Solve every position with at least min_ply pieces into a store file.
+
+    Layers are solved from the full board back to min_ply; a position's value
+    comes from its children's entries, already written to the mapped file, so
+    memory use does not grow with the number of positions. The file is written
+    next to path and renamed into place when complete. progress(ply, count)
+    is called after each layer.
+
+    Returns the number of positions stored.
+    """
+    shape = ttt.geometry(size, win_length)
+    cell_count = len(shape.cells)
+    total = store_size(shape)
+    if total > MAX_STORE_BYTES:
+        raise ValueError(f"A {size}x{size} store needs {total:,} bytes; the base-3 index is too large")
+    powers = [3 ** index for index in range(cell_count)]
+    tables = rank_tables(cell_count)
+    move_order = shape.move_order
+    win_score = 1 + shape.win_bonus
+
+    temp_path = path + ".tmp"
+    stored = 0
+    with open(temp_path, "wb+") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, size, shape.win_length, min_ply))
+        fh.truncate(total)
+        data = mmap.mmap(fh.fileno(), total)
+        try:
+            for ply in range(cell_count, min_ply - 1, -1):
+                count = 0
+                x_to_move = ply % 2 == 0
+                for x, o in layer_positions(shape, ply):
+                    rank = 0
+                    for k, table in enumerate(tables):
+                        rank += table[x >> 8 * k & 255] + 2 * table[o >> 8 * k & 255]
+                    offset = HEADER.size + ENTRY_SIZE * rank
+
+                    if shape.has_line(x):
+                        value, best = win_score, None
+                    elif shape.has_line(o):
+                        value, best = -win_score, None
+                    elif ply == cell_count:
+                        value, best = 0, None
+                    else:
+                        # Children are one ply further on: wins move one step closer to 0
+                        weight = 1 if x_to_move else 2
+                        occupied = x | o
+                        value = best = None
+                        for index in move_order:
+                            if occupied >> index & 1:
+                                continue
+                            child = HEADER.size + ENTRY_SIZE * (rank + weight * powers[index])
+                            score = data[child] - VALUE_OFFSET
+                            score = score - 1 if score > 0 else score + 1 if score < 0 else 0
+                            if value is None or (score > value if x_to_move else score < value):
+                                value, best = score, index
+
+                    data[offset] = value + VALUE_OFFSET
+                    data[offset + 1] = best + 1 if best is not None else 0
+                    count += 1
+                stored += count
+                if progress is not None:
+                    progress(ply, count)
+            data.flush()
+        finally:
+            data.close()
+    os.replace(temp_path, path)
+    ttt.position_stores.pop(shape, None)  # reopen on next use
+    return stored
+
+
+def search_value(state):
+    """
+    Value of a BitBoard by full-depth search over every move, as the store
+    has it. The candidate-move restriction of larger boards is switched off
+    for the search, and the transposition table is cleared around it so its
+    entries never mix with the restricted search's.
+    """
+    shape = state.geometry
+    restrict_moves = shape.restrict_moves
+    shape.restrict_moves = False
+    shape.transposition_table.clear()
+    try:
+        value, _ = ttt._search(ttt.SearchBoard(state), 0, state.player() == ttt.X, float('-inf'), float('inf'),
+                               len(shape.cells), None, ttt.SearchContext(detailed=False))
+    finally:
+        shape.restrict_moves = restrict_moves
+        shape.transposition_table.clear()
+    return value
+
+
+def check_store(store, samples=100, seed=0):
+    """
+    Compare random stored positions with a full-depth search.
+    Returns a list of problems, empty if the store agrees.
+    """
+    shape = store.geometry
+    rng = random.Random(seed)
+    problems = []
+    checked = 0
+    while checked < samples:
+        state = ttt.BitBoard(geometry=shape)
+        for index in rng.sample(range(len(shape.cells)), len(shape.cells)):
+            if state.ply >= store.min_ply and rng.random() < 0.3 or state.terminal():
+                break
+            state = state.play(index)
+        if state.ply < store.min_ply or state.terminal():
+            continue
+        checked += 1
+        value, move = store.lookup(state)
+        searched = search_value(state)
+        child = store.lookup(state.play(move))
+        child_value = child[0] - 1 if child[0] > 0 else child[0] + 1 if child[0] < 0 else 0
+        if searched != value or child_value != value:
+            problems.append(f"{state}: store {value} (move {move} -> {child_value}), search {searched}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check an on-disk position store")
+    parser.add_argument("--size", type=int, default=4, help="board size")
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--min-ply", type=int, default=0, help="store positions with at least this many pieces")
+    parser.add_argument("--output", help="store file (default: the file minimax looks for)")
+    parser.add_argument("--check", type=int, metavar="N",
+                        help="compare N random entries of an existing store with search instead of building")
+    args = parser.parse_args(argv)
+
+    shape = ttt.geometry(args.size, args.win_length)
+    path = args.output or ttt.position_store_path(shape)
+
+    if args.check is not None:
+        store = open_store(path)
+        if store is None:
+            print(f"❌ {path} is missing or malformed")
+            return 1
+        problems = check_store(store, args.check)
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        if problems:
+            print(f"❌ {len(problems)} of {args.check} entries disagree with search")
+            return 1
+        print(f"✓ {args.check} entries match full-depth search")
+        return 0
+
+    start = time.perf_counter()
+
+    def progress(ply, count):
+        print(f"  ply {ply:>2}: {count:>10,} positions  ({time.perf_counter() - start:.0f}s)")
+
+    stored = build_store(path, args.size, args.win_length, args.min_ply, progress)
+    print(f"✓ Wrote {stored:,} positions to {path} in {time.perf_counter() - start:.0f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,30 @@
-import pygame
+"""
+Tic Tac Toe game interface
+The pygame GUI, or a terminal game with --headless. pygame is only imported
+by main(), so this module (and the engine) can be imported without it.
+
+Usage:
+    python runner.py
+    python runner.py --size 5 --difficulty hard
+    python runner.py --headless --play-as O
+    python runner.py --log games.ttgl        Keep the game log in another file
+    python runner.py --no-log                Neither load nor record games
+"""
+
+import argparse
+import os
 import sys
 import time
 import math
+from functools import partial
 
 import tictactoe as ttt
 import config
+import mcts
+import game_log
+from ai_worker import AIWorker
 
-pygame.init()
+pygame = None  # imported by init_display()
 size = width, height = config.WINDOW_WIDTH, config.WINDOW_HEIGHT
 
 # Load colors from config
@@ -28,20 +46,29 @@ orange = config.COLORS['orange']
 bg_start = config.COLORS['background_start']
 bg_end = config.COLORS['background_end']
 
-screen = pygame.display.set_mode(size)
-pygame.display.set_caption(config.WINDOW_TITLE)
+# Display objects, created by init_display()
+screen = None
+clock = None
+regions = None
 
-# Load fonts from config
-smallFont = pygame.font.Font("OpenSans-Regular.ttf", config.FONT_SIZES['small'])
-mediumFont = pygame.font.Font("OpenSans-Regular.ttf", config.FONT_SIZES['medium'])
-largeFont = pygame.font.Font("OpenSans-Regular.ttf", config.FONT_SIZES['large'])
-xlFont = pygame.font.Font("OpenSans-Regular.ttf", config.FONT_SIZES['xlarge'])
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", config.FONT_SIZES['move'])
+# Fonts by config.FONT_SIZES name, loaded on first use
+FONT_FILE = "OpenSans-Regular.ttf"
+fonts = {}
+
+def font(name):
+    """Return the font of size config.FONT_SIZES[name], loading it on first use"""
+    loaded = fonts.get(name)
+    if loaded is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        loaded = fonts[name] = pygame.font.Font(FONT_FILE, config.FONT_SIZES[name])
+    return loaded
 
 # Game state variables
+board_size = config.BOARD_SIZE
+win_length = config.WIN_LENGTH
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(board_size)
 difficulty = ttt.IMPOSSIBLE
 game_stats = {"user_wins": 0, "ai_wins": 0, "ties": 0}
 show_stats = config.FEATURES['show_stats_default']
@@ -51,6 +78,164 @@ animations = config.FEATURES['animations_enabled']
 thinking_animation = 0
 last_move = None
 move_history = []
+prefetch_hints = config.FEATURES['prefetch_hints']
+hint_position = None
+hint_moves = []
+result_recorded = False
+
+# Background AI searches: move and hint searches both run on the worker thread
+ai_worker = None       # AIWorker, started by main()
+ai_job = None          # job id of the running AI move search
+ai_result = None       # finished (value, move) waiting for the minimum display time
+ai_started = 0         # when the AI started thinking about its move
+ai_move_stats = ttt.get_ai_stats()
+hint_job = None        # job id of the running hint search
+hint_job_position = None
+
+# Pondering: during the user's turn the AI searches its replies to the user's
+# likely moves, so a matching click gets its answer without a new search
+pondering = config.FEATURES['pondering']
+ponder_position = None  # board the ponder searches were queued for
+ponder_jobs = {}        # job id -> user move whose reply it searches
+ponder_results = {}     # user move -> finished (value, move, context)
+last_ponder_hit = None  # whether the AI's last move came from pondering (None: not pondering)
+
+# Finished games are appended to the game log (config.GAME_LOG_FILE unless
+# main() is given another path), and game_stats starts from the totals of
+# the games already there
+log_writer = None      # GameLogWriter, opened by main()
+game_started = 0       # when the current game started
+ai_think_time = 0.0    # seconds the AI has searched in the current game
+
+def board_position(board):
+    """Hashable key for a board"""
+    return tuple(tuple(row) for row in board)
+
+def get_hints(board):
+    """Return the hint moves for board; the search runs once per position on the AI worker"""
+    global hint_job, hint_job_position
+    position = board_position(board)
+    if position == hint_position:
+        return hint_moves
+    if position != hint_job_position:
+        cancel_hints()
+        hint_job = ai_worker.submit(ttt.get_best_moves, [row[:] for row in board], 2, win_length)
+        hint_job_position = position
+    return []
+
+def cancel_hints():
+    """Drop a hint search that is no longer needed"""
+    global hint_job, hint_job_position
+    if hint_job is not None:
+        ai_worker.cancel(hint_job)
+    hint_job = None
+    hint_job_position = None
+
+def cancel_ai():
+    """Cancel any running AI move, hint or ponder search"""
+    global ai_job, ai_result
+    ai_worker.cancel()
+    ai_job = None
+    ai_result = None
+    cancel_hints()
+    cancel_pondering()
+
+def ai_search(board, ponder=False):
+    """
+    The AI's move search for board as (search, args, kwargs), following
+    config.AI_SETTINGS. A ponder search with MCTS gets an engine of its own,
+    so it leaves the tree of the game's real moves alone.
+    """
+    args = ([row[:] for row in board], difficulty, win_length)
+    if config.AI_SETTINGS['engine'] == 'mcts':
+        kwargs = {"time_limit": config.AI_SETTINGS['time_limit'], "with_stats": True}
+        if ponder:
+            kwargs["engine"] = mcts.MCTS()
+        return mcts.mcts, args, kwargs
+    return ttt.minimax, args, {
+        "time_limit": config.AI_SETTINGS['time_limit'],
+        "node_limit": config.AI_SETTINGS['node_limit'],
+        "workers": config.AI_SETTINGS['workers'],
+        "algorithm": config.AI_SETTINGS['algorithm'],
+        "with_stats": True,
+    }
+
+def submit_ai_search(board, ponder=False):
+    """Queue the AI's move search (or ponder search) for board on the worker and return its job id"""
+    search, args, kwargs = ai_search(board, ponder)
+    return ai_worker.submit(search, *args, **kwargs)
+
+def start_pondering(board, hints):
+    """
+    Queue the AI's searches of the positions after the user's likely moves:
+    the hint moves first, then the rest in the engine's move order, up to
+    AI_SETTINGS['ponder_moves'] moves. The worker runs them in that order.
+    """
+    global ponder_position
+    ponder_position = board_position(board)
+    state = ttt.BitBoard.from_board(board, win_length)
+    shape = state.geometry
+    candidates = shape.candidate_moves(state.x, state.o)
+    moves = list(hints)
+    moves += [shape.cells[index] for index in shape.move_order
+              if candidates >> index & 1 and shape.cells[index] not in moves]
+    for move in moves[:config.AI_SETTINGS['ponder_moves']]:
+        after = ttt.result(board, move)
+        if not ttt.terminal(after, win_length):
+            ponder_jobs[submit_ai_search(after, ponder=True)] = move
+
+def cancel_pondering(keep=None):
+    """Drop the ponder searches, except a running one for the user move keep"""
+    global ponder_position
+    for job_id, move in ponder_jobs.items():
+        if move != keep:
+            ai_worker.cancel(job_id)
+    ponder_jobs.clear()
+    ponder_results.clear()
+    ponder_position = None
+
+def take_ponder_reply(move):
+    """
+    After the user plays move, use the ponder search of that position: its
+    finished result right away, or the search itself if it is still running.
+    The other ponder searches are discarded.
+    """
+    global ai_job, ai_result, ai_started, ai_move_stats, last_ponder_hit
+    if not pondering:
+        return
+    last_ponder_hit = False
+    if move in ponder_results:
+        value, reply, context = ponder_results[move]
+        ai_result = (value, reply)
+        ai_move_stats = context.as_dict()
+        ai_started = time.time()
+        last_ponder_hit = True
+    else:
+        for job_id, pondered in ponder_jobs.items():
+            if pondered == move:
+                ai_job = job_id
+                ai_started = time.time()
+                last_ponder_hit = True
+    cancel_pondering(keep=move)
+
+def collect_ai_results():
+    """Pick up searches the worker has finished"""
+    global ai_job, ai_result, ai_move_stats, hint_job, hint_job_position, hint_position, hint_moves
+    for result in ai_worker.poll():
+        if result.error is not None:
+            raise result.error
+        if result.job_id == ai_job:
+            ai_job = None
+            value, move, context = result.value
+            ai_result = (value, move)
+            ai_move_stats = context.as_dict()
+        elif result.job_id == hint_job:
+            hint_position = hint_job_position
+            hint_moves = result.value
+            hint_job = None
+            hint_job_position = None
+        elif result.job_id in ponder_jobs:
+            ponder_results[ponder_jobs.pop(result.job_id)] = result.value
 
 def draw_gradient_background(surface, start_color, end_color):
     """Draw a vertical gradient background"""
@@ -61,6 +246,99 @@ def draw_gradient_background(surface, start_color, end_color):
         b = int(start_color[2] * (1 - ratio) + end_color[2] * ratio)
         pygame.draw.line(surface, (r, g, b), (0, y), (width, y))
 
+# Rendered text surfaces keyed by (text, font, color)
+text_cache = {}
+TEXT_CACHE_SIZE = 256
+
+def render_text(text, font, color):
+    """Render text once and reuse the surface on later frames"""
+    key = (text, id(font), color)
+    surface = text_cache.get(key)
+    if surface is None:
+        if len(text_cache) >= TEXT_CACHE_SIZE:
+            text_cache.clear()
+        surface = text_cache[key] = font.render(text, True, color)
+    return surface
+
+class ScreenRegions:
+    """
+    Redraws only the parts of the screen whose content changed.
+
+    Every frame, each region is declared in draw order with add(): a name, the
+    rect it covers, a key describing its content and a draw callback. flush()
+    compares the keys with the previous frame, restores the pre-rendered
+    background under regions that changed or disappeared, redraws those regions
+    plus any region overlapping them (to keep the stacking order), and pushes
+    only those rects to the display.
+    """
+
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.previous = {}
+        self.current = []
+        self.full_redraw = True
+
+    def add(self, name, rect, key, draw):
+        """Declare a region for this frame"""
+        self.current.append((name, pygame.Rect(rect), key, draw))
+
+    def flush(self):
+        """Redraw the changed regions and update them on the display"""
+        if self.full_redraw:
+            self.surface.blit(self.background, (0, 0))
+            for _, _, _, draw in self.current:
+                draw()
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            dirty = set()
+            dirty_rects = []
+            current_names = set()
+            for name, rect, key, _ in self.current:
+                current_names.add(name)
+                old = self.previous.get(name)
+                if old != (rect, key):
+                    dirty.add(name)
+                    dirty_rects.append(rect)
+                    if old is not None and old[0] != rect:
+                        dirty_rects.append(old[0])
+            for name, (rect, _) in self.previous.items():
+                if name not in current_names:
+                    dirty_rects.append(rect)
+
+            # Regions overlapping a redrawn area are redrawn too
+            grown = True
+            while grown:
+                grown = False
+                for name, rect, _, _ in self.current:
+                    if name not in dirty and rect.collidelist(dirty_rects) != -1:
+                        dirty.add(name)
+                        dirty_rects.append(rect)
+                        grown = True
+
+            for rect in dirty_rects:
+                self.surface.blit(self.background, rect, rect)
+            for name, _, _, draw in self.current:
+                if name in dirty:
+                    draw()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+
+        self.previous = {name: (rect, key) for name, rect, key, _ in self.current}
+        self.current = []
+
+def add_button(name, rect, text, font, text_color, bg_color, border_color=None, hover=False):
+    """Declare a button region"""
+    regions.add(name, rect.inflate(4, 4), (text, bg_color, border_color, hover),
+                partial(draw_button, screen, rect, text, font, text_color, bg_color, border_color, hover))
+
+def add_text(name, text, font, color, **position):
+    """Declare a text region positioned like Surface.get_rect(**position)"""
+    text_surface = render_text(text, font, color)
+    rect = text_surface.get_rect(**position)
+    regions.add(name, rect, (text, color), partial(screen.blit, text_surface, rect))
+
 def draw_button(surface, rect, text, font, text_color, bg_color, border_color=None, hover=False):
     """Draw an enhanced button with hover effects"""
     if hover:
@@ -71,19 +349,20 @@ def draw_button(surface, rect, text, font, text_color, bg_color, border_color=No
     if border_color:
         pygame.draw.rect(surface, border_color, rect, width=2, border_radius=8)
     
-    text_surface = font.render(text, True, text_color)
+    text_surface = render_text(text, font, text_color)
     text_rect = text_surface.get_rect(center=rect.center)
     surface.blit(text_surface, text_rect)
 
 def draw_enhanced_board(surface, board, tiles, last_move=None):
     """Draw the game board with enhanced graphics"""
     # Draw board background
+    size = len(board)
     board_rect = pygame.Rect(tiles[0][0].left - 10, tiles[0][0].top - 10, 
-                           3 * tiles[0][0].width + 20, 3 * tiles[0][0].height + 20)
+                           size * tiles[0][0].width + 20, size * tiles[0][0].height + 20)
     pygame.draw.rect(surface, dark_gray, board_rect, border_radius=10)
     
-    for i in range(3):
-        for j in range(3):
+    for i in range(size):
+        for j in range(size):
             rect = tiles[i][j]
             # Highlight last move
             if last_move and last_move == (i, j):
@@ -122,12 +401,12 @@ def draw_thinking_animation(surface, center, frame):
 
 def draw_stats_panel(surface):
     """Draw game statistics panel"""
-    panel_rect = pygame.Rect(width - 200, 10, 180, 150)
+    panel_rect = pygame.Rect(STATS_PANEL_RECT)
     pygame.draw.rect(surface, dark_gray, panel_rect, border_radius=10)
     pygame.draw.rect(surface, white, panel_rect, width=2, border_radius=10)
     
     # Title
-    title = smallFont.render("Game Stats", True, white)
+    title = render_text("Game Stats", font('small'), white)
     surface.blit(title, (panel_rect.x + 10, panel_rect.y + 10))
     
     # Stats
@@ -145,32 +424,50 @@ def draw_stats_panel(surface):
         elif i == 1 and game_stats['ai_wins'] > 0:
             color = light_red
         
-        text_surface = smallFont.render(text, True, color)
+        text_surface = render_text(text, font('small'), color)
         surface.blit(text_surface, (panel_rect.x + 10, panel_rect.y + 40 + i * 25))
 
+STATS_PANEL_RECT = (width - 200, 10, 180, 150)
+AI_INFO_PANEL_RECT = (10, height - 140, 300, 120)
+
+def ai_info_text():
+    """Lines shown in the AI information panel"""
+    stats = ai_move_stats
+    if stats.get('playouts'):
+        return [
+            f"Playouts: {stats['playouts']} (+{stats['reused_playouts']} reused)",
+            f"Time: {stats['time_taken']:.3f}s  Depth: {stats['depth_reached']}",
+            f"Tree nodes added: {stats['nodes_explored']}",
+        ]
+    return [
+        f"Nodes explored: {stats['nodes_explored']}",
+        f"Time: {stats['time_taken']:.3f}s  Depth: {stats['depth_completed']}",
+        f"Prunings: {stats['prunings']} ({stats['first_move_cutoff_rate']:.0%} first move)",
+        f"Table hits/misses: {stats['tt_hits']}/{stats['tt_misses']}"
+    ]
+
+def ai_info_title():
+    """Title of the AI information panel, with the last move's ponder result"""
+    if last_ponder_hit is None:
+        return "AI Analysis"
+    return f"AI Analysis - ponder {'hit' if last_ponder_hit else 'miss'}"
+
 def draw_ai_info_panel(surface):
     """Draw AI information panel"""
     if not show_ai_info:
         return
         
-    panel_rect = pygame.Rect(10, height - 120, 300, 100)
+    panel_rect = pygame.Rect(AI_INFO_PANEL_RECT)
     pygame.draw.rect(surface, dark_gray, panel_rect, border_radius=10)
     pygame.draw.rect(surface, white, panel_rect, width=2, border_radius=10)
     
     # Title
-    title = smallFont.render("AI Analysis", True, white)
+    title = render_text(ai_info_title(), font('small'), white)
     surface.blit(title, (panel_rect.x + 10, panel_rect.y + 10))
     
     # AI stats
-    stats = ttt.get_ai_stats()
-    info_text = [
-        f"Nodes explored: {stats['nodes_explored']}",
-        f"Time: {stats['time_taken']:.3f}s",
-        f"Prunings: {stats['prunings']}"
-    ]
-    
-    for i, text in enumerate(info_text):
-        text_surface = smallFont.render(text, True, white)
+    for i, text in enumerate(ai_info_text()):
+        text_surface = render_text(text, font('small'), white)
         surface.blit(text_surface, (panel_rect.x + 10, panel_rect.y + 35 + i * 20))
 
 def check_button_hover(mouse_pos, rect):
@@ -182,13 +479,9 @@ def handle_menu_screen():
     global user, difficulty
     
     # Draw title with glow effect
-    title = xlFont.render("Tic-Tac-Toe AI", True, gold)
-    title_rect = title.get_rect(center=(width // 2, 80))
-    screen.blit(title, title_rect)
-
-    subtitle = mediumFont.render("Powered by Minimax Algorithm & Alpha-Beta Pruning", True, light_blue)
-    subtitle_rect = subtitle.get_rect(center=(width // 2, 120))
-    screen.blit(subtitle, subtitle_rect)
+    add_text("menu_title", "Tic-Tac-Toe AI", font('xlarge'), gold, center=(width // 2, 80))
+    add_text("menu_subtitle", "Powered by Minimax Algorithm & Alpha-Beta Pruning", font('medium'), light_blue,
+             center=(width // 2, 120))
     
     # Player selection buttons
     mouse_pos = pygame.mouse.get_pos()
@@ -199,8 +492,8 @@ def handle_menu_screen():
     x_hover = check_button_hover(mouse_pos, playXButton)
     o_hover = check_button_hover(mouse_pos, playOButton)
     
-    draw_button(screen, playXButton, "Play as X", mediumFont, white, red, white, x_hover)
-    draw_button(screen, playOButton, "Play as O", mediumFont, white, blue, white, o_hover)
+    add_button("play_x", playXButton, "Play as X", font('medium'), white, red, white, x_hover)
+    add_button("play_o", playOButton, "Play as O", font('medium'), white, blue, white, o_hover)
     
     # Difficulty selection
     diff_y = 300
@@ -214,209 +507,397 @@ def handle_menu_screen():
         
         hover = check_button_hover(mouse_pos, button_rect)
         border_color = gold if diff == difficulty else white
-        draw_button(screen, button_rect, diff, smallFont, white, color, border_color, hover)
+        add_button(f"difficulty_{diff}", button_rect, diff, font('small'), white, color, border_color, hover)
     
     # Options
     stats_button = pygame.Rect(width // 2 - 100, 380, 200, 40)
     stats_hover = check_button_hover(mouse_pos, stats_button)
-    draw_button(screen, stats_button, "Toggle Stats", smallFont, white, dark_gray, white, stats_hover)
+    add_button("toggle_stats", stats_button, "Toggle Stats", font('small'), white, dark_gray, white, stats_hover)
     
     ai_info_button = pygame.Rect(width // 2 - 100, 430, 200, 40)
     ai_info_hover = check_button_hover(mouse_pos, ai_info_button)
-    draw_button(screen, ai_info_button, "Toggle AI Info", smallFont, white, dark_gray, white, ai_info_hover)
+    add_button("toggle_ai_info", ai_info_button, "Toggle AI Info", font('small'), white, dark_gray, white, ai_info_hover)
     
     return playXButton, playOButton, diff_buttons, stats_button, ai_info_button
 
-while True:
-    # Handle events
-    click = False
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            click = True
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r:  # Reset game
-                user = None
-                board = ttt.initial_state()
-                ai_turn = False
-                last_move = None
-                move_history = []
-            elif event.key == pygame.K_h:  # Toggle hints
-                hint_mode = not hint_mode
-            elif event.key == pygame.K_s:  # Toggle stats
-                show_stats = not show_stats
-            elif event.key == pygame.K_i:  # Toggle AI info
-                show_ai_info = not show_ai_info
-
-    # Update thinking animation
-    thinking_animation += 1
-
-    # Draw gradient background
-    draw_gradient_background(screen, bg_start, bg_end)
-
-    # Main menu screen
-    if user is None:
-        playXButton, playOButton, diff_buttons, stats_button, ai_info_button = handle_menu_screen()
-        
-        if click:
-            mouse = pygame.mouse.get_pos()
-            if playXButton.collidepoint(mouse):
-                time.sleep(0.1)
-                user = ttt.X
-                move_history = []
-            elif playOButton.collidepoint(mouse):
-                time.sleep(0.1)
-                user = ttt.O
-                move_history = []
-            elif stats_button.collidepoint(mouse):
-                show_stats = not show_stats
-                time.sleep(0.1)
-            elif ai_info_button.collidepoint(mouse):
-                show_ai_info = not show_ai_info
-                time.sleep(0.1)
-            
-            # Check difficulty buttons
-            for button_rect, diff in diff_buttons:
-                if button_rect.collidepoint(mouse):
-                    difficulty = diff
-                    time.sleep(0.1)
-                    break
-
+def draw_game_area(board, tiles, last_move, hints, thinking_frame):
+    """Draw the board, hint outlines and the thinking animation"""
+    draw_enhanced_board(screen, board, tiles, last_move)
+    for i, move in enumerate(hints):
+        row, col = move
+        if board[row][col] == ttt.EMPTY:
+            color = light_green if i == 0 else light_blue
+            pygame.draw.rect(screen, color, tiles[row][col], 4, border_radius=5)
+    if thinking_frame is not None:
+        draw_thinking_animation(screen, THINKING_CENTER, thinking_frame)
+
+def init_display():
+    """Import pygame and open the window; fonts are loaded as they are first used"""
+    global pygame, screen, clock, regions
+    import pygame
+    pygame.display.init()
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption(config.WINDOW_TITLE)
+    clock = pygame.time.Clock()
+
+    # Pre-rendered background; regions restore it instead of redrawing the gradient
+    background = pygame.Surface(size)
+    draw_gradient_background(background, bg_start, bg_end)
+    regions = ScreenRegions(screen, background)
+
+THINKING_CENTER = (width // 2, 180)
+THINKING_RECT = (THINKING_CENTER[0] - 40, THINKING_CENTER[1] - 40, 80, 80)
+
+HELP_TEXT = [
+    "Controls:",
+    "R - Reset Game",
+    "H - Toggle Hints",
+    "S - Toggle Stats",
+    "I - Toggle AI Info",
+    "P - Toggle Pondering"
+]
+
+def new_game():
+    """Clear the board and any search for the previous game"""
+    global board, last_move, move_history, result_recorded, last_ponder_hit, game_started, ai_think_time
+    board = ttt.initial_state(board_size)
+    cancel_ai()
+    last_ponder_hit = None
+    last_move = None
+    move_history = []
+    result_recorded = False
+    game_started = time.time()
+    ai_think_time = 0.0
+
+def open_game_log(path):
+    """Open the game log at path, adding the results of the games already in it to game_stats"""
+    global log_writer
+    path = os.path.expanduser(path)
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            with game_log.GameLog(path) as log:
+                for key, count in game_log.player_stats(log.tally()).items():
+                    game_stats[key] += count
+        log_writer = game_log.GameLogWriter(path)
+    except (OSError, ValueError) as error:
+        print(f"Not keeping a game log: {error}")
+
+def record_game(human):
+    """Append the finished game, the person playing human, to the game log"""
+    if log_writer is None:
+        return
+    ai = game_log.Player(config.AI_SETTINGS['engine'], difficulty)
+    duration = time.time() - game_started
+    human_time = max(duration - ai_think_time, 0.0)
+    if human == ttt.X:
+        players, times = (game_log.HUMAN, ai), (human_time, ai_think_time)
     else:
-        # Game screen
-        game_over = ttt.terminal(board)
-        current_player = ttt.player(board)
-
-        # Draw game board
-        tile_size = 100
-        tile_origin = (width / 2 - (1.5 * tile_size), height / 2 - (1.5 * tile_size))
-        tiles = []
-        for i in range(3):
-            row = []
-            for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                row.append(rect)
-            tiles.append(row)
-
-        draw_enhanced_board(screen, board, tiles, last_move)
-
-        # Show game status
-        if game_over:
-            winner = ttt.winner(board)
-            if winner is None:
-                title_text = "Game Over: Tie!"
-                title_color = gold
-                game_stats["ties"] += 1
-            else:
-                if winner == user:
-                    title_text = f"You Win! ({winner})"
-                    title_color = light_green
-                    game_stats["user_wins"] += 1
-                else:
-                    title_text = f"AI Wins! ({winner})"
-                    title_color = light_red
-                    game_stats["ai_wins"] += 1
-        elif user == current_player:
-            title_text = f"Your Turn ({user})"
-            title_color = light_blue
-        else:
-            title_text = "AI Thinking..."
-            title_color = purple
-            # Draw thinking animation
-            if animations:
-                draw_thinking_animation(screen, (width // 2, 180), thinking_animation)
-
-        title = largeFont.render(title_text, True, title_color)
-        title_rect = title.get_rect(center=(width // 2, 80))
-        screen.blit(title, title_rect)
-
-        # AI move logic
-        if user != current_player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                value, move = ttt.minimax(board, difficulty)
-                if move:
-                    board = ttt.result(board, move)
-                    last_move = move
-                    move_history.append((current_player, move))
-                ai_turn = False
-            else:
-                ai_turn = True
-
-        # Handle user moves
-        if click and user == current_player and not game_over:
-            mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse):
-                        board = ttt.result(board, (i, j))
-                        last_move = (i, j)
-                        move_history.append((user, (i, j)))
-                        break
-
-        # Draw hint system
-        if hint_mode and not game_over and user == current_player:
-            best_moves = ttt.get_best_moves(board, 2)
-            for i, move in enumerate(best_moves):
-                row, col = move
-                rect = tiles[row][col]
-                if board[row][col] == ttt.EMPTY:
-                    color = light_green if i == 0 else light_blue
-                    pygame.draw.rect(screen, color, rect, 4, border_radius=5)
-
-        # Game over screen
-        if game_over:
-            # Play again button
-            again_button = pygame.Rect(width // 2 - 100, height - 120, 200, 50)
-            mouse_pos = pygame.mouse.get_pos()
-            again_hover = check_button_hover(mouse_pos, again_button)
-            draw_button(screen, again_button, "Play Again", mediumFont, white, green, white, again_hover)
-            
-            # Menu button
-            menu_button = pygame.Rect(width // 2 - 100, height - 60, 200, 40)
-            menu_hover = check_button_hover(mouse_pos, menu_button)
-            draw_button(screen, menu_button, "Main Menu", smallFont, white, dark_gray, white, menu_hover)
-            
+        players, times = (ai, game_log.HUMAN), (ai_think_time, human_time)
+    log_writer.write(game_log.game_record(move_history, board_size, win_length, *players,
+                                          game_started, duration, *times))
+    log_writer.flush()
+
+def run_gui():
+    """The pygame frame loop; returns when the window is closed"""
+    global user, board, difficulty, show_stats, show_ai_info, hint_mode, pondering, thinking_animation
+    global last_move, move_history, result_recorded, ai_job, ai_result, ai_started, game_started, ai_think_time
+
+    while True:
+        # Handle events
+        click = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                click = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:  # Reset game
+                    user = None
+                    new_game()
+                elif event.key == pygame.K_h:  # Toggle hints
+                    hint_mode = not hint_mode
+                elif event.key == pygame.K_s:  # Toggle stats
+                    show_stats = not show_stats
+                elif event.key == pygame.K_i:  # Toggle AI info
+                    show_ai_info = not show_ai_info
+                elif event.key == pygame.K_p:  # Toggle pondering
+                    pondering = not pondering
+                    if not pondering:
+                        cancel_pondering()
+
+        # Pick up finished background searches
+        collect_ai_results()
+
+        # Update thinking animation
+        thinking_animation += 1
+
+        # Main menu screen
+        if user is None:
+            playXButton, playOButton, diff_buttons, stats_button, ai_info_button = handle_menu_screen()
+        
             if click:
                 mouse = pygame.mouse.get_pos()
-                if again_button.collidepoint(mouse):
-                    board = ttt.initial_state()
-                    ai_turn = False
-                    last_move = None
+                if playXButton.collidepoint(mouse):
+                    time.sleep(0.1)
+                    user = ttt.X
                     move_history = []
+                    game_started = time.time()
+                elif playOButton.collidepoint(mouse):
                     time.sleep(0.1)
-                elif menu_button.collidepoint(mouse):
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
-                    last_move = None
+                    user = ttt.O
                     move_history = []
+                    game_started = time.time()
+                elif stats_button.collidepoint(mouse):
+                    show_stats = not show_stats
                     time.sleep(0.1)
+                elif ai_info_button.collidepoint(mouse):
+                    show_ai_info = not show_ai_info
+                    time.sleep(0.1)
+            
+                # Check difficulty buttons
+                for button_rect, diff in diff_buttons:
+                    if button_rect.collidepoint(mouse):
+                        difficulty = diff
+                        time.sleep(0.1)
+                        break
 
-        # Draw side panels
-        if show_stats:
-            draw_stats_panel(screen)
-        
-        draw_ai_info_panel(screen)
-
-        # Draw controls help
-        help_text = [
-            "Controls:",
-            "R - Reset Game",
-            "H - Toggle Hints",
-            "S - Toggle Stats",
-            "I - Toggle AI Info"
-        ]
+        else:
+            # Game screen
+            game_over = ttt.terminal(board, win_length)
+            current_player = ttt.player(board)
+
+            # Lay out game board
+            tile_size = config.TILE_SIZE * 3 // board_size
+            tile_origin = (width / 2 - (board_size / 2 * tile_size), height / 2 - (board_size / 2 * tile_size))
+            tiles = []
+            for i in range(board_size):
+                row = []
+                for j in range(board_size):
+                    rect = pygame.Rect(
+                        tile_origin[0] + j * tile_size,
+                        tile_origin[1] + i * tile_size,
+                        tile_size, tile_size
+                    )
+                    row.append(rect)
+                tiles.append(row)
+
+            # Show game status
+            thinking_frame = None
+            if game_over:
+                winner = ttt.winner(board, win_length)
+                if winner is None:
+                    title_text = "Game Over: Tie!"
+                    title_color = gold
+                    result_key = "ties"
+                else:
+                    if winner == user:
+                        title_text = f"You Win! ({winner})"
+                        title_color = light_green
+                        result_key = "user_wins"
+                    else:
+                        title_text = f"AI Wins! ({winner})"
+                        title_color = light_red
+                        result_key = "ai_wins"
+                if not result_recorded:
+                    game_stats[result_key] += 1
+                    result_recorded = True
+                    record_game(user)
+            elif user == current_player:
+                title_text = f"Your Turn ({user})"
+                title_color = light_blue
+            else:
+                title_text = "AI Thinking..."
+                title_color = purple
+                # Draw thinking animation
+                if animations:
+                    thinking_frame = thinking_animation
+
+            add_text("status", title_text, font('large'), title_color, center=(width // 2, 80))
+
+            # AI move logic
+            if user != current_player and not game_over:
+                if ai_job is None and ai_result is None:
+                    # Start the search in the background; the frame loop keeps running
+                    ai_started = time.time()
+                    ai_job = submit_ai_search(board)
+                elif ai_result is not None and time.time() - ai_started >= config.ANIMATION_SETTINGS['move_delay']:
+                    # Show the thinking animation for at least move_delay seconds
+                    value, move = ai_result
+                    ai_result = None
+                    if move:
+                        board = ttt.result(board, move)
+                        last_move = move
+                        move_history.append((current_player, move))
+                        ai_think_time += ai_move_stats['time_taken']
+
+            # Handle user moves
+            if click and user == current_player and not game_over:
+                mouse = pygame.mouse.get_pos()
+                for i in range(board_size):
+                    for j in range(board_size):
+                        if board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse):
+                            cancel_hints()
+                            board = ttt.result(board, (i, j))
+                            last_move = (i, j)
+                            move_history.append((user, (i, j)))
+                            take_ponder_reply((i, j))
+                            break
+
+            # Hint system (hints are searched once per position, as soon as it is the user's turn)
+            best_moves = []
+            if (hint_mode or prefetch_hints or pondering) and not game_over and user == current_player:
+                best_moves = get_hints(board)
+                # Ponder in hint order once the hints are in
+                if pondering and hint_position == board_position(board) and ponder_position != hint_position:
+                    start_pondering(board, hint_moves)
+            shown_hints = tuple(best_moves) if hint_mode else ()
+
+            # Board region, including the thinking animation that overlaps it
+            board_rect = pygame.Rect(tiles[0][0].left - 10, tiles[0][0].top - 10,
+                                     board_size * tile_size + 20, board_size * tile_size + 20)
+            if thinking_frame is not None:
+                board_rect = board_rect.union(pygame.Rect(THINKING_RECT))
+            regions.add("board", board_rect, (board_position(board), last_move, shown_hints, thinking_frame),
+                        partial(draw_game_area, [row[:] for row in board], tiles, last_move, shown_hints,
+                                thinking_frame))
+
+            # Game over screen
+            if game_over:
+                # Play again button
+                again_button = pygame.Rect(width // 2 - 100, height - 120, 200, 50)
+                mouse_pos = pygame.mouse.get_pos()
+                again_hover = check_button_hover(mouse_pos, again_button)
+                add_button("play_again", again_button, "Play Again", font('medium'), white, green, white, again_hover)
+            
+                # Menu button
+                menu_button = pygame.Rect(width // 2 - 100, height - 60, 200, 40)
+                menu_hover = check_button_hover(mouse_pos, menu_button)
+                add_button("main_menu", menu_button, "Main Menu", font('small'), white, dark_gray, white, menu_hover)
+            
+                if click:
+                    mouse = pygame.mouse.get_pos()
+                    if again_button.collidepoint(mouse):
+                        new_game()
+                        time.sleep(0.1)
+                    elif menu_button.collidepoint(mouse):
+                        user = None
+                        new_game()
+                        time.sleep(0.1)
+
+            # Draw side panels
+            if show_stats:
+                regions.add("stats_panel", STATS_PANEL_RECT, (tuple(game_stats.values()), difficulty),
+                            partial(draw_stats_panel, screen))
         
-        for i, text in enumerate(help_text):
-            color = light_gray if i == 0 else white
-            font = smallFont if i == 0 else smallFont
-            text_surface = font.render(text, True, color)
-            screen.blit(text_surface, (10, 10 + i * 20))
-
-    pygame.display.flip()
+            if show_ai_info:
+                regions.add("ai_info_panel", AI_INFO_PANEL_RECT, (ai_info_title(), tuple(ai_info_text())),
+                            partial(draw_ai_info_panel, screen))
+
+            # Draw controls help
+            for i, text in enumerate(HELP_TEXT):
+                color = light_gray if i == 0 else white
+                add_text(f"help_{i}", text, font('small'), color, topleft=(10, 10 + i * 20))
+
+        regions.flush()
+        clock.tick(config.FRAME_RATE)
+
+def format_board(board):
+    """Text rendering of a board for the terminal"""
+    return "\n".join(" ".join(cell or "." for cell in row) for row in board)
+
+def play_headless(play_as=ttt.X):
+    """
+    Play one game in the terminal without pygame. Moves are typed as
+    "row col", counting from 0; an empty line or the end of input quits.
+    """
+    global board, move_history, game_started, ai_think_time
+    game_started = time.time()
+    ai_think_time = 0.0
+    print(f"Tic Tac Toe {board_size}x{board_size} on {difficulty}; you play {play_as}")
+    while not ttt.terminal(board, win_length):
+        print(format_board(board))
+        current_player = ttt.player(board)
+        if current_player == play_as:
+            try:
+                line = input(f"Your move ({play_as}) as row col: ")
+            except EOFError:
+                return
+            if not line.strip():
+                return
+            try:
+                move = tuple(int(part) for part in line.replace(",", " ").split())
+            except ValueError:
+                move = None
+            if move not in ttt.actions(board):
+                print(f"Enter an empty cell as row col, from 0 to {board_size - 1}")
+                continue
+        else:
+            search, args, kwargs = ai_search(board)
+            value, move, context = search(*args, **kwargs)
+            stats = context.as_dict()
+            print(f"AI plays {move[0]} {move[1]} ({stats['nodes_explored']} nodes, {stats['time_taken']:.3f}s)")
+            ai_think_time += stats['time_taken']
+        board = ttt.result(board, move)
+        move_history.append((current_player, move))
+
+    print(format_board(board))
+    winner = ttt.winner(board, win_length)
+    if winner is None:
+        print("Game Over: Tie!")
+        game_stats["ties"] += 1
+    elif winner == play_as:
+        print(f"You Win! ({winner})")
+        game_stats["user_wins"] += 1
+    else:
+        print(f"AI Wins! ({winner})")
+        game_stats["ai_wins"] += 1
+    record_game(play_as)
+
+def main(argv=None):
+    """Entry point of the game: the pygame GUI, or a terminal game with --headless"""
+    global board_size, win_length, difficulty, board, ai_worker
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe against the AI")
+    parser.add_argument("--headless", action="store_true", help="play in the terminal, without pygame")
+    parser.add_argument("--size", type=int, default=None, help=f"board size (default: {config.BOARD_SIZE})")
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--difficulty", type=str.upper, default=difficulty,
+                        choices=[ttt.EASY, ttt.MEDIUM, ttt.HARD, ttt.IMPOSSIBLE])
+    parser.add_argument("--play-as", type=str.upper, default=ttt.X, choices=[ttt.X, ttt.O],
+                        help="your symbol in headless mode")
+    parser.add_argument("--log", metavar="PATH", default=config.GAME_LOG_FILE,
+                        help="file to record games in and load past results from (default: %(default)s)")
+    parser.add_argument("--no-log", action="store_true", help="do not load or record games")
+    args = parser.parse_args(argv)
+
+    if args.size is not None:
+        board_size = args.size
+        win_length = args.win_length
+    elif args.win_length is not None:
+        win_length = args.win_length
+    try:
+        ttt.geometry(board_size, win_length)
+    except ValueError as error:
+        parser.error(str(error))
+    difficulty = args.difficulty
+    board = ttt.initial_state(board_size)
+
+    if args.log is not None and not args.no_log:
+        open_game_log(args.log)
+    try:
+        if args.headless:
+            play_headless(args.play_as)
+            return 0
+        ai_worker = AIWorker()
+        init_display()
+        run_gui()
+    finally:
+        if log_writer is not None:
+            log_writer.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+"""
+Headless move server for many concurrent games
+An asyncio server speaking line-delimited JSON over TCP or stdio. Requests
+that arrive in the same event-loop tick are answered as one batch: repeated
+positions are searched once, finished Impossible positions come from a cache
+shared by every session, and searches run in a process pool so the event loop
+never blocks.
+
+Request:  {"id": 1, "board": [["X", null, null], [null, "O", null], [null, null, null]],
+           "difficulty": "HARD", "win_length": null, "time_limit": 1.0, "node_limit": null}
+Response: {"id": 1, "move": [0, 2], "value": 0, "stats": {"nodes": 812, "depth": 7, "time": 0.004,
+           "cached": false}}
+Errors are answered as {"id": 1, "error": "..."}; {"op": "stats"} returns
+the server counters.
+
+Usage:
+    python server.py serve --port 8765
+    python server.py serve --stdio
+    python server.py load --clients 50 --requests 200
+    python server.py load --port 8765 --size 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import tictactoe as ttt
+from tournament import LATENCY_PERCENTILES, percentile
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Results kept in the shared position cache
+DEFAULT_CACHE_SIZE = 100000
+
+DIFFICULTIES = (ttt.EASY, ttt.MEDIUM, ttt.HARD, ttt.IMPOSSIBLE)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_request(request):
+    """
+    Validate a move request.
+    Returns the search job (board, difficulty, win_length, time_limit, node_limit);
+    raises ValueError for a malformed request.
+    """
+    board = request.get("board")
+    if not isinstance(board, list) or not board or any(
+            not isinstance(row, list) or len(row) != len(board) for row in board):
+        raise ValueError("board must be a square list of rows")
+    if any(cell not in (ttt.X, ttt.O, ttt.EMPTY) for row in board for cell in row):
+        raise ValueError(f"cells must be {ttt.X!r}, {ttt.O!r} or null")
+    x_count = sum(row.count(ttt.X) for row in board)
+    o_count = sum(row.count(ttt.O) for row in board)
+    if x_count - o_count not in (0, 1):
+        raise ValueError("X moves first, so X must have as many pieces as O or one more")
+
+    difficulty = str(request.get("difficulty", ttt.IMPOSSIBLE)).upper()
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+    win_length = request.get("win_length")
+    if win_length is not None and not _is_int(win_length):
+        raise ValueError("win_length must be an integer or null")
+    time_limit = request.get("time_limit", config.AI_SETTINGS['time_limit'])
+    if time_limit is not None and (not _is_number(time_limit) or not 0 < time_limit < float('inf')):
+        raise ValueError("time_limit must be a positive number of seconds or null")
+    node_limit = request.get("node_limit", config.AI_SETTINGS['node_limit'])
+    if node_limit is not None and (not _is_int(node_limit) or node_limit < 1):
+        raise ValueError("node_limit must be a positive integer or null")
+    ttt.geometry(len(board), win_length)  # raises ValueError for an unsupported size
+    return board, difficulty, win_length, time_limit, node_limit
+
+
+def job_key(job):
+    """Hashable key of a search job"""
+    board, difficulty, win_length, time_limit, node_limit = job
+    return tuple(tuple(row) for row in board), difficulty, win_length, time_limit, node_limit
+
+
+def solve(job):
+    """Run one search job. Returns (value, move, stats)"""
+    board, difficulty, win_length, time_limit, node_limit = job
+    if ttt.terminal(board, win_length):
+        return ttt.utility(board, win_length), None, {"nodes": 0, "depth": 0, "time": 0.0}
+    value, move, context = ttt.minimax(board, difficulty, win_length, time_limit, node_limit,
+                                       detailed_stats=False, with_stats=True)
+    stats = {"nodes": context.nodes_explored, "depth": context.depth_completed, "time": context.time_taken}
+    return value, move, stats
+
+
+def solve_batch(jobs):
+    """
+    Worker: run a list of search jobs, returning (result, error message)
+    pairs. A job that fails only fails its own request.
+    """
+    results = []
+    for job in jobs:
+        try:
+            results.append((solve(job), None))
+        except ValueError as error:
+            results.append((None, str(error)))
+        except Exception as error:
+            results.append((None, f"search failed: {error}"))
+    return results
+
+
+def is_light(job):
+    """True for jobs answered without a search: finished games and solved-table positions"""
+    board, difficulty, win_length, _, _ = job
+    if ttt.terminal(board, win_length):
+        return True
+    state = ttt.BitBoard.from_board(board, win_length)
+    return difficulty == ttt.IMPOSSIBLE and ttt.solved_position(state) is not None
+
+
+class MoveServer:
+    """
+    Answers move requests from every connection.
+
+    Requests queue up until the end of the current event-loop tick; the batch
+    is then deduplicated by position, light jobs are answered inline and the
+    rest are split over the process pool in one chunk per worker. Impossible
+    results are cached (the other levels make random slips, which a cache
+    would freeze).
+    """
+
+    def __init__(self, workers=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.pending = []  # (key, job, future) waiting for the next batch
+        self.counters = {"requests": 0, "errors": 0, "batches": 0, "cache_hits": 0,
+                         "deduplicated": 0, "inline": 0, "searches": 0}
+
+    def close(self):
+        self.pool.shutdown()
+
+    async def handle(self, request):
+        """Answer one decoded request with a response dict"""
+        if request.get("op") == "stats":
+            return {"id": request.get("id"), "stats": dict(self.counters, cache_entries=len(self.cache))}
+        self.counters["requests"] += 1
+        try:
+            job = parse_request(request)
+        except ValueError as error:
+            self.counters["errors"] += 1
+            return {"id": request.get("id"), "error": str(error)}
+
+        key = job_key(job)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            result, error = cached, None
+            stats = dict(result[2], cached=True)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            if not self.pending:
+                asyncio.get_running_loop().call_soon(self._flush)
+            self.pending.append((key, job, future))
+            result, error = await future
+            stats = dict(result[2], cached=False) if result is not None else None
+
+        if error is not None:
+            self.counters["errors"] += 1
+            return {"id": request.get("id"), "error": error}
+        value, move, _ = result
+        return {"id": request.get("id"), "move": list(move) if move else None, "value": value, "stats": stats}
+
+    def _flush(self):
+        """Answer the requests queued during this tick as one batch"""
+        batch, self.pending = self.pending, []
+        self.counters["batches"] += 1
+        waiters = OrderedDict()
+        for key, job, future in batch:
+            if key in waiters:
+                self.counters["deduplicated"] += 1
+                waiters[key][1].append(future)
+            else:
+                waiters[key] = (job, [future])
+
+        heavy = []
+        for key, (job, futures) in waiters.items():
+            if is_light(job):
+                self.counters["inline"] += 1
+                self._resolve(key, job, solve_batch([job])[0], futures)
+            else:
+                heavy.append((key, job, futures))
+        self.counters["searches"] += len(heavy)
+        chunk_size = max(1, -(-len(heavy) // self.workers))
+        for start in range(0, len(heavy), chunk_size):
+            asyncio.ensure_future(self._run_chunk(heavy[start:start + chunk_size]))
+
+    async def _run_chunk(self, chunk):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, solve_batch, [job for _, job, _ in chunk])
+        except Exception as error:  # e.g. a worker process died
+            results = [(None, f"search failed: {error}")] * len(chunk)
+        for (key, job, futures), outcome in zip(chunk, results):
+            self._resolve(key, job, outcome, futures)
+
+    def _resolve(self, key, job, outcome, futures):
+        result, error = outcome
+        if error is None and job[1] == ttt.IMPOSSIBLE:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        for future in futures:
+            if not future.done():
+                future.set_result(outcome)
+
+
+async def serve_lines(server, reader, write):
+    """
+    Answer each JSON line from reader through write(bytes). Requests of one
+    session are handled concurrently, so responses may come back out of order;
+    clients match them by id.
+    """
+    tasks = set()
+
+    async def answer(line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as error:
+            response = {"id": None, "error": f"bad request: {error}"}
+        else:
+            try:
+                response = await server.handle(request)
+            except Exception as error:  # every request line gets an answer
+                response = {"id": request.get("id"), "error": f"request failed: {error}"}
+        await write((json.dumps(response) + "\n").encode())
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.ensure_future(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def start_tcp_server(server, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start serving TCP connections; returns the asyncio.Server"""
+    async def connection(reader, writer):
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+        try:
+            await serve_lines(server, reader, write)
+        except (asyncio.CancelledError, ConnectionError):
+            pass  # server shutting down or client gone
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(connection, host, port)
+
+
+async def serve_stdio(server):
+    """Answer requests from stdin on stdout until stdin closes"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def write(data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    await serve_lines(server, reader, write)
+
+
+def random_positions(count, size=3, win_length=None, seed=0):
+    """Seeded non-terminal positions reached by random play, for load tests"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = ttt.initial_state(size)
+        for _ in range(rng.randrange(len(board) * len(board))):
+            next_board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            if ttt.terminal(next_board, win_length):
+                break
+            board = next_board
+        positions.append(board)
+    return positions
+
+
+async def run_load(host, port, clients=10, requests=100, size=3, win_length=None,
+                   difficulty=ttt.IMPOSSIBLE, time_limit=None, seed=0):
+    """
+    Send requests move requests from each of clients concurrent connections,
+    one at a time per connection.
+
+    Returns:
+        Report dict with requests per second, latency percentiles
+        (milliseconds) and the server's counters
+    """
+    positions = random_positions(max(1, min(clients * requests, 1000)), size, win_length, seed)
+    latencies = []
+    errors = 0
+
+    async def client(number):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in range(requests):
+                board = positions[(number * requests + i) % len(positions)]
+                request = {"id": i, "board": board, "difficulty": difficulty, "win_length": win_length}
+                if time_limit is not None:
+                    request["time_limit"] = time_limit
+                start = time.perf_counter()
+                writer.write((json.dumps(request) + "\n").encode())
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+                if "error" in response:
+                    errors += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    wall_time = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "stats"}\n')
+    server_stats = json.loads(await reader.readline())["stats"]
+    writer.close()
+    await writer.wait_closed()
+
+    latencies.sort()
+    report = {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_time": wall_time,
+        "requests_per_second": len(latencies) / wall_time if wall_time else None,
+        "server": server_stats,
+    }
+    for percent in LATENCY_PERCENTILES:
+        report[f"p{percent}_ms"] = percentile(latencies, percent) * 1000
+    return report
+
+
+def format_load_report(report):
+    """Human-readable summary of a load report"""
+    server = report["server"]
+    return "\n".join([
+        f"{report['requests']} requests from {report['clients']} clients in {report['wall_time']:.2f}s: "
+        f"{report['requests_per_second']:,.0f} requests/s, {report['errors']} errors",
+        f"  latency p50 {report['p50_ms']:.2f}ms  p95 {report['p95_ms']:.2f}ms  p99 {report['p99_ms']:.2f}ms",
+        f"  server: {server['batches']} batches, {server['cache_hits']} cache hits, "
+        f"{server['deduplicated']} deduplicated, {server['inline']} inline, {server['searches']} searches",
+    ])
+
+
+async def _load_local(args):
+    """Run the load generator against args.port, or against a server started here"""
+    if args.port is not None:
+        return await run_load(args.host, args.port, args.clients, args.requests, args.size,
+                              args.win_length, args.difficulty, args.time_limit, args.seed)
+    server = MoveServer(args.workers)
+    tcp = await start_tcp_server(server, args.host, 0)
+    try:
+        port = tcp.sockets[0].getsockname()[1]
+        return await run_load(args.host, port, args.clients, args.requests, args.size,
+                              args.win_length, args.difficulty, args.time_limit, args.seed)
+    finally:
+        tcp.close()
+        await tcp.wait_closed()
+        server.close()
+
+
+async def _serve(args):
+    server = MoveServer(args.workers, args.cache_size)
+    try:
+        if args.stdio:
+            await serve_stdio(server)
+            return
+        tcp = await start_tcp_server(server, args.host, args.port)
+        print(f"✓ Serving moves on {args.host}:{args.port}", file=sys.stderr)
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve AI moves over line-delimited JSON")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    serve = commands.add_parser("serve", help="run the move server")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--stdio", action="store_true", help="read requests from stdin instead of TCP")
+    serve.add_argument("--workers", type=int, default=None, help="search processes (default: all CPUs)")
+    serve.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+
+    load = commands.add_parser("load", help="measure throughput and latency of a server")
+    load.add_argument("--host", default=DEFAULT_HOST)
+    load.add_argument("--port", type=int, default=None, help="server to load (default: start one here)")
+    load.add_argument("--workers", type=int, default=None, help="processes of the local server")
+    load.add_argument("--clients", type=int, default=10)
+    load.add_argument("--requests", type=int, default=100, help="requests per client")
+    load.add_argument("--size", type=int, default=3, help="board size")
+    load.add_argument("--win-length", type=int, default=None)
+    load.add_argument("--difficulty", default=ttt.IMPOSSIBLE, type=str.upper, choices=DIFFICULTIES)
+    load.add_argument("--time-limit", type=float, default=None, help="seconds per move")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    report = asyncio.run(_load_local(args))
+    print(format_load_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"✓ Wrote {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
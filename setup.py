@@ -20,6 +20,9 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/tictactoe-ai",
     packages=find_packages(),
+    py_modules=["runner", "tictactoe", "config", "ai_worker", "transposition", "solver", "parallel", "mcts",
+                "batch", "tournament", "benchmark", "server", "position_store",
+                "analysis", "game_log"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Education",
@@ -45,4 +48,7 @@ setup(
     package_data={
         "": ["*.ttf", "*.md", "*.txt"],
     },
+    # The modules are not a package, so package_data never applies to them;
+    # the solved table goes to <prefix>/share/tictactoe-ai (see tictactoe._data_file)
+    data_files=[("share/tictactoe-ai", ["solved_positions.bin"])],
 )
@@ -0,0 +1,143 @@
+"""
+Retrograde solver for Tic Tac Toe
+Computes the exact value and the optimal moves of every reachable position by
+working backwards from the final positions, and stores them in the table that
+tictactoe.py loads at import.
+
+Usage:
+    python solver.py            Regenerate solved_positions.bin
+    python solver.py --check    Verify the shipped table against a fresh solve
+"""
+
+import argparse
+import sys
+from array import array
+
+import tictactoe as ttt
+
+
+def board_key(board):
+    """Hashable key for a list-of-lists board"""
+    return tuple(tuple(row) for row in board)
+
+
+def reachable_layers():
+    """
+    Returns the reachable positions grouped by number of moves played.
+    layers[n] maps board_key -> board for every position after n moves.
+    """
+    layers = [{board_key(ttt.initial_state()): ttt.initial_state()}]
+    while True:
+        next_layer = {}
+        for board in layers[-1].values():
+            if ttt.terminal(board):
+                continue
+            for action in ttt.actions(board):
+                child = ttt.result(board, action)
+                next_layer.setdefault(board_key(child), child)
+        if not next_layer:
+            return layers
+        layers.append(next_layer)
+
+
+def value_from_child(value):
+    """A child's value seen from its parent: wins are one move further away"""
+    if value > 0:
+        return value - 1
+    elif value < 0:
+        return value + 1
+    return value
+
+
+def solve():
+    """
+    Solve every reachable position bottom-up.
+    Returns a dict mapping board_key -> (board, value, optimal_actions), where
+    value matches minimax(board, IMPOSSIBLE) including the quicker-win bonus.
+    """
+    solution = {}
+    for layer in reversed(reachable_layers()):
+        for key, board in layer.items():
+            if ttt.terminal(board):
+                solution[key] = (board, ttt.utility(board) * ttt.SOLVED_VALUE_OFFSET, [])
+                continue
+            scores = []
+            for action in ttt.actions(board):
+                child_value = solution[board_key(ttt.result(board, action))][1]
+                scores.append((action, value_from_child(child_value)))
+            pick = max if ttt.player(board) == ttt.X else min
+            best = pick(score for _, score in scores)
+            optimal = sorted(action for action, score in scores if score == best)
+            solution[key] = (board, best, optimal)
+    return solution
+
+
+def build_table(solution):
+    """Pack a solution into the base-3 indexed table used by tictactoe.py"""
+    table = array("H", [ttt.UNSOLVED]) * (3 ** len(ttt.CELLS))
+    for board, value, optimal in solution.values():
+        moves_mask = 0
+        for i, j in optimal:
+            moves_mask |= 1 << ttt.CELLS.index((i, j))
+        table[ttt.position_rank(ttt.BitBoard.from_board(board))] = ttt.encode_solved(value, moves_mask)
+    return table
+
+
+def write_table(table, path=ttt.SOLVED_TABLE_PATH):
+    """Write the table as little-endian 16-bit entries"""
+    data = array("H", table)
+    if sys.byteorder == "big":
+        data.byteswap()
+    with open(path, "wb") as fh:
+        fh.write(data.tobytes())
+
+
+def check_table(solution, path=ttt.SOLVED_TABLE_PATH):
+    """
+    Compare the table on disk with a fresh solve and with full-depth search.
+    Returns a list of problems, empty if the table is correct.
+    """
+    problems = []
+    shipped = ttt.load_solved_table(path)
+    if shipped is None:
+        return [f"{path} is missing or malformed"]
+    if shipped != build_table(solution):
+        problems.append(f"{path} does not match a fresh solve")
+
+    for board, value, optimal in solution.values():
+        if ttt.terminal(board):
+            continue
+        maximizing = ttt.player(board) == ttt.X
+        search_value, search_action = ttt.minimax_with_depth(board, 0, maximizing, max_depth=9)
+        if search_value != value or search_action not in optimal:
+            problems.append(f"search disagrees on {board}: {search_value} {search_action}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve Tic Tac Toe and write the position table")
+    parser.add_argument("--check", action="store_true",
+                        help="verify the shipped table instead of rewriting it")
+    parser.add_argument("--output", default=ttt.SOLVED_TABLE_PATH, help="table file path")
+    args = parser.parse_args(argv)
+
+    solution = solve()
+    print(f"Solved {len(solution)} reachable positions")
+
+    if args.check:
+        problems = check_table(solution, args.output)
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        if problems:
+            print(f"❌ {len(problems)} problems found")
+            return 1
+        print("✓ Table matches the solve and full-depth search")
+        return 0
+
+    write_table(build_table(solution), args.output)
+    print(f"✓ Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -112,11 +112,934 @@ def test_winning_detection():
     
     print("\n✅ Winning detection tests passed!")
 
+def reachable_positions():
+    """Collect every board reachable from the initial state"""
+    seen = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = str(board)
+        if key in seen:
+            continue
+        seen[key] = board
+        if not ttt.terminal(board):
+            stack.extend(ttt.result(board, action) for action in ttt.actions(board))
+    return list(seen.values())
+
+def test_bitboard_matches_list_board():
+    """Test the bitboard state against the list-of-lists functions"""
+    print("\n\nTesting BitBoard Representation")
+    print("=" * 50)
+    
+    positions = reachable_positions()
+    assert len(positions) == 5478
+    for board in positions:
+        state = ttt.BitBoard.from_board(board)
+        assert state.to_board() == board
+        assert state.player() == ttt.player(board)
+        assert state.winner() == ttt.winner(board)
+        assert state.terminal() == ttt.terminal(board)
+        assert state.utility() == ttt.utility(board)
+        assert sorted(ttt.CELLS[index] for index in state.actions()) == sorted(ttt.actions(board))
+    print(f"✓ {len(positions)} reachable positions agree")
+    
+    state = ttt.BitBoard().play(4)
+    assert state.to_board() == ttt.result(ttt.initial_state(), (1, 1))
+    try:
+        state.play(4)
+        assert False, "Playing an occupied cell should fail"
+    except ValueError:
+        print("✓ Occupied cell rejected")
+
+def reference_value(board, depth, cache):
+    """Plain minimax without pruning or tables, using the engine's depth bonus"""
+    key = (str(board), depth)
+    if key not in cache:
+        if ttt.terminal(board):
+            score = ttt.utility(board)
+            cache[key] = score + (10 - depth) * score
+        else:
+            values = [reference_value(ttt.result(board, action), depth + 1, cache)
+                      for action in ttt.actions(board)]
+            cache[key] = max(values) if ttt.player(board) == ttt.X else min(values)
+    return cache[key]
+
+def test_transposition_table():
+    """Test that the symmetry-aware transposition table keeps play optimal"""
+    print("\n\nTesting Transposition Table")
+    print("=" * 50)
+    
+    symmetry = ttt.board_symmetry
+    state = ttt.BitBoard.from_board([[ttt.X, None, None],
+                                     [None, ttt.O, None],
+                                     [None, None, None]])
+    keys = set()
+    for index in range(8):
+        rotated = ttt.BitBoard(symmetry.transform(index, state.x), symmetry.transform(index, state.o))
+        keys.add(symmetry.canonical(rotated.x, rotated.o)[0])
+    assert len(keys) == 1
+    print("✓ All 8 symmetries share one key")
+    
+    cache = {}
+    ttt.transposition_table.clear()
+    for board in reachable_positions():
+        if ttt.terminal(board):
+            continue
+        ttt.reset_ai_stats()
+        value, move = ttt.minimax_with_depth(board, 0, ttt.player(board) == ttt.X)
+        assert board[move[0]][move[1]] is None
+        assert value == reference_value(board, 0, cache)
+        assert reference_value(ttt.result(board, move), 1, cache) == value
+    stats = ttt.get_ai_stats()
+    assert stats["tt_hits"] > 0
+    print("✓ Optimal value and move for every position with a warm table")
+    
+    table = ttt.TranspositionTable(size=4)
+    for key in range(100):
+        table.store(key, 0, 1, ttt.EXACT, 0)
+    assert len(table) == 4
+    print("✓ Table size is bounded")
+
+def test_solved_table():
+    """Test the shipped retrograde solution"""
+    print("\n\nTesting Solved Position Table")
+    print("=" * 50)
+    
+    import solver
+    solution = solver.solve()
+    assert len(solution) == 5478
+    assert solver.check_table(solution) == []
+    print("✓ Shipped table matches a fresh solve and full-depth search")
+    
+    ttt.reset_ai_stats()
+    value, move = ttt.minimax(ttt.initial_state(), ttt.IMPOSSIBLE)
+    assert value == 0 and move == (1, 1)
+    assert ttt.get_ai_stats()["nodes_explored"] == 0
+    print("✓ IMPOSSIBLE play is a table lookup")
+    
+    # X to move can win at (0, 2); the hint must lead with it
+    board = [[ttt.X, ttt.X, None],
+             [ttt.O, ttt.O, None],
+             [None, None, None]]
+    assert ttt.get_best_moves(board, 1) == [(0, 2)]
+    print("✓ Hints come from exact values")
+    
+    # An installed copy finds the table under <prefix>/share/tictactoe-ai
+    import os
+    import sys
+    import tempfile
+    assert ttt._data_file("solved_positions.bin") == ttt.SOLVED_TABLE_PATH
+    prefix = sys.prefix
+    with tempfile.TemporaryDirectory() as directory:
+        installed = os.path.join(directory, "share", "tictactoe-ai", "installed_only.bin")
+        os.makedirs(os.path.dirname(installed))
+        open(installed, "wb").close()
+        try:
+            sys.prefix = directory
+            assert ttt._data_file("installed_only.bin") == installed
+        finally:
+            sys.prefix = prefix
+    print("✓ Table file is found in the checkout or the installed share directory")
+
+def test_larger_boards():
+    """Test the generalized m,n,k engine on larger boards"""
+    print("\n\nTesting Larger Boards")
+    print("=" * 50)
+    
+    import random
+    rng = random.Random(7)
+    for size, expected_lines in ((4, 10), (5, 28), (7, 60)):
+        shape = ttt.geometry(size)
+        assert len(shape.lines) == expected_lines
+        for _ in range(200):
+            board = ttt.initial_state(size)
+            for _ in range(rng.randrange(size * size)):
+                if ttt.terminal(board):
+                    break
+                board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            state = ttt.BitBoard.from_board(board)
+            assert state.winner() == ttt.winner(board)
+            assert state.terminal() == ttt.terminal(board)
+            assert state.to_board() == board
+        print(f"✓ {size}x{size} with {shape.win_length} in a row: {expected_lines} lines, bitboard agrees")
+    
+    # O must block X's four on 7x7 (five in a row wins)
+    board = ttt.initial_state(7)
+    for move in [(3, 1), (3, 0), (3, 2), (0, 6), (3, 3), (6, 0), (3, 4)]:
+        board = ttt.result(board, move)
+    value, move = ttt.minimax(board, ttt.IMPOSSIBLE)
+    assert move == (3, 5)
+    print("✓ 7x7 AI blocks the four")
+    
+    board = ttt.initial_state(4)
+    for move in [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)]:
+        board = ttt.result(board, move)
+    assert ttt.get_best_moves(board, 1) == [(0, 3)]
+    print("✓ 4x4 hint finds the block")
+
+def test_iterative_deepening():
+    """Test the time and node budgets of the iterative-deepening search"""
+    print("\n\nTesting Iterative Deepening")
+    print("=" * 50)
+    
+    board = ttt.initial_state(7)
+    board = ttt.result(board, (3, 3))
+    
+    value, move = ttt.minimax(board, ttt.IMPOSSIBLE, node_limit=2000)
+    stats = ttt.get_ai_stats()
+    assert move is not None and board[move[0]][move[1]] is None
+    assert stats["depth_completed"] >= 1
+    assert stats["nodes_explored"] <= 2001
+    assert [it["depth"] for it in stats["iterations"]] == list(range(1, stats["depth_completed"] + 1))
+    print(f"✓ Node budget: depth {stats['depth_completed']} in {stats['nodes_explored']} nodes")
+    
+    value, move = ttt.minimax(board, ttt.IMPOSSIBLE, time_limit=0.2)
+    stats = ttt.get_ai_stats()
+    assert move is not None
+    assert stats["time_taken"] < 1.0
+    print(f"✓ Time budget: depth {stats['depth_completed']} in {stats['time_taken']:.3f}s")
+    
+    # Without a budget every depth is searched to completion
+    ttt.reset_ai_stats()
+    state = ttt.BitBoard.from_board(ttt.result(ttt.initial_state(), (0, 0)))
+    value, move = ttt.iterative_deepening(state, 8)
+    assert ttt.get_ai_stats()["depth_completed"] == 8
+    assert value == 0 and move == (1, 1)
+    print("✓ Unbounded search completes every depth")
+
+def test_multipv_hints():
+    """Test that the single-pass multi-PV search scores the top moves exactly"""
+    print("\n\nTesting Multi-PV Hints")
+    print("=" * 50)
+    
+    import random
+    rng = random.Random(3)
+    for size in (3, 4, 5):
+        for _ in range(10):
+            board = ttt.initial_state(size)
+            for _ in range(rng.randrange(size * size // 2)):
+                board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            if ttt.terminal(board):
+                continue
+            state = ttt.BitBoard.from_board(board)
+            shape = state.geometry
+            depth = shape.hint_depth() + 1
+            maximizing = state.player() == ttt.X
+            candidates = shape.candidate_moves(state.x, state.o)
+            exact = {}
+            for index in shape.move_order:
+                if candidates >> index & 1:
+                    exact[shape.cells[index]], _ = ttt.minimax_with_depth(
+                        state.play(index), 1, not maximizing, max_depth=depth)
+            for num_moves in (1, 2, 3):
+                top = ttt.search_multipv(state, num_moves, depth)
+                assert all(exact[move] == score for move, score in top)
+                assert [score for _, score in top] == sorted(exact.values(), reverse=maximizing)[:num_moves]
+        print(f"✓ {size}x{size} top-N moves match per-move searches")
+    
+    board = [[ttt.X, ttt.X, None],
+             [ttt.O, ttt.O, None],
+             [None, None, None]]
+    moves = ttt.get_best_moves_with_scores(board, 2)
+    assert moves[0] == ((0, 2), 10)
+    print("✓ Table hints are scored from the current position")
+    
+    # A won board with empty cells is in the table but its children are not: it is searched
+    won = [[ttt.X, ttt.X, ttt.X],
+           [ttt.O, ttt.O, None],
+           [None, None, None]]
+    moves = ttt.get_best_moves(won, 2)
+    assert len(moves) == 2 and moves[0] == (1, 2) and all(won[i][j] is None for i, j in moves)
+    print(f"✓ Won board with empty cells: hints {moves} from a search")
+
+def test_ai_worker():
+    """Test background AI searches and cancellation"""
+    print("\n\nTesting Background AI Worker")
+    print("=" * 50)
+    
+    import time
+    from ai_worker import AIWorker
+    
+    worker = AIWorker()
+    board = ttt.result(ttt.initial_state(), (0, 0))
+    job = worker.submit(ttt.minimax, board, ttt.IMPOSSIBLE)
+    deadline = time.time() + 10
+    results = []
+    while not results and time.time() < deadline:
+        results = worker.poll()
+        time.sleep(0.01)
+    assert [result.job_id for result in results] == [job]
+    assert results[0].value == (0, (1, 1))
+    assert not worker.busy()
+    print("✓ Move computed in the background")
+    
+    # A long search on a large board is aborted by cancel()
+    big = ttt.result(ttt.initial_state(7), (3, 3))
+    job = worker.submit(ttt.minimax, big, ttt.IMPOSSIBLE, time_limit=30)
+    time.sleep(0.1)
+    start = time.time()
+    worker.cancel()
+    follow_up = worker.submit(ttt.get_best_moves, board, 1)
+    results = []
+    while not results and time.time() < deadline:
+        results = worker.poll()
+        time.sleep(0.01)
+    assert time.time() - start < 5
+    assert [result.job_id for result in results] == [follow_up]
+    print("✓ Cancelled search is dropped and the worker moves on")
+
+def test_search_context():
+    """Test that searches keep independent statistics"""
+    print("\n\nTesting Search Statistics")
+    print("=" * 50)
+    
+    board = ttt.result(ttt.initial_state(4), (1, 1))
+    value, move, context = ttt.minimax(board, ttt.IMPOSSIBLE, node_limit=3000, with_stats=True)
+    stats = context.as_dict()
+    assert ttt.get_ai_stats() == stats
+    assert sum(stats["nodes_by_depth"]) == stats["nodes_explored"]
+    assert sum(stats["cutoffs_by_depth"]) == stats["prunings"]
+    assert 0 < stats["first_move_cutoff_rate"] <= 1
+    assert len(stats["branching_factors"]) == len(stats["nodes_by_depth"]) - 1
+    print(f"✓ Branching factors: {[round(b, 1) for b in stats['branching_factors']]}")
+    
+    # Hint searches report their own statistics and leave the move's alone
+    moves, hint_context = ttt.get_best_moves(board, 2, with_stats=True)
+    assert len(moves) == 2 and hint_context.nodes_explored > 0
+    assert ttt.get_ai_stats() == stats
+    print("✓ Hint search does not overwrite the move statistics")
+    
+    _, _, light = ttt.minimax(board, ttt.IMPOSSIBLE, node_limit=3000, detailed_stats=False,
+                                with_stats=True)
+    assert light.nodes_explored > 0 and light.nodes_by_depth == []
+    print("✓ Per-ply counters can be turned off")
+
+def test_tournament():
+    """Test the headless self-play harness"""
+    print("\n\nTesting Self-Play Tournament")
+    print("=" * 50)
+    
+    import tournament
+    report = tournament.run_tournament("hard", "impossible", games=20, workers=1)
+    results = report["results"]
+    assert results["wins"] + results["draws"] + results["losses"] == 20
+    assert results["wins"] == 0  # the solved table never loses
+    stats = report["engine_stats"]["hard"]
+    assert stats["moves"] > 0 and stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    print(f"✓ {results['draws']} draws, {results['losses']} losses for hard")
+    
+    assert tournament.compare_reports(report, report) == []
+    slower = dict(stats, nodes_per_second=stats["nodes_per_second"] * 0.5)
+    regressed = dict(report, engine_stats=dict(report["engine_stats"], hard=slower))
+    assert len(tournament.compare_reports(regressed, report)) == 1
+    print("✓ Compare mode flags a throughput regression")
+
+def test_benchmark():
+    """Test the primitive micro-benchmarks on a small corpus"""
+    print("\n\nTesting Primitive Benchmarks")
+    print("=" * 50)
+    
+    import benchmark
+    corpus = benchmark.build_corpus(mid_game=5)
+    assert len(corpus) == 5478 + 5 * len(benchmark.MID_GAME_SIZES)
+    assert corpus == benchmark.build_corpus(mid_game=5)  # fixed corpus
+    report = benchmark.run_primitives(corpus, ["winner", "move_priority"], min_time=0.001, samples=3)
+    assert set(report["primitives"]) == {"winner", "move_priority"}
+    assert all(result["ns_per_call"] > 0 for result in report["primitives"].values())
+    print(f"✓ winner: {report['primitives']['winner']['ns_per_call']:.0f} ns/call")
+    
+    changes, regressions = benchmark.compare_primitives(report, report)
+    assert regressions == [] and all(change == 0 for change in changes.values())
+    print("✓ Baseline comparison")
+
+def test_batch_evaluation():
+    """Test that batched evaluation matches the scalar functions"""
+    print("\n\nTesting Batched Evaluation")
+    print("=" * 50)
+    
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("✓ Skipped: numpy is not installed")
+        return
+    import batch
+    import benchmark
+    
+    codes = {ttt.X: batch.X_CODE, ttt.O: batch.O_CODE, None: 0}
+    corpus = benchmark.build_corpus(mid_game=50)
+    for size in (3, 4, 5, 7):
+        boards = [board for board in corpus if len(board) == size]
+        scores = batch.evaluate_batch(batch.encode_boards(boards))
+        assert list(scores["winner"]) == [codes[ttt.winner(board)] for board in boards]
+        assert list(scores["terminal"]) == [ttt.terminal(board) for board in boards]
+        assert list(scores["utility"]) == [ttt.utility(board) for board in boards]
+        assert list(scores["evaluation"]) == [ttt.evaluate_position(board) for board in boards]
+        print(f"✓ {size}x{size}: {len(boards)} boards match the scalar functions")
+
+def test_heuristic_leaves():
+    """Test the incremental line heuristic used at the depth cutoff"""
+    print("\n\nTesting Heuristic Leaf Evaluation")
+    print("=" * 50)
+    
+    for board in reachable_positions():
+        assert ttt.BitBoard.from_board(board).evaluate() == ttt.evaluate_position(board)
+    print("✓ BitBoard.evaluate matches evaluate_position")
+    
+    import random
+    rng = random.Random(5)
+    for size in (3, 4, 5, 7):
+        shape = ttt.geometry(size)
+        for _ in range(10):
+            state = ttt.BitBoard(geometry=shape)
+            while not state.terminal():
+                state = state.play(rng.choice(state.actions()))
+                assert state.score == shape.line_score(state.x, state.o)
+    print("✓ Incremental line scores match a full recount")
+    
+    # Cutoff leaves rank below every win score
+    state = ttt.BitBoard.from_board(ttt.result(ttt.initial_state(), (1, 1)))
+    value, move = ttt.minimax_with_depth(state, 0, False, max_depth=1)
+    assert -1 < value < 1 and value != 0
+    assert move in [(0, 0), (0, 2), (2, 0), (2, 2)]  # corners leave X fewer open lines
+    print(f"✓ Depth-1 reply to the center: {move} ({value:+.4f})")
+
+def test_search_board():
+    """Test in-place make/unmake and incremental Zobrist hashing"""
+    print("\n\nTesting In-Place Search Board")
+    print("=" * 50)
+    
+    import random
+    rng = random.Random(11)
+    for size in (3, 4, 5, 7):
+        shape = ttt.geometry(size)
+        for _ in range(10):
+            state = ttt.BitBoard(geometry=shape)
+            board = ttt.SearchBoard(state)
+            history = [state]
+            while not state.terminal():
+                index = rng.choice(state.actions())
+                state = state.play(index)
+                board.make(index)
+                history.append(state)
+                fresh = ttt.SearchBoard(state)
+                assert (board.x, board.o, board.ply, board.score) == (state.x, state.o, state.ply, state.score)
+                assert board.winner == state.winner() and board.hashes == fresh.hashes
+                assert board.x_counts == fresh.x_counts and board.o_counts == fresh.o_counts
+            while board.moves:
+                board.unmake()
+                history.pop()
+                assert (board.x, board.o, board.score) == (history[-1].x, history[-1].o, history[-1].score)
+            assert board.hashes == ttt.SearchBoard(history[0]).hashes
+    print("✓ make/unmake keep masks, line counts, score and hashes in sync")
+    
+    symmetry = ttt.board_symmetry
+    state = ttt.BitBoard.from_board([[ttt.X, ttt.O, None],
+                                     [None, ttt.X, None],
+                                     [None, None, ttt.O]])
+    keys = {ttt.SearchBoard(ttt.BitBoard(symmetry.transform(s, state.x),
+                                         symmetry.transform(s, state.o))).canonical()[0] for s in range(8)}
+    assert len(keys) == 1
+    print("✓ Symmetric positions share one Zobrist key")
+    
+    # Cutoffs feed the killer and history tables used for move ordering
+    ttt.geometry(5).transposition_table.clear()
+    board = ttt.SearchBoard(ttt.BitBoard.from_board(ttt.result(ttt.initial_state(5), (2, 2))))
+    ttt._search(board, 0, False, float('-inf'), float('inf'), 3, None, ttt.SearchContext())
+    assert board.moves == [] and any(any(side) for side in board.history)
+    assert any(killers[0] is not None for killers in board.killers)
+    print("✓ Killer and history tables are filled by cutoffs")
+    
+    # Buffers and killers are per ply, so a depth limit past the cell count is fine
+    assert ttt.minimax_with_depth(ttt.initial_state(), 3, True, max_depth=12) == (0, (1, 1))
+    assert ttt.minimax_with_depth(ttt.initial_state(), 0, True, max_depth=20)[0] == 0
+    print("✓ max_depth larger than the number of cells")
+
+def test_parallel_search():
+    """Test the process-pool root-split search"""
+    print("\n\nTesting Parallel Search")
+    print("=" * 50)
+    
+    import parallel
+    positions = [ttt.result(ttt.initial_state(), (0, 0)),
+                 ttt.result(ttt.initial_state(4), (1, 1)),
+                 ttt.result(ttt.result(ttt.initial_state(5), (2, 2)), (1, 2))]
+    try:
+        for board in positions:
+            state = ttt.BitBoard.from_board(board)
+            depth = 6 if len(board) == 3 else 3
+            value, _ = ttt.iterative_deepening(state, depth, ttt.SearchContext())
+            for algorithm in (ttt.ALPHA_BETA, ttt.PVS):
+                context = ttt.SearchContext()
+                parallel_value, move = parallel.parallel_search(state, depth, context, workers=2,
+                                                                algorithm=algorithm)
+                assert parallel_value == value and context.depth_completed == depth, algorithm
+                child = ttt.BitBoard.from_board(ttt.result(board, move))
+                child_value, _ = ttt.minimax_with_depth(child, 1, child.player() == ttt.X, max_depth=depth)
+                assert child_value == value, algorithm
+        print("✓ Same values as the single-process search, with alpha-beta and PVS workers")
+        
+        board = ttt.result(ttt.initial_state(4), (1, 1))
+        value, move, context = ttt.minimax(board, ttt.IMPOSSIBLE, algorithm=ttt.PVS, workers=2, with_stats=True)
+        assert value == ttt.minimax(board, ttt.IMPOSSIBLE)[0] and context.researches > 0
+        print(f"✓ minimax(algorithm=PVS, workers=2) runs PVS in the workers: {context.researches} re-searches")
+        
+        board = ttt.result(ttt.initial_state(7), (3, 3))
+        value, move, context = ttt.minimax(board, ttt.IMPOSSIBLE, time_limit=0.5, workers=2, with_stats=True)
+        assert move is not None and context.depth_completed >= 1
+        print(f"✓ Time budget: depth {context.depth_completed} on 7x7")
+    finally:
+        parallel.shutdown_pool()
+
+def test_pvs():
+    """Test that principal variation search matches alpha-beta"""
+    print("\n\nTesting Principal Variation Search")
+    print("=" * 50)
+    
+    import benchmark
+    positions = [(board, depth) for board, depth in benchmark.search_positions(seed=7)
+                 if len(board) in (3, 5)][:40]
+    totals, mismatches = benchmark.run_search_comparison(positions)
+    assert mismatches == []
+    researches = sum(result["researches"] for result in totals[ttt.PVS].values())
+    assert researches > 0
+    print(f"✓ Same values on {len(positions)} positions ({researches} re-searches)")
+    
+    board = ttt.result(ttt.initial_state(4), (1, 1))
+    value, move, context = ttt.minimax(board, ttt.IMPOSSIBLE, algorithm=ttt.PVS, with_stats=True)
+    assert value == ttt.minimax(board, ttt.IMPOSSIBLE)[0]
+    assert context.as_dict()["researches"] > 0
+    print(f"✓ Selectable through minimax(): {move}, {context.researches} re-searches")
+
+def test_mcts():
+    """Test the Monte Carlo Tree Search engine"""
+    print("\n\nTesting Monte Carlo Tree Search")
+    print("=" * 50)
+    
+    import random
+    import mcts
+    # Finds the immediate win and blocks the opponent's
+    board = [[ttt.X, ttt.X, ttt.EMPTY],
+             [ttt.O, ttt.O, ttt.EMPTY],
+             [ttt.EMPTY, ttt.EMPTY, ttt.EMPTY]]
+    value, move = mcts.MCTS(seed=1).search(ttt.BitBoard.from_board(board), playouts=2000)
+    assert move == (0, 2) and value > 0.5
+    board[0][0] = ttt.EMPTY
+    board[2][2] = ttt.X
+    value, move = mcts.MCTS(seed=1).search(ttt.BitBoard.from_board(board), playouts=2000)
+    assert move == (1, 2)
+    print("✓ Takes wins and blocks threats")
+    
+    # X wins most random games after taking the center
+    state = ttt.BitBoard().play(4)
+    x_wins, o_wins, draws = mcts.playout_results(state, 2000, random.Random(3))
+    assert x_wins + o_wins + draws == 2000
+    assert 0.6 < x_wins / 2000 < 0.8
+    print(f"✓ Random playouts after a center opening: {x_wins} X / {o_wins} O / {draws} draws")
+    
+    # The subtree under the moves actually played is kept
+    board = ttt.initial_state(5)
+    _, move, context = mcts.mcts(board, ttt.MEDIUM, 4, with_stats=True)
+    assert context.playouts == mcts.MCTS_PLAYOUTS[ttt.MEDIUM]
+    board = ttt.result(board, move)
+    board = ttt.result(board, (move[0], move[1] + 1))
+    _, move, context = mcts.mcts(board, ttt.MEDIUM, 4, with_stats=True)
+    assert context.reused_playouts > 0
+    assert board[move[0]][move[1]] == ttt.EMPTY
+    print(f"✓ Tree reused: {context.reused_playouts} playouts carried over")
+    
+    # Without a playout budget the engine still answers with a legal move
+    value, move = mcts.mcts(ttt.initial_state(), node_limit=0)
+    assert move == ttt.CELLS[ttt.MOVE_ORDER[0]]
+    print(f"✓ Zero playouts: falls back to {move}")
+    
+    # Seeded tournaments with MCTS engines are reproducible
+    import tournament
+    reports = [tournament.run_tournament("mcts-medium", "mcts-hard", games=2, node_limit=64,
+                                         opening_moves=1, workers=1, seed=5) for _ in range(2)]
+    assert reports[0]["results"] == reports[1]["results"]
+    first, second = (tournament.play_game((9, "mcts-medium", "mcts-medium", reports[0]["settings"]))
+                     for _ in range(2))
+    assert first["history"] == second["history"]
+    print("✓ Tournament games with MCTS engines repeat for the same seed")
+
+def test_move_server():
+    """Test the asyncio move server and its load generator"""
+    print("\n\nTesting Move Server")
+    print("=" * 50)
+    
+    import asyncio
+    import json
+    import server
+    
+    async def scenario():
+        move_server = server.MoveServer(workers=1)
+        tcp = await server.start_tcp_server(move_server, port=0)
+        try:
+            board = [[ttt.X, ttt.X, ttt.EMPTY],
+                     [ttt.O, ttt.O, ttt.EMPTY],
+                     [ttt.EMPTY, ttt.EMPTY, ttt.EMPTY]]
+            win, same = await asyncio.gather(move_server.handle({"id": 1, "board": board}),
+                                             move_server.handle({"id": 2, "board": board}))
+            bad = await move_server.handle({"id": 3, "board": [[ttt.O]]})
+            # Badly typed fields are rejected without failing the requests batched with them
+            typed = await asyncio.gather(
+                move_server.handle({"id": 5, "board": board, "difficulty": "hard", "time_limit": "abc"}),
+                move_server.handle({"id": 6, "board": board, "win_length": "3"}),
+                move_server.handle({"id": 7, "board": board, "time_limit": [1]}),
+                move_server.handle({"id": 8, "board": board, "node_limit": 1.5}),
+                move_server.handle({"id": 9, "board": board, "difficulty": "hard", "time_limit": 1}))
+            # Every line of a session is answered, even one that is not a request
+            reader = asyncio.StreamReader()
+            lines = [b'[1]', b'{"id": 10, "board": 3}', json.dumps({"id": 11, "board": board}).encode()]
+            reader.feed_data(b"\n".join(lines) + b"\n")
+            reader.feed_eof()
+            answers = []
+            
+            async def write(data):
+                answers.append(json.loads(data))
+            await server.serve_lines(move_server, reader, write)
+            searched = await move_server.handle({"id": 4, "board": ttt.result(ttt.initial_state(4), (1, 1)),
+                                                 "difficulty": "hard", "time_limit": 0.5})
+            port = tcp.sockets[0].getsockname()[1]
+            report = await server.run_load("127.0.0.1", port, clients=4, requests=10)
+        finally:
+            tcp.close()
+            await tcp.wait_closed()
+            move_server.close()
+        return win, same, bad, typed, answers, searched, report
+    
+    win, same, bad, typed, answers, searched, report = asyncio.run(scenario())
+    assert win["move"] == [0, 2] and same["move"] == [0, 2]
+    assert "error" in bad
+    assert all("error" in response for response in typed[:4]) and typed[4]["move"] == [0, 2]
+    assert sorted(str(response.get("id")) for response in answers) == ["10", "11", "None"]
+    assert sum("error" in response for response in answers) == 2
+    print("✓ Badly typed requests are answered with errors; the rest of their batch is not affected")
+    assert searched["move"] is not None and searched["stats"]["nodes"] > 0
+    assert report["errors"] == 0 and report["requests"] == 40
+    assert report["server"]["deduplicated"] >= 1 and report["server"]["searches"] >= 1
+    print(f"✓ Batched, deduplicated and searched in the pool: {report['server']}")
+    print(f"✓ Load test: {report['requests_per_second']:,.0f} requests/s, p95 {report['p95_ms']:.2f}ms")
+
+def test_startup():
+    """Test that the entry modules import without pygame and the headless game runs"""
+    print("\n\nTesting Startup")
+    print("=" * 50)
+    
+    import os
+    import subprocess
+    import sys
+    import benchmark
+    report = benchmark.run_startup(("tictactoe", "runner"), runs=1)
+    for module, result in report["modules"].items():
+        assert result["heavy_imports"] == [], (module, result)
+        print(f"✓ import {module}: {result['import_ms']:.1f}ms, no pygame or numpy")
+    slow = {"modules": {"runner": dict(report["modules"]["runner"], heavy_imports=["pygame"])}}
+    assert benchmark.compare_startup(slow)[1] == ["runner: imports pygame"]
+    
+    # X plays the center and then the first empty cell it types; the AI never loses.
+    # The game goes to a log in a temporary directory, never the user's own
+    import tempfile
+    import game_log
+    moves = "\n".join(f"{i} {j}" for i, j in [(1, 1)] + [(i, j) for i in range(3) for j in range(3)])
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "logs", "games.ttgl")
+        game = subprocess.run([sys.executable, "runner.py", "--headless", "--log", log_path],
+                              input=moves + "\n", cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, universal_newlines=True, timeout=60)
+        assert game.returncode == 0
+        assert "Game Over: Tie!" in game.stdout or "AI Wins!" in game.stdout
+        with game_log.GameLog(log_path) as log:
+            records = list(log)
+        assert len(records) == 1 and records[0].x_player == game_log.HUMAN
+    print("✓ Headless game played to the end without pygame and recorded in the given log")
+
+def test_position_store():
+    """Test the memory-mapped position store and its use by minimax"""
+    print("\n\nTesting Position Store")
+    print("=" * 50)
+    
+    import os
+    import tempfile
+    import position_store
+    import solver
+    with tempfile.TemporaryDirectory() as directory:
+        # A whole-game 3x3 store agrees with the solved table
+        path = os.path.join(directory, "positions_3x3_3.bin")
+        position_store.build_store(path, 3)
+        store = position_store.open_store(path)
+        checked = 0
+        for board, value, optimal in solver.solve().values():
+            state = ttt.BitBoard.from_board(board)
+            stored_value, move = store.lookup(state)
+            assert stored_value == value, board
+            if optimal:
+                assert ttt.CELLS[move] in optimal, board
+            checked += 1
+        store.close()
+        print(f"✓ {checked} positions match the solved table")
+        
+        # A 4x4 endgame store answers minimax without a search
+        shape = ttt.geometry(4)
+        path = os.path.join(directory, "positions_4x4_4.bin")
+        stored = position_store.build_store(path, 4, min_ply=14)
+        store = position_store.open_store(path)
+        assert store.min_ply == 14 and not position_store.check_store(store, 10)
+        board = ttt.initial_state(4)
+        for move in [(2, 0), (3, 0), (1, 1), (3, 3), (3, 2), (3, 1), (2, 2), (0, 0), (2, 3),
+                     (2, 1), (0, 2), (0, 1), (1, 0), (0, 3)]:
+            board = ttt.result(board, move)
+        searched = ttt.minimax(board, ttt.IMPOSSIBLE)
+        ttt.position_stores[shape] = store
+        try:
+            value, move, context = ttt.minimax(board, ttt.IMPOSSIBLE, with_stats=True)
+        finally:
+            del ttt.position_stores[shape]
+            store.close()
+        assert (value, move) == searched and context.nodes_explored == 0
+        print(f"✓ {stored:,} endgame positions stored; minimax reads {move} without searching")
+    
+    # X wins by (0, 3), next to no stone: the store's reference search must see it
+    board = [[ttt.X, ttt.X, None, None],
+             [ttt.O, ttt.O, None, None],
+             [None, ttt.O, ttt.O, ttt.X],
+             [None, ttt.O, ttt.X, ttt.X]]
+    state = ttt.BitBoard.from_board(board)
+    shape.transposition_table.clear()
+    restricted, _ = ttt._search(ttt.SearchBoard(state), 0, True, float('-inf'), float('inf'),
+                                len(shape.cells), None, ttt.SearchContext(detailed=False))
+    assert restricted == 0 and position_store.search_value(state) > 0
+    assert shape.restrict_moves and not any(shape.transposition_table.slots)
+    print("✓ Store checks search every move, not only cells next to stones")
+
+def test_game_analysis():
+    """Test move-by-move analysis of recorded games"""
+    print("\n\nTesting Game Analysis")
+    print("=" * 50)
+    
+    import random
+    import analysis
+    # X takes the center, O answers on an edge (a loss), X wins slowly
+    history = [(ttt.X, (1, 1)), (ttt.O, (0, 1)), (ttt.X, (0, 0)), (ttt.O, (2, 2)),
+               (ttt.X, (1, 0)), (ttt.O, (1, 2)), (ttt.X, (2, 0))]
+    plies = analysis.analyze_game(history)
+    assert [ply.ply for ply in plies] == list(range(len(history)))
+    assert plies[0].value == 0 and plies[0].flag is None
+    assert plies[1].flag == analysis.BLUNDER and plies[1].played_value > 0
+    assert plies[-1].played_value == 1 + ttt.STANDARD.win_bonus - 1 and plies[-1].loss == 0
+    for ply in plies:
+        if ply.flag is None:
+            assert ply.loss <= analysis.INACCURACY_LOSS
+    print(f"✓ {sum(ply.flag == analysis.BLUNDER for ply in plies)} blunder(s) found in a {len(history)}-move game")
+    
+    # A stream of games gives the same results in one process and in a pool
+    rng = random.Random(3)
+    games = []
+    for _ in range(60):
+        state, moves = ttt.BitBoard(), []
+        while not state.terminal():
+            index = rng.choice(state.actions())
+            moves.append((state.player(), ttt.CELLS[index]))
+            state = state.play(index)
+        games.append(moves)
+    serial = list(analysis.analyze_games(iter(games)))
+    pooled = list(analysis.analyze_games(iter(games), workers=2, chunk_size=16))
+    assert serial == pooled and len(serial) == sum(len(moves) for moves in games)
+    summary = analysis.summarize(serial)
+    assert summary["games"] == len(games)
+    print(f"✓ {len(serial)} moves analyzed; {summary[ttt.X][analysis.BLUNDER]} X and "
+          f"{summary[ttt.O][analysis.BLUNDER]} O blunders")
+    
+    # Only exact values make blunders: above the horizon of a shallow 4x4 search
+    # (without a position store), large losses are inaccuracies at most
+    shape = ttt.geometry(4)
+    saved_store = ttt.position_stores.get(shape, False)
+    ttt.position_stores[shape] = None
+    try:
+        shallow = analysis.analyze_game([(ttt.X, (0, 0)), (ttt.O, (3, 3)), (ttt.X, (1, 1))], size=4,
+                                        max_depth=1, cache=analysis.PositionCache())
+    finally:
+        if saved_store is False:
+            del ttt.position_stores[shape]
+        else:
+            ttt.position_stores[shape] = saved_store
+    for ply in shallow:
+        assert ply.flag != analysis.BLUNDER or ply.exact
+    assert all(ply.exact for ply in plies) and not shallow[0].exact
+    print("✓ Values are marked exact or estimated; estimates are never blunders")
+    
+    # Illegal histories are rejected, and reported per game in a stream
+    bad_games = [[(ttt.O, (0, 0))], [(ttt.X, (0, 0)), (ttt.O, (0, 0))], [(ttt.X, (3, 0))],
+                 [(ttt.X, ("a", 0))], [ttt.X], "not json", 3]
+    for bad in bad_games:
+        try:
+            analysis.analyze_game(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    stream = list(analysis.analyze_games([history] + bad_games + [history]))
+    errors = [item for item in stream if isinstance(item, analysis.GameError)]
+    assert [error.game for error in errors] == list(range(1, len(bad_games) + 1))
+    assert sum(isinstance(item, analysis.PlyAnalysis) for item in stream) == 2 * len(history)
+    assert analysis.summarize(stream)["errors"] == len(bad_games)
+    print("✓ Malformed games are reported as GameError and the stream goes on")
+
+def test_game_log():
+    """Test the binary game log: buffered writer, mmap reader and tallies"""
+    print("\n\nTesting Game Log")
+    print("=" * 50)
+    
+    import os
+    import tempfile
+    import game_log
+    ai = game_log.Player("minimax", ttt.HARD)
+    win = [(ttt.X, (0, 0)), (ttt.O, (1, 1)), (ttt.X, (0, 1)), (ttt.O, (2, 2)), (ttt.X, (0, 2))]
+    tie = [(ttt.X, (1, 1)), (ttt.O, (0, 0)), (ttt.X, (0, 1)), (ttt.O, (2, 1)), (ttt.X, (1, 0)),
+           (ttt.O, (1, 2)), (ttt.X, (0, 2)), (ttt.O, (2, 0)), (ttt.X, (2, 2))]
+    records = [
+        game_log.game_record(win, 3, None, game_log.HUMAN, ai, 1700000000, 12.5, 9.25, 3.25),
+        game_log.game_record(tie, 3, None, ai, game_log.HUMAN, 1700000100, 8.0, 0.5, 7.5),
+        game_log.game_record(win[:3], 3, None, ai, ai, 1700000200, 0.1),
+    ]
+    assert [record.result for record in records] == [ttt.X, game_log.TIE, None]
+    assert len(game_log.encode_record(records[0])) == game_log.RECORD.size + len(win)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.ttgl")
+        with game_log.GameLogWriter(path, buffer_size=64) as writer:
+            for _ in range(10):
+                for record in records:
+                    writer.write(record)
+        with game_log.GameLog(path) as log:
+            assert list(log) == records * 10
+            counts = log.tally()
+        assert counts[game_log.HUMAN, ai, ttt.X] == 10 and sum(counts.values()) == 30
+        assert game_log.player_stats(counts) == {"user_wins": 10, "ai_wins": 0, "ties": 10}
+        states = list(game_log.replay(records[0]))
+        assert len(states) == len(win) + 1 and states[-1].winner() == ttt.X
+        print(f"✓ 30 games round-trip in {os.path.getsize(path)} bytes")
+        
+        # A record cut short by a crash is ignored, then truncated by the next writer
+        with open(path, "ab") as fh:
+            fh.write(game_log.encode_record(records[1])[:-3])
+        with game_log.GameLog(path) as log:
+            assert sum(log.tally().values()) == 30 and len(list(log)) == 30
+        with game_log.GameLogWriter(path) as writer:
+            writer.write(records[1])
+        with game_log.GameLog(path) as log:
+            assert list(log)[-2:] == [records[2], records[1]]
+        print("✓ A torn last record is skipped by readers and dropped by writers")
+    
+    try:
+        game_log.game_record([(ttt.O, (0, 0))])
+        assert False
+    except ValueError:
+        pass
+    print("✓ Out-of-turn histories are rejected")
+
+def test_pondering():
+    """Test the runner's ponder searches: hits, misses and stale jobs"""
+    print("\n\nTesting Pondering")
+    print("=" * 50)
+    
+    import time
+    import config
+    import mcts
+    import runner
+    from ai_worker import AIWorker
+    
+    def wait_for(condition):
+        deadline = time.time() + 30
+        while not condition():
+            assert time.time() < deadline
+            runner.collect_ai_results()
+            time.sleep(0.01)
+    
+    saved = (runner.ai_worker, runner.pondering, runner.difficulty, config.AI_SETTINGS['engine'])
+    runner.ai_worker = AIWorker()
+    runner.pondering = True
+    runner.difficulty = ttt.IMPOSSIBLE
+    try:
+        # Hit: the finished ponder search answers the user's move
+        board = ttt.initial_state()
+        runner.new_game()
+        runner.start_pondering(board, [(1, 1)])
+        assert len(runner.ponder_jobs) == config.AI_SETTINGS['ponder_moves']
+        wait_for(lambda: not runner.ponder_jobs)
+        runner.take_ponder_reply((1, 1))
+        assert runner.last_ponder_hit is True and runner.ai_job is None
+        assert runner.ai_result == ttt.minimax(ttt.result(board, (1, 1)))
+        assert not runner.ponder_results and runner.ponder_position is None
+        print(f"✓ Hit: reply {runner.ai_result[1]} without a new search")
+        
+        # Miss: a move outside the pondered ones leaves the AI to search afresh
+        runner.new_game()
+        runner.start_pondering(board, [])
+        pondered = set(runner.ponder_jobs.values())
+        missed = next(cell for cell in ttt.CELLS if cell not in pondered)
+        wait_for(lambda: not runner.ponder_jobs)
+        runner.take_ponder_reply(missed)
+        assert runner.last_ponder_hit is False
+        assert runner.ai_job is None and runner.ai_result is None
+        print(f"✓ Miss: {missed} was not pondered, so no reply is taken")
+        
+        # Stale jobs: after a hit on a running search, the other searches are cancelled
+        runner.new_game()
+        runner.start_pondering(board, [(1, 1)])
+        first_job = next(iter(runner.ponder_jobs))
+        runner.take_ponder_reply(runner.ponder_jobs[first_job])
+        assert runner.last_ponder_hit is True and not runner.ponder_jobs
+        if runner.ai_result is None:
+            assert runner.ai_job == first_job
+            wait_for(lambda: runner.ai_result is not None)
+        wait_for(lambda: not runner.ai_worker.busy())
+        assert not runner.ponder_results
+        print("✓ Other ponder searches are cancelled and their results dropped")
+        
+        # MCTS ponder searches leave the shared engine's tree alone
+        config.AI_SETTINGS['engine'] = 'mcts'
+        runner.difficulty = ttt.EASY
+        runner.new_game()
+        board = ttt.result(ttt.initial_state(), (0, 0))
+        mcts.mcts(board, ttt.EASY)
+        shared = mcts._engines[ttt.STANDARD]
+        root = shared.root
+        board = ttt.result(board, (1, 1))
+        runner.start_pondering(board, [])
+        wait_for(lambda: not runner.ponder_jobs)
+        assert mcts._engines[ttt.STANDARD] is shared and shared.root is root
+        print("✓ MCTS ponder searches run on engines of their own")
+    finally:
+        runner.cancel_ai()
+        runner.ai_worker, runner.pondering, runner.difficulty, config.AI_SETTINGS['engine'] = saved
+
 if __name__ == "__main__":
     try:
         test_basic_functionality()
         test_ai_performance()
         test_winning_detection()
+        test_bitboard_matches_list_board()
+        test_transposition_table()
+        test_solved_table()
+        test_larger_boards()
+        test_iterative_deepening()
+        test_multipv_hints()
+        test_ai_worker()
+        test_search_context()
+        test_tournament()
+        test_benchmark()
+        test_batch_evaluation()
+        test_heuristic_leaves()
+        test_search_board()
+        test_parallel_search()
+        test_pvs()
+        test_mcts()
+        test_move_server()
+        test_startup()
+        test_position_store()
+        test_game_analysis()
+        test_game_log()
+        test_pondering()
         print("\n🎉 All tests completed successfully!")
         print("\nTo play the game with GUI, run: python runner.py")
     except Exception as e:
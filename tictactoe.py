@@ -4,8 +4,15 @@ Features minimax algorithm with alpha-beta pruning for optimal gameplay
 Created by: [Your Name]
 """
 
+import os
 import random
+import site
+import sys
 import time
+from array import array
+from functools import partial
+
+from transposition import EXACT, LOWER, UPPER, Symmetry, TranspositionTable, zobrist_keys
 
 # Game constants
 X = "X"
@@ -18,22 +25,249 @@ MEDIUM = "MEDIUM"
 HARD = "HARD"
 IMPOSSIBLE = "IMPOSSIBLE"
 
-# AI statistics
-ai_stats = {
-    "nodes_explored": 0,
-    "time_taken": 0,
-    "prunings": 0,
-    "depth_reached": 0
-}
+# Board geometry
+BOARD_SIZE = 3
+
+# Default win length for each board size (m,n,k variants); other sizes use min(size, 5)
+DEFAULT_WIN_LENGTH = {3: 3, 4: 4, 5: 4, 6: 5, 7: 5}
+
+# Search depth for each difficulty; larger boards use a shallower search
+SEARCH_DEPTH = {EASY: 2, MEDIUM: 4, HARD: 6, IMPOSSIBLE: 9}
+LARGE_BOARD_SEARCH_DEPTH = {EASY: 1, MEDIUM: 2, HARD: 3, IMPOSSIBLE: 5}
+HINT_DEPTH = 5
+LARGE_BOARD_HINT_DEPTH = 3
+
+# Transposition table slots per board geometry
+TT_SIZE = 1 << 16
 
+# Largest board that gets a precomputed winning-mask lookup table
+WINNING_TABLE_MAX_CELLS = 16
 
-def initial_state():
+
+class Geometry:
+    """
+    Line tables for a size x size board with win_length in a row.
+    Cell (i, j) is bit i * size + j of a mask. Every k-cell window along a row,
+    column or diagonal is a winning line.
+    """
+
+    def __init__(self, size, win_length):
+        if not 1 < win_length <= size:
+            raise ValueError(f"Invalid win length {win_length} for a {size}x{size} board")
+        self.size = size
+        self.win_length = win_length
+        self.cells = tuple((i, j) for i in range(size) for j in range(size))
+        self.full_mask = (1 << len(self.cells)) - 1
+        # Quicker wins score higher: a win at depth d is worth 1 + win_bonus - d
+        self.win_bonus = len(self.cells) + 1
+
+        # Winning lines as cell tuples and as bit masks
+        lines = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for i, j in self.cells:
+                end_i, end_j = i + di * (win_length - 1), j + dj * (win_length - 1)
+                if 0 <= end_i < size and 0 <= end_j < size:
+                    lines.append(tuple((i + di * step, j + dj * step) for step in range(win_length)))
+        self.lines = tuple(lines)
+        self.win_masks = tuple(sum(1 << self.index(cell) for cell in line) for line in lines)
+
+        # Shift-based line detection: for each direction, the bit shift between
+        # neighbouring cells and the mask of cells a full line can start from
+        self.directions = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            starts = 0
+            for line in lines:
+                if line[1][0] - line[0][0] == di and line[1][1] - line[0][1] == dj:
+                    starts |= 1 << self.index(line[0])
+            self.directions.append((di * size + dj, starts))
+
+        # WINNING_MASK-style lookup for small boards
+        self.winning_mask = None
+        if len(self.cells) <= WINNING_TABLE_MAX_CELLS:
+            self.winning_mask = bytes(self.has_line(m) for m in range(self.full_mask + 1))
+
+        # Neighbouring-cell shifts used to restrict moves on large boards
+        self.neighbor_shifts = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di or dj:
+                    sources = 0
+                    for index, (i, j) in enumerate(self.cells):
+                        if 0 <= i + di < size and 0 <= j + dj < size:
+                            sources |= 1 << index
+                    self.neighbor_shifts.append((di * size + dj, sources))
+        self.restrict_moves = size > BOARD_SIZE
+
+        # Cells on more winning lines are tried first (center > corners > edges on 3x3)
+        lines_through = [sum(cell in line for line in lines) for cell in self.cells]
+        most = max(lines_through)
+        self.priority = tuple(most - count for count in lines_through)
+        self.move_order = tuple(sorted(range(len(self.cells)), key=lambda index: self.priority[index]))
+        self.opening_mask = sum(1 << index for index, p in enumerate(self.priority) if p == 0)
+
+        # Line heuristic (see evaluate_line): line_value[x][o] is the value of a
+        # line holding x X pieces and o O pieces, and cell_lines[index] the
+        # masks of the lines through a cell, so a move updates only its lines
+        self.line_value = tuple(
+            tuple(10 ** (x - 1) if x and not o else -10 ** (o - 1) if o and not x else 0
+                  for o in range(win_length + 1))
+            for x in range(win_length + 1))
+        self.cell_lines = tuple(
+            tuple(mask for mask in self.win_masks if mask >> index & 1) for index in range(len(self.cells)))
+        self.cell_line_ids = tuple(
+            tuple(line for line, mask in enumerate(self.win_masks) if mask >> index & 1)
+            for index in range(len(self.cells)))
+        # Dividing the heuristic by heuristic_scale keeps it strictly inside
+        # (-1, 1), below every win score
+        self.heuristic_scale = len(lines) * 10 ** (win_length - 1)
+
+        self.symmetry = Symmetry(size)
+        self.zobrist = zobrist_keys(self.symmetry)
+        self.transposition_table = TranspositionTable(TT_SIZE)
+
+    def index(self, cell):
+        """Bit index of cell (i, j)"""
+        return cell[0] * self.size + cell[1]
+
+    def has_line(self, mask):
+        """Returns True if mask contains a complete winning line"""
+        if self.winning_mask is not None:
+            return self.winning_mask[mask]
+        for shift, starts in self.directions:
+            run = mask & starts
+            for step in range(1, self.win_length):
+                run &= mask >> (shift * step)
+            if run:
+                return True
+        return False
+
+    def neighbors(self, mask):
+        """Mask of the cells adjacent (including diagonally) to any cell in mask"""
+        result = 0
+        for shift, sources in self.neighbor_shifts:
+            moved = mask & sources
+            result |= moved << shift if shift > 0 else moved >> -shift
+        return result
+
+    def candidate_moves(self, x, o):
+        """
+        Mask of the moves the search considers. Small boards use every empty
+        cell; larger boards only cells next to a stone, or the central cells
+        on an empty board.
+        """
+        occupied = x | o
+        empty = ~occupied & self.full_mask
+        if not self.restrict_moves:
+            return empty
+        if not occupied:
+            return self.opening_mask
+        return empty & self.neighbors(occupied)
+
+    def search_depth(self, difficulty):
+        """Search depth used for a difficulty level on this board"""
+        if self.size > BOARD_SIZE:
+            return LARGE_BOARD_SEARCH_DEPTH.get(difficulty, LARGE_BOARD_SEARCH_DEPTH[IMPOSSIBLE])
+        return SEARCH_DEPTH.get(difficulty, SEARCH_DEPTH[IMPOSSIBLE])
+
+    def line_score(self, x, o):
+        """Sum of the line heuristic over every line of a position"""
+        line_value = self.line_value
+        return sum(line_value[bin(x & mask).count("1")][bin(o & mask).count("1")]
+                   for mask in self.win_masks)
+
+    def hint_depth(self):
+        """Search depth used for hints on this board"""
+        return LARGE_BOARD_HINT_DEPTH if self.size > BOARD_SIZE else HINT_DEPTH
+
+
+_geometries = {}
+
+
+def default_win_length(size):
+    """Win length used for a board size when none is given"""
+    return DEFAULT_WIN_LENGTH.get(size, min(size, 5))
+
+
+def geometry(size=BOARD_SIZE, win_length=None):
+    """Returns the shared Geometry for a board size and win length"""
+    if win_length is None:
+        win_length = default_win_length(size)
+    key = (size, win_length)
+    if key not in _geometries:
+        _geometries[key] = Geometry(size, win_length)
+    return _geometries[key]
+
+
+# Standard 3x3 board
+STANDARD = geometry(BOARD_SIZE, 3)
+CELLS = STANDARD.cells
+FULL_MASK = STANDARD.full_mask
+
+# Bit masks of the eight winning lines (rows, columns, diagonals)
+WIN_MASKS = STANDARD.win_masks
+
+# WINNING_MASK[m] is 1 if the cell mask m contains a complete line
+WINNING_MASK = STANDARD.winning_mask
+
+# Cell indexes in search order (center, corners, edges)
+MOVE_ORDER = STANDARD.move_order
+
+
+def _data_file(name):
+    """
+    Path of a data file: next to this module in a checkout, or under
+    share/tictactoe-ai of the installation prefix, where setup.py installs it.
+    """
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    if os.path.exists(here):
+        return here
+    for prefix in (sys.prefix, site.USER_BASE):
+        if prefix:
+            installed = os.path.join(prefix, "share", "tictactoe-ai", name)
+            if os.path.exists(installed):
+                return installed
+    return here
+
+
+# Precomputed game-theoretic values of every reachable position (see solver.py).
+# Entry for a position is (value + SOLVED_VALUE_OFFSET) << 9 | optimal move mask,
+# indexed by its base-3 rank; unreachable ranks hold UNSOLVED.
+SOLVED_TABLE_PATH = _data_file("solved_positions.bin")
+SOLVED_VALUE_OFFSET = 11
+UNSOLVED = 0xFFFF
+
+# BASE3[m] is the base-3 weight of the cells set in mask m
+BASE3 = tuple(
+    sum(3 ** index for index in range(len(CELLS)) if m >> index & 1) for m in range(FULL_MASK + 1)
+)
+
+# Transposition table of the standard board, shared by every search in this process
+board_symmetry = STANDARD.symmetry
+transposition_table = STANDARD.transposition_table
+
+# Nodes between clock reads when a deadline is set
+LIMIT_CHECK_INTERVAL = 256
+
+# Killer moves remembered per search depth
+KILLER_SLOTS = 2
+
+# Search algorithms: fail-hard alpha-beta, or negamax principal variation search
+ALPHA_BETA = "alphabeta"
+PVS = "pvs"
+
+# Width of the PVS scout window; far below the smallest gap between two
+# distinct scores (one heuristic step, 1 / heuristic_scale)
+NULL_WINDOW = 1e-9
+
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 0.5
+
+
+def initial_state(size=BOARD_SIZE):
     """
     Returns starting state of the board.
     """
-    return [[None, None, None],
-            [None, None, None],
-            [None, None, None]]
+    return [[None] * size for _ in range(size)]
 
 
 def player(board):
@@ -51,7 +285,8 @@ def actions(board):
     Returns set of all possible actions (i, j) available on the board.
     Each action represents a valid move coordinate where a player can place their symbol.
     """
-    return {(i, j) for i in range(3) for j in range(3) if board[i][j] == None}
+    size = len(board)
+    return {(i, j) for i in range(size) for j in range(size) if board[i][j] == None}
 
 
 def result(board, action):
@@ -68,143 +303,889 @@ def result(board, action):
     new_board[action[0]][action[1]] = current_player
     return new_board
 
-def winner(board):
+def winner(board, win_length=None):
     """
     Returns the winner of the game, if there is one.
     """
-    for row in board:
-        if row[0] == row[1] == row[2] != EMPTY:
-            return row[0]
-    for col in range(3):
-        if board[0][col] == board[1][col] == board[2][col] != EMPTY:
-            return board[0][col]
-    if board[0][0] == board[1][1] == board[2][2] != EMPTY:
-        return board[0][0]
-    if board[0][2] == board[1][1] == board[2][0] != EMPTY:
-        return board[0][2]
+    for line in geometry(len(board), win_length).lines:
+        i, j = line[0]
+        first = board[i][j]
+        if first != EMPTY and all(board[i][j] == first for i, j in line[1:]):
+            return first
     return None
 
 
-def terminal(board):
+def terminal(board, win_length=None):
     """
     Returns True if game is over, False otherwise.
     """
-    return winner(board) is not None or all(cell is not None for row in board for cell in row)
-def utility(board):
+    return winner(board, win_length) is not None or all(cell is not None for row in board for cell in row)
+def utility(board, win_length=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    win = winner(board, win_length)
+    if win == X:
         return 1
-    elif winner(board) == O:
+    elif win == O:
         return -1
     return 0
 
 
+class BitBoard:
+    """
+    Compact board state used by the search.
+    Each side is stored as a cell mask (bit i * size + j is cell (i, j)), so moves,
+    side-to-move, winner and full-board checks are a few integer operations.
+    score is the line heuristic of evaluate_position, updated move by move
+    from the lines through the played cell.
+    """
+
+    __slots__ = ("x", "o", "ply", "geometry", "score")
+
+    def __init__(self, x=0, o=0, ply=None, geometry=STANDARD, score=None):
+        self.x = x
+        self.o = o
+        self.ply = bin(x | o).count("1") if ply is None else ply
+        self.geometry = geometry
+        self.score = geometry.line_score(x, o) if score is None else score
+
+    @classmethod
+    def from_board(cls, board, win_length=None):
+        """Build a bitboard from a list-of-lists board"""
+        shape = geometry(len(board), win_length)
+        x = o = 0
+        for index, (i, j) in enumerate(shape.cells):
+            if board[i][j] == X:
+                x |= 1 << index
+            elif board[i][j] == O:
+                o |= 1 << index
+        return cls(x, o, geometry=shape)
+
+    def to_board(self):
+        """Convert back to a list-of-lists board"""
+        board = initial_state(self.geometry.size)
+        for index, (i, j) in enumerate(self.geometry.cells):
+            if self.x >> index & 1:
+                board[i][j] = X
+            elif self.o >> index & 1:
+                board[i][j] = O
+        return board
+
+    def player(self):
+        """Returns the side to move"""
+        return O if self.ply & 1 else X
+
+    def empty(self):
+        """Mask of the empty cells"""
+        return ~(self.x | self.o) & self.geometry.full_mask
+
+    def actions(self):
+        """Returns the list of empty cell indexes"""
+        empty = self.empty()
+        return [index for index in range(len(self.geometry.cells)) if empty >> index & 1]
+
+    def play(self, index):
+        """Returns the bitboard that results from the side to move taking cell index"""
+        bit = 1 << index
+        x, o = self.x, self.o
+        if (x | o) & bit:
+            raise ValueError(f"Cell already occupied: {self.geometry.cells[index]}")
+        shape = self.geometry
+        line_value = shape.line_value
+        score = self.score
+        if self.ply & 1:
+            for mask in shape.cell_lines[index]:
+                values = line_value[bin(x & mask).count("1")]
+                o_count = bin(o & mask).count("1")
+                score += values[o_count + 1] - values[o_count]
+            return BitBoard(x, o | bit, self.ply + 1, shape, score)
+        for mask in shape.cell_lines[index]:
+            x_count = bin(x & mask).count("1")
+            o_count = bin(o & mask).count("1")
+            score += line_value[x_count + 1][o_count] - line_value[x_count][o_count]
+        return BitBoard(x | bit, o, self.ply + 1, shape, score)
+
+    def winner(self):
+        """Returns the winner of the game, if there is one"""
+        if self.geometry.has_line(self.x):
+            return X
+        if self.geometry.has_line(self.o):
+            return O
+        return None
+
+    def full(self):
+        """Returns True if every cell is occupied"""
+        return (self.x | self.o) == self.geometry.full_mask
+
+    def terminal(self):
+        """Returns True if game is over"""
+        return self.full() or self.winner() is not None
+
+    def utility(self):
+        """Returns 1 if X has won the game, -1 if O has won, 0 otherwise"""
+        win = self.winner()
+        if win == X:
+            return 1
+        elif win == O:
+            return -1
+        return 0
+
+    def evaluate(self):
+        """Same value as evaluate_position: utility if the game is over, else the line heuristic"""
+        if self.terminal():
+            return self.utility()
+        return self.score
+
+    def __eq__(self, other):
+        return (isinstance(other, BitBoard) and self.x == other.x and self.o == other.o
+                and self.geometry is other.geometry)
+
+    def __hash__(self):
+        return hash((self.x, self.o))
+
+    def __repr__(self):
+        return f"BitBoard(x={self.x:#x}, o={self.o:#x}, size={self.geometry.size})"
+
+
+class SearchBoard:
+    """
+    Mutable board the search plays on in place.
+    make() and unmake() keep the side masks, side to move, pieces per line,
+    the line heuristic and the Zobrist hashes of all eight orientations up to
+    date, so a search node copies no boards. Per-ply move buffers let the
+    search list its moves without building new lists, and the killer and
+    history tables order them (see record_cutoff).
+    """
+
+    __slots__ = ("geometry", "x", "o", "ply", "score", "winner", "x_counts", "o_counts",
+                 "hashes", "moves", "scores", "buffers", "killers", "history")
+
+    def __init__(self, state):
+        shape = state.geometry
+        self.geometry = shape
+        self.x = state.x
+        self.o = state.o
+        self.ply = state.ply
+        self.score = state.score
+        self.winner = state.winner()
+        self.x_counts = [bin(state.x & mask).count("1") for mask in shape.win_masks]
+        self.o_counts = [bin(state.o & mask).count("1") for mask in shape.win_masks]
+        self.hashes = [0] * len(shape.symmetry.perms)
+        for index in range(len(shape.cells)):
+            if state.x >> index & 1 or state.o >> index & 1:
+                keys = shape.zobrist[state.o >> index & 1][index]
+                for symmetry, key in enumerate(keys):
+                    self.hashes[symmetry] ^= key
+        self.moves = []
+        self.scores = []
+        self.buffers = [[0] * len(shape.cells) for _ in range(len(shape.cells) + 1)]
+        # Two killer moves per ply and a history score per side and cell
+        self.killers = [[None] * KILLER_SLOTS for _ in range(len(shape.cells) + 1)]
+        self.history = [[0] * len(shape.cells) for _ in range(2)]
+
+    def make(self, index):
+        """Play cell index for the side to move (the cell must be empty)"""
+        shape = self.geometry
+        line_value = shape.line_value
+        score = self.score
+        self.scores.append(score)
+        self.moves.append(index)
+        if self.ply & 1:
+            self.o |= 1 << index
+            x_counts, o_counts = self.x_counts, self.o_counts
+            for line in shape.cell_line_ids[index]:
+                x_count, o_count = x_counts[line], o_counts[line]
+                score += line_value[x_count][o_count + 1] - line_value[x_count][o_count]
+                o_counts[line] = o_count + 1
+                if o_count + 1 == shape.win_length:
+                    self.winner = O
+            keys = shape.zobrist[1][index]
+        else:
+            self.x |= 1 << index
+            x_counts, o_counts = self.x_counts, self.o_counts
+            for line in shape.cell_line_ids[index]:
+                x_count, o_count = x_counts[line], o_counts[line]
+                score += line_value[x_count + 1][o_count] - line_value[x_count][o_count]
+                x_counts[line] = x_count + 1
+                if x_count + 1 == shape.win_length:
+                    self.winner = X
+            keys = shape.zobrist[0][index]
+        hashes = self.hashes
+        for symmetry in range(len(hashes)):
+            hashes[symmetry] ^= keys[symmetry]
+        self.score = score
+        self.ply += 1
+
+    def unmake(self):
+        """Take back the last move"""
+        index = self.moves.pop()
+        self.score = self.scores.pop()
+        self.ply -= 1
+        self.winner = None  # moves are never made from a won position
+        shape = self.geometry
+        if self.ply & 1:
+            self.o &= ~(1 << index)
+            counts = self.o_counts
+            keys = shape.zobrist[1][index]
+        else:
+            self.x &= ~(1 << index)
+            counts = self.x_counts
+            keys = shape.zobrist[0][index]
+        for line in shape.cell_line_ids[index]:
+            counts[line] -= 1
+        hashes = self.hashes
+        for symmetry in range(len(hashes)):
+            hashes[symmetry] ^= keys[symmetry]
+
+    def record_cutoff(self, index, draft):
+        """
+        Remember a move that caused a beta cutoff: it becomes the first killer
+        at its ply, and its history score for the side to move grows with
+        the square of the remaining draft, so cutoffs near the root count most.
+        """
+        killers = self.killers[self.ply]
+        if killers[0] != index:
+            killers[1:] = killers[:-1]
+            killers[0] = index
+        self.history[self.ply & 1][index] += draft * draft
+
+    def canonical(self):
+        """Returns (key, symmetry) for the transposition table, like Symmetry.canonical"""
+        key = min(self.hashes)
+        return key, self.hashes.index(key)
+
+    def to_bitboard(self):
+        """Copy of the current position as a BitBoard"""
+        return BitBoard(self.x, self.o, self.ply, self.geometry, self.score)
+
+
+def position_rank(state):
+    """Returns the base-3 rank of a bitboard (empty=0, X=1, O=2 per cell)"""
+    return BASE3[state.x] + 2 * BASE3[state.o]
+
+
+def encode_solved(value, moves_mask):
+    """Pack a position value and its optimal move mask into a table entry"""
+    return (value + SOLVED_VALUE_OFFSET) << len(CELLS) | moves_mask
+
+
+def load_solved_table(path=SOLVED_TABLE_PATH):
+    """
+    Load the solved position table, or return None if it is missing or malformed.
+    """
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except OSError:
+        return None
+    table = array("H")
+    table.frombytes(data)
+    if len(table) != 3 ** len(CELLS):
+        return None
+    if sys.byteorder == "big":
+        table.byteswap()
+    return table
+
+
+def solved_position(state):
+    """
+    Look up a position in the solved table.
+    Returns (value, optimal_move_mask), or None if the position is not in the table.
+    Only the standard 3x3 board is solved.
+    """
+    if solved_table is None or state.geometry is not STANDARD:
+        return None
+    entry = solved_table[position_rank(state)]
+    if entry == UNSOLVED:
+        return None
+    return (entry >> len(CELLS)) - SOLVED_VALUE_OFFSET, entry & FULL_MASK
+
+
+solved_table = load_solved_table()
+
+# On-disk position stores of the larger boards (see position_store.py),
+# opened on first use; a geometry maps to None when it has no store file
+position_stores = {}
+
+
+def position_store_path(shape):
+    """File that stored_position() reads for a geometry"""
+    return os.path.join(os.path.dirname(SOLVED_TABLE_PATH),
+                        f"positions_{shape.size}x{shape.size}_{shape.win_length}.bin")
+
+
+def stored_position(state):
+    """
+    Look up a position in its geometry's position store.
+    Returns (value, best_move_index), or None if it is not stored.
+    """
+    shape = state.geometry
+    if shape not in position_stores:
+        from position_store import open_store  # imports this module
+        position_stores[shape] = open_store(position_store_path(shape))
+    store = position_stores[shape]
+    if store is None:
+        return None
+    return store.lookup(state)
+
+
+class SearchContext:
+    """
+    Limits and statistics of a single search.
+
+    A context is passed down through minimax_with_depth, so searches running
+    at the same time (e.g. a hint search next to a move search on another
+    thread) keep separate counters and budgets. With detailed=False only the
+    counters the limits need are kept, which makes statistics nearly free.
+    """
+
+    def __init__(self, time_limit=None, node_limit=None, cancel=None, detailed=True):
+        # Budget for iterative deepening; deadline and active_node_limit are
+        # the limits currently enforced inside the search
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.cancel = cancel
+        self.deadline = None
+        self.active_node_limit = None
+        self.detailed = detailed
+
+        self.nodes_explored = 0
+        self.prunings = 0
+        self.depth_reached = 0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.first_move_cutoffs = 0
+        # PVS only: scout searches that had to be repeated with a full window,
+        # and root searches that fell outside the aspiration window
+        self.researches = 0
+        self.aspiration_researches = 0
+        # MCTS only: random playouts run, and playouts already in the reused tree
+        self.playouts = 0
+        self.reused_playouts = 0
+        self.depth_completed = 0
+        self.iterations = []
+        self.time_taken = 0
+        # Per-ply counters (detailed only): nodes visited and beta cutoffs
+        self.nodes_by_depth = []
+        self.cutoffs_by_depth = []
+
+    def check_limits(self):
+        """Raise SearchCancelled or SearchTimeout if the search has to stop"""
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchCancelled()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def count_node(self, depth):
+        """Record a visited node at depth"""
+        if depth > self.depth_reached:
+            self.depth_reached = depth
+        if self.detailed:
+            if depth >= len(self.nodes_by_depth):
+                grow = depth + 1 - len(self.nodes_by_depth)
+                self.nodes_by_depth.extend([0] * grow)
+                self.cutoffs_by_depth.extend([0] * grow)
+            self.nodes_by_depth[depth] += 1
+
+    def count_cutoff(self, depth, first_move=False):
+        """Record an alpha-beta cutoff at depth, caused by the first move searched or a later one"""
+        self.prunings += 1
+        if first_move:
+            self.first_move_cutoffs += 1
+        if self.detailed:
+            self.cutoffs_by_depth[depth] += 1
+
+    def branching_factors(self):
+        """Effective branching factor between each ply and the next"""
+        counts = self.nodes_by_depth
+        return [counts[d + 1] / counts[d] for d in range(len(counts) - 1) if counts[d]]
+
+    def as_dict(self):
+        """Statistics in the format returned by get_ai_stats()"""
+        return {
+            "nodes_explored": self.nodes_explored,
+            "time_taken": self.time_taken,
+            "prunings": self.prunings,
+            "depth_reached": self.depth_reached,
+            "tt_hits": self.tt_hits,
+            "tt_misses": self.tt_misses,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.prunings if self.prunings else 0.0,
+            "researches": self.researches,
+            "aspiration_researches": self.aspiration_researches,
+            "playouts": self.playouts,
+            "reused_playouts": self.reused_playouts,
+            "depth_completed": self.depth_completed,
+            "iterations": list(self.iterations),
+            "nodes_by_depth": list(self.nodes_by_depth),
+            "cutoffs_by_depth": list(self.cutoffs_by_depth),
+            "branching_factors": self.branching_factors(),
+        }
+
+
+# Context of the most recent minimax() call, reported by get_ai_stats()
+last_context = SearchContext()
+
+
 def reset_ai_stats():
     """Reset AI statistics for tracking performance"""
-    global ai_stats
-    ai_stats = {
-        "nodes_explored": 0,
-        "time_taken": 0,
-        "prunings": 0,
-        "depth_reached": 0
-    }
+    global last_context
+    last_context = SearchContext()
 
 def get_ai_stats():
     """Get current AI statistics"""
-    return ai_stats.copy()
+    return last_context.as_dict()
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+
+class SearchCancelled(Exception):
+    """Raised out of minimax() and get_best_moves() when their cancel event is set"""
 
-def minimax_with_depth(board, depth, maximizing_player, alpha=float('-inf'), beta=float('inf'), max_depth=9):
+
+def minimax_with_depth(board, depth, maximizing_player, alpha=float('-inf'), beta=float('inf'), max_depth=9,
+                       first_move=None, context=None):
     """
     Core minimax algorithm implementation with alpha-beta pruning optimization.
 
     This function recursively evaluates all possible game states to find the optimal move.
     Alpha-beta pruning eliminates branches that won't affect the final decision,
     significantly improving performance without changing the result.
+    The position is copied once into a SearchBoard, which the search then
+    plays on in place.
 
     Args:
-        board: Current game state
+        board: Current game state (list-of-lists board or BitBoard)
         depth: Current search depth
         maximizing_player: True if maximizing (X), False if minimizing (O)
         alpha: Best value maximizer can guarantee
         beta: Best value minimizer can guarantee
         max_depth: Maximum search depth limit
+        first_move: Action to search first at this node, e.g. the previous
+            iteration's best move
+        context: SearchContext for limits and statistics; defaults to the
+            one reported by get_ai_stats()
 
     Returns:
         Tuple of (best_score, best_action)
+
+    Raises:
+        SearchTimeout: the context's deadline or node limit was exceeded
+        SearchCancelled: the context's cancel event was set
+    """
+    if context is None:
+        context = last_context
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_board(board)
+    shape = board.geometry
+    first_index = shape.index(first_move) if first_move is not None else None
+    score, index = _search(SearchBoard(board), depth, maximizing_player, alpha, beta, max_depth,
+                           first_index, context)
+    return score, shape.cells[index] if index is not None else None
+
+
+def _search(board, depth, maximizing_player, alpha, beta, max_depth, first_index, context):
+    """
+    Alpha-beta search on a SearchBoard, see minimax_with_depth.
+    Returns (best_score, best_cell_index); the board is unchanged afterwards.
     """
-    global ai_stats
-    ai_stats["nodes_explored"] += 1
-    ai_stats["depth_reached"] = max(ai_stats["depth_reached"], depth)
+    context.nodes_explored += 1
+    context.count_node(depth)
+    if context.active_node_limit is not None and context.nodes_explored > context.active_node_limit:
+        raise SearchTimeout()
+    if context.nodes_explored % LIMIT_CHECK_INTERVAL == 0:
+        context.check_limits()
     
-    if terminal(board) or depth == max_depth:
-        score = utility(board)
-        # Add depth bonus to prefer quicker wins
-        if score == 1:  # X wins
-            return score + (10 - depth), None
-        elif score == -1:  # O wins
-            return score - (10 - depth), None
-        else:
-            return score, None
+    shape = board.geometry
+    cells = shape.cells
+    if board.winner is not None or board.ply == len(cells) or depth == max_depth:
+        return _leaf_score(board, depth), None
+
+    # Probe the transposition table under the symmetry-reduced key.
+    # Entries are only reused at the same effective draft, so depth-limited
+    # difficulties never inherit results from deeper searches.
+    symmetries = shape.symmetry
+    table = shape.transposition_table
+    draft = min(max_depth - depth, len(cells) - board.ply)
+    key, symmetry = board.canonical()
+    entry = table.probe(key)
+    tt_move = None
+    if entry is None:
+        context.tt_misses += 1
+    else:
+        context.tt_hits += 1
+        tt_score, tt_draft, tt_flag, tt_canonical_move = entry
+        if tt_canonical_move is not None:
+            tt_move = symmetries.from_canonical(symmetry, tt_canonical_move)
+        if tt_draft == draft and depth > 0:
+            tt_score = score_from_tt(tt_score, depth)
+            if tt_flag == EXACT:
+                return tt_score, tt_move
+            elif tt_flag == LOWER:
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if beta <= alpha:
+                return tt_score, tt_move
 
-    best_action = None
+    alpha_orig, beta_orig = alpha, beta
+    best_index = None
+    moves, count, ordered = _list_moves(board, depth, first_index, tt_move)
+    history = board.history[board.ply & 1]
     
     if maximizing_player:  # X's turn (maximize)
-        max_eval = float('-inf')
-        # Prioritize center and corners for better play
-        action_list = list(actions(board))
-        action_list.sort(key=lambda x: move_priority(x))
-        
-        for action in action_list:
-            eval_score, _ = minimax_with_depth(result(board, action), depth + 1, False, alpha, beta, max_depth)
-            if eval_score > max_eval:
-                max_eval = eval_score
-                best_action = action
+        best_eval = float('-inf')
+        for position in range(count):
+            if position >= ordered:
+                _pick_move(moves, position, count, history)
+            index = moves[position]
+            board.make(index)
+            try:
+                eval_score, _ = _search(board, depth + 1, False, alpha, beta, max_depth, None, context)
+            finally:
+                board.unmake()
+            if eval_score > best_eval:
+                best_eval = eval_score
+                best_index = index
             alpha = max(alpha, eval_score)
             if beta <= alpha:
-                ai_stats["prunings"] += 1
+                context.count_cutoff(depth, position == 0)
+                board.record_cutoff(index, draft)
                 break  # Alpha-beta pruning
-        return max_eval, best_action
     else:  # O's turn (minimize)
-        min_eval = float('inf')
-        # Prioritize center and corners for better play
-        action_list = list(actions(board))
-        action_list.sort(key=lambda x: move_priority(x))
-        
-        for action in action_list:
-            eval_score, _ = minimax_with_depth(result(board, action), depth + 1, True, alpha, beta, max_depth)
-            if eval_score < min_eval:
-                min_eval = eval_score
-                best_action = action
+        best_eval = float('inf')
+        for position in range(count):
+            if position >= ordered:
+                _pick_move(moves, position, count, history)
+            index = moves[position]
+            board.make(index)
+            try:
+                eval_score, _ = _search(board, depth + 1, True, alpha, beta, max_depth, None, context)
+            finally:
+                board.unmake()
+            if eval_score < best_eval:
+                best_eval = eval_score
+                best_index = index
             beta = min(beta, eval_score)
             if beta <= alpha:
-                ai_stats["prunings"] += 1
+                context.count_cutoff(depth, position == 0)
+                board.record_cutoff(index, draft)
                 break  # Alpha-beta pruning
-        return min_eval, best_action
 
-def move_priority(action):
+    if best_eval <= alpha_orig:
+        flag = UPPER
+    elif best_eval >= beta_orig:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(key, score_to_tt(best_eval, depth), draft, flag,
+                symmetries.to_canonical(symmetry, best_index))
+    return best_eval, best_index
+
+
+def _pvs(board, depth, alpha, beta, max_depth, first_index, context):
     """
-    Assign priority to moves: center > corners > edges
+    Negamax principal variation search on a SearchBoard.
+
+    Scores and the (alpha, beta) window are from the side to move's point
+    of view. The first move is searched with the full window; every later
+    move gets a null-window scout that only proves it is no better, and is
+    searched again with the full window when the scout fails high.
+    Transposition table entries are stored from X's point of view, so they
+    are shared with the alpha-beta search.
+
+    Returns:
+        Tuple of (best_score, best_cell_index) for the side to move
     """
-    i, j = action
-    if i == 1 and j == 1:  # Center
+    context.nodes_explored += 1
+    context.count_node(depth)
+    if context.active_node_limit is not None and context.nodes_explored > context.active_node_limit:
+        raise SearchTimeout()
+    if context.nodes_explored % LIMIT_CHECK_INTERVAL == 0:
+        context.check_limits()
+
+    shape = board.geometry
+    cells = shape.cells
+    color = -1 if board.ply & 1 else 1
+    if board.winner is not None or board.ply == len(cells) or depth == max_depth:
+        return color * _leaf_score(board, depth), None
+
+    symmetries = shape.symmetry
+    table = shape.transposition_table
+    draft = min(max_depth - depth, len(cells) - board.ply)
+    key, symmetry = board.canonical()
+    entry = table.probe(key)
+    tt_move = None
+    if entry is None:
+        context.tt_misses += 1
+    else:
+        context.tt_hits += 1
+        tt_score, tt_draft, tt_flag, tt_canonical_move = entry
+        if tt_canonical_move is not None:
+            tt_move = symmetries.from_canonical(symmetry, tt_canonical_move)
+        if tt_draft == draft and depth > 0:
+            tt_score = color * score_from_tt(tt_score, depth)
+            if tt_flag == EXACT:
+                return tt_score, tt_move
+            # A lower bound for X is an upper bound for O
+            elif (tt_flag == LOWER) == (color == 1):
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if beta <= alpha:
+                return tt_score, tt_move
+
+    alpha_orig = alpha
+    best_score = float('-inf')
+    best_index = None
+    moves, count, ordered = _list_moves(board, depth, first_index, tt_move)
+    history = board.history[board.ply & 1]
+    for position in range(count):
+        if position >= ordered:
+            _pick_move(moves, position, count, history)
+        index = moves[position]
+        board.make(index)
+        try:
+            if position == 0:
+                score = -_pvs(board, depth + 1, -beta, -alpha, max_depth, None, context)[0]
+            else:
+                score = -_pvs(board, depth + 1, -alpha - NULL_WINDOW, -alpha, max_depth, None, context)[0]
+                if alpha < score < beta:
+                    context.researches += 1
+                    score = -_pvs(board, depth + 1, -beta, -alpha, max_depth, None, context)[0]
+        finally:
+            board.unmake()
+        if score > best_score:
+            best_score = score
+            best_index = index
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            context.count_cutoff(depth, position == 0)
+            board.record_cutoff(index, draft)
+            break
+
+    if best_score <= alpha_orig:
+        flag = UPPER if color == 1 else LOWER
+    elif best_score >= beta:
+        flag = LOWER if color == 1 else UPPER
+    else:
+        flag = EXACT
+    table.store(key, score_to_tt(color * best_score, depth), draft, flag,
+                symmetries.to_canonical(symmetry, best_index))
+    return best_score, best_index
+
+
+def _pvs_root(board, depth, previous, first_index, context):
+    """
+    PVS from the root with an aspiration window around the previous
+    iteration's score, widened to the full window if the score falls outside.
+    Returns (score, best_cell_index) from X's point of view.
+    """
+    color = -1 if board.ply & 1 else 1
+    if previous is not None:
+        center = color * previous
+        alpha, beta = center - ASPIRATION_WINDOW, center + ASPIRATION_WINDOW
+        score, best_index = _pvs(board, 0, alpha, beta, depth, first_index, context)
+        if alpha < score < beta:
+            return color * score, best_index
+        context.aspiration_researches += 1
+        first_index = best_index
+    score, best_index = _pvs(board, 0, float('-inf'), float('inf'), depth, first_index, context)
+    return color * score, best_index
+
+
+def _leaf_score(board, depth):
+    """Score of a terminal or depth-cutoff node, from X's point of view"""
+    shape = board.geometry
+    # Add depth bonus to prefer quicker wins
+    if board.winner == X:
+        return 1 + (shape.win_bonus - depth)
+    elif board.winner == O:
+        return -1 - (shape.win_bonus - depth)
+    elif board.ply == len(shape.cells):
         return 0
-    elif (i, j) in [(0, 0), (0, 2), (2, 0), (2, 2)]:  # Corners
-        return 1
-    else:  # Edges
-        return 2
+    # Depth cutoff: the line heuristic, scaled below any win score
+    return board.score / shape.heuristic_scale
+
 
-def minimax(board, difficulty=IMPOSSIBLE):
+def _list_moves(board, depth, first_index, tt_move):
     """
-    Main minimax function with difficulty levels
+    List a node's moves into its ply's buffer: the requested first move,
+    the table move, the killer moves of this ply, then the rest in the
+    static center/corner/edge order. Returns (moves, count, ordered), where
+    the moves from ordered on are still to be picked by history score.
     """
+    shape = board.geometry
+    empty = shape.candidate_moves(board.x, board.o)
+    # Buffers are indexed by ply, which is below the cell count at any node
+    # with moves; depth starts wherever the caller says and is not bounded
+    moves = board.buffers[board.ply]
+    count = 0
+    if first_index is not None and empty >> first_index & 1:
+        moves[count] = first_index
+        count += 1
+        empty &= ~(1 << first_index)
+    if tt_move is not None and empty >> tt_move & 1:
+        moves[count] = tt_move
+        count += 1
+        empty &= ~(1 << tt_move)
+    for killer in board.killers[board.ply]:
+        if killer is not None and empty >> killer & 1:
+            moves[count] = killer
+            count += 1
+            empty &= ~(1 << killer)
+    ordered = count
+    for index in shape.move_order:
+        if empty >> index & 1:
+            moves[count] = index
+            count += 1
+    return moves, count, ordered
+
+
+def _pick_move(moves, position, count, history):
+    """
+    Swap the remaining move with the best history score into moves[position].
+    Moves are picked one at a time, so a node that cuts off early never pays
+    for ordering the moves it does not search.
+    """
+    best = position
+    best_score = history[moves[position]]
+    for other in range(position + 1, count):
+        if history[moves[other]] > best_score:
+            best = other
+            best_score = history[moves[other]]
+    if best != position:
+        moves[position], moves[best] = moves[best], moves[position]
+
+
+def score_to_tt(score, depth):
+    """
+    Convert a root-relative score to a node-relative one for storage.
+    Win scores carry a depth bonus measured from the root, so it is shifted
+    to be measured from the stored node instead. Draws and heuristic scores,
+    which lie strictly between -1 and 1, are stored unchanged.
+    """
+    if score >= 1:
+        return score + depth
+    elif score <= -1:
+        return score - depth
+    return score
+
+
+def score_from_tt(score, depth):
+    """Convert a stored node-relative score back to the current root"""
+    if score >= 1:
+        return score - depth
+    elif score <= -1:
+        return score + depth
+    return score
+
+def iterative_deepening(state, max_depth, context=None, algorithm=ALPHA_BETA):
+    """
+    Search depth 1, 2, ... up to max_depth, trying the previous iteration's
+    best move first each time.
+
+    The search stops once the context's time_limit (seconds) or node_limit is
+    used and returns the result of the deepest completed iteration. The first
+    iteration is never interrupted by the budget, so a move is always
+    available. Each completed iteration is recorded in context.iterations.
+    Setting the context's cancel event aborts the search with SearchCancelled.
+    algorithm is ALPHA_BETA or PVS; PVS iterations after the first search an
+    aspiration window around the previous iteration's score.
+
+    Returns:
+        Tuple of (best_score, best_action)
+    """
+    if context is None:
+        context = last_context
+    maximizing = state.player() == X
+    if state.terminal():
+        return minimax_with_depth(state, 0, maximizing, max_depth=0, context=context)
+
+    start_time = time.perf_counter()
+    shape = state.geometry
+    board = SearchBoard(state)
+    max_depth = min(max_depth, len(shape.cells) - state.ply)
+    value, action = None, None
+    for depth in range(1, max_depth + 1):
+        iteration_start = time.perf_counter()
+        nodes_before = context.nodes_explored
+        if depth > 1:
+            if context.time_limit is not None:
+                context.deadline = start_time + context.time_limit
+            context.active_node_limit = context.node_limit
+        try:
+            first_index = shape.index(action) if action is not None else None
+            if algorithm == PVS:
+                value, best_index = _pvs_root(board, depth, value, first_index, context)
+            else:
+                value, best_index = _search(board, 0, maximizing, float('-inf'), float('inf'), depth,
+                                            first_index, context)
+            action = shape.cells[best_index]
+        except SearchTimeout:
+            break
+        finally:
+            context.deadline = context.active_node_limit = None
+        context.depth_completed = depth
+        context.iterations.append({
+            "depth": depth,
+            "time": time.perf_counter() - iteration_start,
+            "nodes": context.nodes_explored - nodes_before,
+        })
+    return value, action
+
+def move_priority(action, size=BOARD_SIZE, win_length=None):
+    """
+    Assign priority to moves: cells on more winning lines first
+    (center > corners > edges on the standard board)
+    """
+    shape = geometry(size, win_length)
+    return shape.priority[shape.index(action)]
+
+def minimax(board, difficulty=IMPOSSIBLE, win_length=None, time_limit=None, node_limit=None, cancel=None,
+            detailed_stats=True, with_stats=False, workers=1, algorithm=ALPHA_BETA):
+    """
+    Main minimax function with difficulty levels.
+    The search deepens iteratively up to the difficulty's depth; with a
+    time_limit (seconds) or node_limit it returns the best move found when the
+    budget runs out, and Impossible keeps deepening until then. Setting the
+    cancel event (e.g. a threading.Event) raises SearchCancelled.
+    With workers > 1 (or None for every CPU) the root moves are split over a
+    process pool, see parallel.parallel_search. algorithm selects ALPHA_BETA
+    or PVS, in one process or in each worker.
+
+    Returns (value, action), or (value, action, SearchContext) with with_stats.
+    The context is also what get_ai_stats() reports until the next call.
+    """
+    global last_context
     start_time = time.time()
-    reset_ai_stats()
+    context = SearchContext(time_limit, node_limit, cancel, detailed_stats)
+    last_context = context
     
     current_player = player(board)
     maximizing = current_player == X
+    state = BitBoard.from_board(board, win_length)
+    shape = state.geometry
+    shape.transposition_table.new_search()
+    max_depth = shape.search_depth(difficulty)
+    if difficulty == IMPOSSIBLE and (time_limit is not None or node_limit is not None):
+        max_depth = len(shape.cells)
+    search = partial(iterative_deepening, algorithm=algorithm)
+    if workers != 1:
+        from parallel import parallel_search  # imports this module
+        search = partial(parallel_search, workers=workers, algorithm=algorithm)
+    value, action = _choose_move(board, state, difficulty, max_depth, context, search)
     
+    context.time_taken = time.time() - start_time
+    if with_stats:
+        return value, action, context
+    return value, action
+
+def _choose_move(board, state, difficulty, max_depth, context, search=iterative_deepening):
+    """Pick a move for a difficulty level: random slips, table lookup or search"""
+    shape = state.geometry
     if difficulty == EASY:
         # 30% chance of random move, 70% chance of decent move
         if random.random() < 0.3:
@@ -212,7 +1193,7 @@ def minimax(board, difficulty=IMPOSSIBLE):
             return 0, random.choice(available_actions)
         else:
             # Use minimax with limited depth
-            value, action = minimax_with_depth(board, 0, maximizing, max_depth=2)
+            value, action = search(state, max_depth, context)
     elif difficulty == MEDIUM:
         # 15% chance of suboptimal move
         if random.random() < 0.15:
@@ -220,83 +1201,136 @@ def minimax(board, difficulty=IMPOSSIBLE):
             return 0, random.choice(available_actions)
         else:
             # Use minimax with moderate depth
-            value, action = minimax_with_depth(board, 0, maximizing, max_depth=4)
+            value, action = search(state, max_depth, context)
     elif difficulty == HARD:
         # 5% chance of suboptimal move
         if random.random() < 0.05:
             available_actions = list(actions(board))
-            top_moves = sorted(available_actions, key=lambda x: move_priority(x))[:3]
+            top_moves = sorted(available_actions, key=lambda x: shape.priority[shape.index(x)])[:3]
             return 0, random.choice(top_moves)
         else:
             # Use minimax with high depth
-            value, action = minimax_with_depth(board, 0, maximizing, max_depth=6)
+            value, action = search(state, max_depth, context)
     else:  # IMPOSSIBLE
-        # Perfect play - full depth minimax
-        value, action = minimax_with_depth(board, 0, maximizing, max_depth=9)
-    
-    ai_stats["time_taken"] = time.time() - start_time
+        # Perfect play - solved table or position store lookup, deepest search as fallback
+        solved = solved_position(state)
+        stored = stored_position(state) if solved is None else None
+        if solved is not None:
+            value, moves = solved
+            action = next((CELLS[index] for index in MOVE_ORDER if moves >> index & 1), None)
+        elif stored is not None and stored[1] is not None:
+            value, action = stored[0], shape.cells[stored[1]]
+        else:
+            value, action = search(state, max_depth, context)
     return value, action
 
-def get_best_moves(board, num_moves=3):
+def search_multipv(state, num_moves, max_depth, context=None):
     """
-    Get the top N best moves for hint system
+    Score the best num_moves root moves exactly in a single search.
+
+    Root moves are searched in order against a shared bound: once num_moves
+    moves are kept, each further move only has to prove it beats the worst of
+    them, so a null result costs a cutoff rather than a full-width search.
+    Children share the transposition table, so common subtrees are searched once.
+    Setting the context's cancel event aborts the search with SearchCancelled.
+
+    Returns:
+        List of (action, score) pairs, best first, scored from the root
+    """
+    if context is None:
+        context = SearchContext()
+    shape = state.geometry
+    maximizing = state.player() == X
+    candidates = shape.candidate_moves(state.x, state.o)
+    board = SearchBoard(state)
+    top = []
+    for index in shape.move_order:
+        if not candidates >> index & 1:
+            continue
+        bound = top[-1][1] if len(top) == num_moves else None
+        alpha = float('-inf') if bound is None or not maximizing else bound
+        beta = float('inf') if bound is None or maximizing else bound
+        board.make(index)
+        try:
+            score, _ = _search(board, 1, not maximizing, alpha, beta, max_depth, None, context)
+        finally:
+            board.unmake()
+        if bound is not None and (score <= bound if maximizing else score >= bound):
+            continue  # Only a bound: not better than the kept moves
+        top.append((shape.cells[index], score))
+        top.sort(key=lambda x: x[1], reverse=maximizing)
+        del top[num_moves:]
+    return top
+
+def get_best_moves_with_scores(board, num_moves=3, win_length=None, cancel=None, with_stats=False):
+    """
+    Get the top N moves with their exact scores, best first.
+    The standard board reads the solved table; other boards use one multi-PV search.
+    With with_stats the SearchContext of the search is returned as well, as
+    (move_scores, context); hint searches never change get_ai_stats().
     """
     current_player = player(board)
-    maximizing = current_player == X
+    start_time = time.time()
+    context = SearchContext(cancel=cancel)
     
-    move_scores = []
-    for action in actions(board):
-        value, _ = minimax_with_depth(result(board, action), 0, not maximizing, max_depth=5)
-        move_scores.append((action, value))
+    state = BitBoard.from_board(board, win_length)
+    shape = state.geometry
+    # Children of a won board are not in the solved table; those boards are searched
+    children = None
+    if solved_position(state) is not None:
+        children = [(index, solved_position(state.play(index)))
+                    for index in shape.move_order if state.empty() >> index & 1]
+        if any(solved is None for _, solved in children):
+            children = None
+    if children is not None:
+        move_scores = [(shape.cells[index], score_from_tt(solved[0], 1)) for index, solved in children]
+        # Sort by score (descending for X, ascending for O)
+        move_scores.sort(key=lambda x: x[1], reverse=(current_player == X))
+        move_scores = move_scores[:num_moves]
+    else:
+        shape.transposition_table.new_search()
+        move_scores = search_multipv(state, num_moves, shape.hint_depth() + 1, context)
     
-    # Sort by score (descending for X, ascending for O)
-    move_scores.sort(key=lambda x: x[1], reverse=(current_player == X))
-    return [move for move, _ in move_scores[:num_moves]]
+    context.time_taken = time.time() - start_time
+    if with_stats:
+        return move_scores, context
+    return move_scores
+
+def get_best_moves(board, num_moves=3, win_length=None, cancel=None, with_stats=False):
+    """
+    Get the top N best moves for hint system
+    """
+    if with_stats:
+        move_scores, context = get_best_moves_with_scores(board, num_moves, win_length, cancel, True)
+        return [move for move, _ in move_scores], context
+    return [move for move, _ in get_best_moves_with_scores(board, num_moves, win_length, cancel)]
 
-def evaluate_position(board):
+def evaluate_position(board, win_length=None):
     """
     Evaluate the current position strength
     """
-    if terminal(board):
-        return utility(board)
+    if terminal(board, win_length):
+        return utility(board, win_length)
     
     score = 0
     
     # Check all lines (rows, columns, diagonals)
-    lines = []
-    # Rows
-    for i in range(3):
-        lines.append([board[i][j] for j in range(3)])
-    # Columns
-    for j in range(3):
-        lines.append([board[i][j] for i in range(3)])
-    # Diagonals
-    lines.append([board[i][i] for i in range(3)])
-    lines.append([board[i][2-i] for i in range(3)])
-    
-    for line in lines:
-        score += evaluate_line(line)
+    for line in geometry(len(board), win_length).lines:
+        score += evaluate_line([board[i][j] for i, j in line])
     
     return score
 
 def evaluate_line(line):
     """
-    Evaluate a single line (row, column, or diagonal)
+    Evaluate a single line (row, column, or diagonal).
+    An open line is worth 10 ** (pieces - 1) to its owner: 1, 10, 100 on 3x3.
     """
     x_count = line.count(X)
     o_count = line.count(O)
     
-    if x_count == 3:
-        return 100
-    elif o_count == 3:
-        return -100
-    elif x_count == 2 and o_count == 0:
-        return 10
-    elif o_count == 2 and x_count == 0:
-        return -10
-    elif x_count == 1 and o_count == 0:
-        return 1
-    elif o_count == 1 and x_count == 0:
-        return -1
+    if x_count and not o_count:
+        return 10 ** (x_count - 1)
+    elif o_count and not x_count:
+        return -10 ** (o_count - 1)
     else:
-        return 0
\ No newline at end of file
+        return 0
@@ -0,0 +1,301 @@
+"""
+Headless self-play tournament for the Tic Tac Toe engines
+Plays many games between two engines in a process pool and reports results,
+search throughput and move latency, without pygame.
+
+Usage:
+    python tournament.py hard impossible --games 1000
+    python tournament.py hard impossible --output report.json
+    python tournament.py hard impossible --baseline report.json
+    python tournament.py hard mcts-hard --log games.ttgl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import game_log
+import mcts
+import tictactoe as ttt
+
+# Allowed slowdown before compare mode reports a regression: a fraction of the
+# baseline's nodes per second and p95 latency, and an absolute score drop
+DEFAULT_SPEED_TOLERANCE = 0.10
+DEFAULT_SCORE_TOLERANCE = 0.05
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def minimax_engine(difficulty):
+    """Engine playing ttt.minimax at a difficulty level"""
+    def engine(board, win_length, time_limit, node_limit):
+        _, action, context = ttt.minimax(board, difficulty, win_length, time_limit, node_limit,
+                                         detailed_stats=False, with_stats=True)
+        return action, context.nodes_explored
+    return engine
+
+
+def mcts_engine(difficulty):
+    """Engine playing mcts.mcts at a difficulty level; node_limit caps its playouts"""
+    def engine(board, win_length, time_limit, node_limit):
+        _, action, context = mcts.mcts(board, difficulty, win_length, time_limit, node_limit, with_stats=True)
+        return action, context.playouts
+    return engine
+
+
+# Engines by name; each takes (board, win_length, time_limit, node_limit)
+# and returns (action, nodes_searched)
+ENGINES = {
+    "easy": minimax_engine(ttt.EASY),
+    "medium": minimax_engine(ttt.MEDIUM),
+    "hard": minimax_engine(ttt.HARD),
+    "impossible": minimax_engine(ttt.IMPOSSIBLE),
+    "mcts-medium": mcts_engine(ttt.MEDIUM),
+    "mcts-hard": mcts_engine(ttt.HARD),
+    "mcts-impossible": mcts_engine(ttt.IMPOSSIBLE),
+}
+
+
+def engine_player(name):
+    """The game_log.Player of an engine name, e.g. mcts-hard"""
+    engine, _, difficulty = name.rpartition("-")
+    return game_log.Player(engine or "minimax", difficulty.upper())
+
+
+def play_game(job):
+    """
+    Play one game. job is (seed, x_engine, o_engine, settings) with settings a
+    dict of size, win_length, time_limit, node_limit and opening_moves.
+    Returns a dict with the winner, the latency and nodes of every move
+    grouped by engine name, and for the game log the (player, move) history,
+    start time and search time of each side.
+    """
+    seed, x_name, o_name, settings = job
+    random.seed(seed)
+    mcts.reset_engines(seed)
+    started = time.time()
+    board = ttt.initial_state(settings["size"])
+    win_length = settings["win_length"]
+    history = []
+
+    # Random opening moves give deterministic engines different games
+    for _ in range(settings["opening_moves"]):
+        if ttt.terminal(board, win_length):
+            break
+        action = random.choice(sorted(ttt.actions(board)))
+        history.append((ttt.player(board), action))
+        board = ttt.result(board, action)
+
+    moves = {x_name: [], o_name: []}
+    think_time = {ttt.X: 0.0, ttt.O: 0.0}
+    while not ttt.terminal(board, win_length):
+        name = x_name if ttt.player(board) == ttt.X else o_name
+        start = time.perf_counter()
+        action, nodes = ENGINES[name](board, win_length, settings["time_limit"], settings["node_limit"])
+        elapsed = time.perf_counter() - start
+        moves[name].append((elapsed, nodes))
+        think_time[ttt.player(board)] += elapsed
+        history.append((ttt.player(board), action))
+        board = ttt.result(board, action)
+    return {"x": x_name, "o": o_name, "winner": ttt.winner(board, win_length), "moves": moves,
+            "history": history, "started": started, "think_time": think_time}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def summarize_moves(moves):
+    """Latency percentiles (milliseconds) and nodes per second of (seconds, nodes) pairs"""
+    latencies = sorted(seconds for seconds, _ in moves)
+    total_time = sum(latencies)
+    total_nodes = sum(nodes for _, nodes in moves)
+    summary = {
+        "moves": len(moves),
+        "nodes": total_nodes,
+        "search_time": total_time,
+        "nodes_per_second": total_nodes / total_time if total_time else None,
+        "mean_ms": total_time / len(moves) * 1000 if moves else None,
+        "max_ms": latencies[-1] * 1000 if moves else None,
+    }
+    for percent in LATENCY_PERCENTILES:
+        value = percentile(latencies, percent)
+        summary[f"p{percent}_ms"] = value * 1000 if value is not None else None
+    return summary
+
+
+def run_tournament(engine_a, engine_b, games=100, size=3, win_length=None, time_limit=None,
+                   node_limit=None, opening_moves=0, workers=None, seed=0, log=None):
+    """
+    Play games between two engines, alternating who plays X.
+
+    Games run in a process pool of workers processes (os.cpu_count() by
+    default, 1 plays in this process). Each game is seeded from seed, so a
+    tournament is reproducible for engines without time limits. With log (a
+    path), every game is appended to that game log.
+
+    Returns:
+        Report dict: results from engine_a's point of view, and the latency
+        and throughput of each engine
+    """
+    for name in (engine_a, engine_b):
+        if name not in ENGINES:
+            raise ValueError(f"Unknown engine {name!r}; choose from {', '.join(ENGINES)}")
+    settings = {
+        "size": size,
+        "win_length": win_length,
+        "time_limit": time_limit,
+        "node_limit": node_limit,
+        "opening_moves": opening_moves,
+    }
+    jobs = []
+    for game in range(games):
+        x_name, o_name = (engine_a, engine_b) if game % 2 == 0 else (engine_b, engine_a)
+        jobs.append((seed + game, x_name, o_name, settings))
+
+    start = time.perf_counter()
+    if workers == 1:
+        outcomes = [play_game(job) for job in jobs]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(play_game, jobs, chunksize=max(1, games // (workers * 8))))
+    wall_time = time.perf_counter() - start
+
+    if log is not None:
+        with game_log.GameLogWriter(log) as writer:
+            for outcome in outcomes:
+                x_time, o_time = outcome["think_time"][ttt.X], outcome["think_time"][ttt.O]
+                writer.write(game_log.game_record(outcome["history"], size, win_length,
+                                                  engine_player(outcome["x"]), engine_player(outcome["o"]),
+                                                  outcome["started"], x_time + o_time, x_time, o_time))
+
+    wins = draws = losses = 0
+    moves = {engine_a: [], engine_b: []}
+    for outcome in outcomes:
+        a_symbol = ttt.X if outcome["x"] == engine_a else ttt.O
+        if outcome["winner"] is None:
+            draws += 1
+        elif outcome["winner"] == a_symbol:
+            wins += 1
+        else:
+            losses += 1
+        for name, engine_moves in outcome["moves"].items():
+            moves[name].extend(engine_moves)
+
+    return {
+        "engines": [engine_a, engine_b],
+        "settings": dict(settings, games=games, seed=seed, workers=workers or 1),
+        "results": {
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "win_rate": wins / games if games else 0,
+            "draw_rate": draws / games if games else 0,
+            "loss_rate": losses / games if games else 0,
+            "score": (wins + draws / 2) / games if games else 0,
+        },
+        "wall_time": wall_time,
+        "games_per_second": games / wall_time if wall_time else None,
+        "engine_stats": {name: summarize_moves(engine_moves) for name, engine_moves in moves.items()},
+    }
+
+
+def compare_reports(report, baseline, speed_tolerance=DEFAULT_SPEED_TOLERANCE,
+                    score_tolerance=DEFAULT_SCORE_TOLERANCE):
+    """
+    Compare a report with a baseline report of the same engines.
+    Returns a list of regressions, empty if nothing got worse beyond tolerance.
+    """
+    regressions = []
+    if report["engines"] != baseline["engines"]:
+        return [f"engines differ: {report['engines']} vs baseline {baseline['engines']}"]
+
+    score, base_score = report["results"]["score"], baseline["results"]["score"]
+    if score < base_score - score_tolerance:
+        regressions.append(f"score of {report['engines'][0]} fell from {base_score:.3f} to {score:.3f}")
+
+    for name, stats in report["engine_stats"].items():
+        base = baseline["engine_stats"].get(name)
+        if base is None:
+            continue
+        nps, base_nps = stats["nodes_per_second"], base["nodes_per_second"]
+        if nps is not None and base_nps and nps < base_nps * (1 - speed_tolerance):
+            regressions.append(f"{name}: nodes/s fell from {base_nps:,.0f} to {nps:,.0f}")
+        p95, base_p95 = stats["p95_ms"], base["p95_ms"]
+        if p95 is not None and base_p95 and p95 > base_p95 * (1 + speed_tolerance):
+            regressions.append(f"{name}: p95 latency rose from {base_p95:.2f}ms to {p95:.2f}ms")
+    return regressions
+
+
+def format_report(report):
+    """Human-readable summary of a tournament report"""
+    engine_a, engine_b = report["engines"]
+    results = report["results"]
+    lines = [
+        f"{engine_a} vs {engine_b}: {report['settings']['games']} games in {report['wall_time']:.2f}s",
+        f"  {engine_a}: {results['wins']} W / {results['draws']} D / {results['losses']} L "
+        f"(win {results['win_rate']:.1%}, draw {results['draw_rate']:.1%}, loss {results['loss_rate']:.1%})",
+    ]
+    for name, stats in report["engine_stats"].items():
+        if not stats["moves"]:
+            continue
+        nps = f"{stats['nodes_per_second']:,.0f}" if stats["nodes_per_second"] else "-"
+        lines.append(f"  {name}: {stats['moves']} moves, {nps} nodes/s, "
+                     f"p50 {stats['p50_ms']:.2f}ms  p95 {stats['p95_ms']:.2f}ms  p99 {stats['p99_ms']:.2f}ms")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play engines against each other without the GUI")
+    parser.add_argument("engine_a", choices=sorted(ENGINES))
+    parser.add_argument("engine_b", choices=sorted(ENGINES))
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--size", type=int, default=3, help="board size")
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per move")
+    parser.add_argument("--node-limit", type=int, default=None, help="nodes per move")
+    parser.add_argument("--opening-moves", type=int, default=0,
+                        help="random moves played before the engines take over")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against a JSON report and fail on regressions")
+    parser.add_argument("--log", help="append every game to this game log")
+    parser.add_argument("--speed-tolerance", type=float, default=DEFAULT_SPEED_TOLERANCE)
+    parser.add_argument("--score-tolerance", type=float, default=DEFAULT_SCORE_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_tournament(args.engine_a, args.engine_b, args.games, args.size, args.win_length,
+                            args.time_limit, args.node_limit, args.opening_moves, args.workers, args.seed,
+                            args.log)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"✓ Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare_reports(report, baseline, args.speed_tolerance, args.score_tolerance)
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.baseline}")
+            return 1
+        print(f"✓ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
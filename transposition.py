@@ -0,0 +1,169 @@
+"""
+Transposition table for the minimax search
+Positions are stored under a symmetry-reduced key, so the eight rotations and
+reflections of a board share a single entry
+"""
+
+import random
+
+# Bound flags for alpha-beta entries
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Cells transformed per table lookup when canonicalizing a mask
+CHUNK_BITS = 9
+
+# Seed of the Zobrist keys, fixed so hashes are the same in every process
+ZOBRIST_SEED = 0x7A0B
+
+
+def symmetry_permutations(size):
+    """
+    Returns the 8 symmetries of a size x size board as cell permutations.
+    perm[index] is where cell index lands under the transform.
+    """
+    last = size - 1
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (j, last - i),
+        lambda i, j: (last - i, last - j),
+        lambda i, j: (last - j, i),
+        lambda i, j: (i, last - j),
+        lambda i, j: (last - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (last - j, last - i),
+    ]
+    perms = []
+    for transform in transforms:
+        perm = []
+        for index in range(size * size):
+            i, j = transform(*divmod(index, size))
+            perm.append(i * size + j)
+        perms.append(tuple(perm))
+    return perms
+
+
+class Symmetry:
+    """
+    Maps positions to a canonical orientation.
+    Masks are transformed through per-chunk lookup tables, so a canonical key
+    costs a handful of table lookups per symmetry.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.perms = symmetry_permutations(size)
+        self.inverse = []
+        for perm in self.perms:
+            inverse = [0] * self.cells
+            for index, target in enumerate(perm):
+                inverse[target] = index
+            self.inverse.append(tuple(inverse))
+        self.tables = [self._build_tables(perm) for perm in self.perms]
+
+    def _build_tables(self, perm):
+        """Lookup tables mapping each chunk of a mask to its transformed bits"""
+        tables = []
+        for start in range(0, self.cells, CHUNK_BITS):
+            width = min(CHUNK_BITS, self.cells - start)
+            table = []
+            for chunk in range(1 << width):
+                mask = 0
+                for bit in range(width):
+                    if chunk >> bit & 1:
+                        mask |= 1 << perm[start + bit]
+                table.append(mask)
+            tables.append((start, (1 << width) - 1, table))
+        return tables
+
+    def transform(self, symmetry, mask):
+        """Apply symmetry number symmetry to a cell mask"""
+        result = 0
+        for start, chunk_mask, table in self.tables[symmetry]:
+            result |= table[mask >> start & chunk_mask]
+        return result
+
+    def canonical(self, x, o):
+        """
+        Returns (key, symmetry) where key is the smallest encoding of the
+        position over all symmetries and symmetry is the transform producing it.
+        """
+        best_key = None
+        best_symmetry = 0
+        cells = self.cells
+        for symmetry, tables in enumerate(self.tables):
+            tx = to = 0
+            for start, chunk_mask, table in tables:
+                tx |= table[x >> start & chunk_mask]
+                to |= table[o >> start & chunk_mask]
+            key = tx | to << cells
+            if best_key is None or key < best_key:
+                best_key = key
+                best_symmetry = symmetry
+        return best_key, best_symmetry
+
+    def to_canonical(self, symmetry, index):
+        """Map a real cell index into the canonical orientation"""
+        return self.perms[symmetry][index]
+
+    def from_canonical(self, symmetry, index):
+        """Map a canonical cell index back to the real orientation"""
+        return self.inverse[symmetry][index]
+
+
+def zobrist_keys(symmetry, seed=ZOBRIST_SEED):
+    """
+    Zobrist keys for incremental hashing in all orientations at once.
+    keys[side][index][s] is the key of a piece of side (0 = X, 1 = O) on cell
+    index seen through symmetry s. XOR-ing keys[side][index] into a list of
+    hashes per move keeps the hash of every orientation; the smallest one is
+    the same for all eight symmetric positions and the index of the smallest
+    is the symmetry to use with to_canonical/from_canonical.
+    """
+    rng = random.Random(seed)
+    base = [[rng.getrandbits(64) for _ in range(symmetry.cells)] for _ in range(2)]
+    return tuple(
+        tuple(tuple(base[side][perm[index]] for perm in symmetry.perms) for index in range(symmetry.cells))
+        for side in range(2))
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results.
+    Each slot holds (key, score, depth, flag, move, generation). A slot is
+    replaced when it is empty, holds the same key, was written by an older
+    search, or holds a shallower result, so the table never grows past size.
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        """Start a new search so entries from earlier ones can be replaced first"""
+        self.generation += 1
+
+    def probe(self, key):
+        """Returns (score, depth, flag, move) for key, or None"""
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[1:5]
+        return None
+
+    def store(self, key, score, depth, flag, move):
+        """Store a search result, applying the replacement policy"""
+        slot = key % self.size
+        entry = self.slots[slot]
+        if (entry is None or entry[0] == key or entry[5] != self.generation
+                or depth >= entry[2]):
+            self.slots[slot] = (key, score, depth, flag, move, self.generation)
+
+    def clear(self):
+        """Remove every entry"""
+        self.slots = [None] * self.size
+
+    def __len__(self):
+        return sum(entry is not None for entry in self.slots)